@@ -7,9 +7,8 @@ Modern web UI for video intro automation
 import os
 import sys
 import json
-import subprocess
 import tempfile
-import time
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
 import streamlit as st
@@ -19,10 +18,23 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parent))
 
 from yt_automation.auth import get_service
-from yt_automation.editor import stitch_intro, stitch_intro_auto, is_vertical_video
+from yt_automation.editor import select_intro_for_video, stitch_intro
+from yt_automation.encoder_profiles import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES
+from yt_automation.format_policy import DEFAULT_FORMAT_POLICY, FORMAT_POLICIES
+from yt_automation.rate_control import DEFAULT_RATE_CONTROL, RATE_CONTROL_MODES, estimate_output_size
+from yt_automation.probe import probe_video
+from yt_automation.download_cache import cached_download
+from yt_automation.downloader import DOWNLOAD_WORKERS
+from yt_automation.batch_engine import get_cpu_count, plan_workers, create_stitch_pool, run_pooled_stitch_job
+from yt_automation.memory import track_peak_rss
+from yt_automation.metadata_store import MetadataStore
+from yt_automation.pipeline import PipelineStage, run_pipeline
+from yt_automation.playlist_index import PlaylistIndex
+from yt_automation.progress import format_progress
+from yt_automation.quota import QuotaExceededError, default_tracker
+from yt_automation.backfill import reupload_cost
 from yt_automation.youtube_ops import (
-    list_videos, upload_video, set_thumbnail,
-    get_video_details, get_video_playlists, add_video_to_playlist
+    upload_video, set_thumbnail, add_video_to_playlist
 )
 from yt_automation.storage import (
     get_folder_size, format_size, check_storage_warning,
@@ -461,6 +473,21 @@ def get_youtube_service():
     return st.session_state.youtube_service
 
 
+def get_encoder_profile_setting():
+    """Encoder profile chosen on the settings page (ENCODER_PROFILE until changed)."""
+    return st.session_state.get('app_settings', {}).get('encoder_profile', DEFAULT_ENCODER_PROFILE)
+
+
+def get_rate_control_setting():
+    """Rate control mode chosen on the settings page (RATE_CONTROL until changed)."""
+    return st.session_state.get('app_settings', {}).get('rate_control', DEFAULT_RATE_CONTROL)
+
+
+def get_format_policy_setting():
+    """Download format policy chosen on the settings page (DOWNLOAD_FORMAT_POLICY until changed)."""
+    return st.session_state.get('app_settings', {}).get('format_policy', DEFAULT_FORMAT_POLICY)
+
+
 def render_header():
     """Render the main header with wide logo."""
     # Wide logo for header (contains text)
@@ -641,16 +668,22 @@ def process_video_page():
                 
                 _render_pipe(1)
                 # Detect video orientation and select appropriate intro
-                video_is_vertical = is_vertical_video(str(temp_path))
-                if video_is_vertical and os.path.exists(INTRO_VIDEO_SHORT):
-                    intro_to_use = INTRO_VIDEO_SHORT
+                video_meta = probe_video(str(temp_path))
+                video_is_vertical = video_meta.is_vertical
+                st.caption(
+                    f"🎞️ {video_meta.display_width}×{video_meta.display_height} · "
+                    f"{video_meta.fps:.2f} fps · {video_meta.duration:.1f}s · "
+                    f"{video_meta.video_codec or '?'} / {video_meta.audio_codec or 'no audio'}"
+                )
+                intro_to_use = select_intro_for_video(str(temp_path), INTRO_VIDEO, INTRO_VIDEO_SHORT)
+                if intro_to_use == INTRO_VIDEO_SHORT:
                     st.info("📱 Using 9:16 (Shorts) intro for vertical video")
+                elif intro_to_use != INTRO_VIDEO:
+                    st.info(f"🖼️ Using {Path(intro_to_use).name}, the intro closest to this video's aspect ratio")
+                elif video_is_vertical:
+                    st.warning("📱 Vertical video detected but no 9:16 intro available")
                 else:
-                    intro_to_use = INTRO_VIDEO
-                    if video_is_vertical:
-                        st.warning("📱 Vertical video detected but no 9:16 intro available")
-                    else:
-                        st.info("📺 Using 16:9 intro for horizontal video")
+                    st.info("📺 Using 16:9 intro for horizontal video")
                 
                 # Determine output path
                 if output_name:
@@ -664,10 +697,20 @@ def process_video_page():
                     _render_pipe(2)
                     # Process video
                     progress_bar = st.progress(0, text="Stitching intro...")
-                    stitch_intro(str(intro_to_use), str(temp_path), str(output_path), fade_duration)
+                    encoder_profile = get_encoder_profile_setting()
+                    rate_control = get_rate_control_setting()
+                    expected = estimate_output_size(str(intro_to_use), str(temp_path),
+                                                    encoder_profile, rate_control)
+                    if expected:
+                        st.caption(f"📏 Expected output size: up to {format_size(expected)}")
+                    stitch_intro(
+                        str(intro_to_use), str(temp_path), str(output_path), fade_duration,
+                        on_progress=lambda p: progress_bar.progress(
+                            p.fraction, text=f"Encoding: {format_progress(p)}"
+                        ),
+                        encoder_profile=encoder_profile, rate_control=rate_control
+                    )
                     _render_pipe(3)
-                    progress_bar.progress(80, text="Applying fade...")
-                    time.sleep(0.3)
                     _render_pipe(4)
                     progress_bar.progress(100, text="Complete!")
                     
@@ -679,6 +722,8 @@ def process_video_page():
                         'output': str(output_path),
                         'is_short': video_is_vertical,
                         'fade': fade_duration,
+                        'encoder_profile': encoder_profile,
+                        'rate_control': rate_control,
                     })
                     
                     # Offer download
@@ -760,7 +805,21 @@ def upload_video_page():
                 
                 output_filename = f"{Path(uploaded_file.name).stem}_with_intro.mp4"
                 output_path = OUTPUT_DIR / output_filename
-                stitch_intro(str(INTRO_VIDEO), str(temp_path), str(output_path))
+                def _on_progress(p):
+                    # Encoding fills the 30-50% span of the bar
+                    progress_bar.progress(30 + int(20 * p.fraction))
+                    status_text.text(f"Adding intro: {format_progress(p)}")
+                
+                encoder_profile = get_encoder_profile_setting()
+                rate_control = get_rate_control_setting()
+                intro_to_use = select_intro_for_video(str(temp_path), INTRO_VIDEO, INTRO_VIDEO_SHORT)
+                expected = estimate_output_size(str(intro_to_use), str(temp_path),
+                                                encoder_profile, rate_control)
+                if expected:
+                    st.caption(f"📏 Expected output size: up to {format_size(expected)}")
+                stitch_intro(str(intro_to_use), str(temp_path), str(output_path),
+                             on_progress=_on_progress, encoder_profile=encoder_profile,
+                             rate_control=rate_control)
                 
                 # Authenticate
                 status_text.text("Authenticating with YouTube...")
@@ -807,6 +866,8 @@ def upload_video_page():
                     'video_id': video_id,
                     'new_url': video_url,
                     'privacy': privacy,
+                    'encoder_profile': encoder_profile,
+                    'rate_control': rate_control,
                 })
                 
             except Exception as e:
@@ -816,20 +877,6 @@ def upload_video_page():
                     temp_path.unlink()
 
 
-def download_video(video_id, output_path):
-    """Download a video from YouTube using yt-dlp."""
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    cmd = [
-        sys.executable, '-m', 'yt_dlp',
-        '-f', 'best[height<=1080]',
-        '-o', str(output_path),
-        '--no-playlist',
-        url
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode == 0
-
-
 def list_videos_page():
     """Render the list videos page with selection and processing."""
     st.markdown('<span class="section-title">📺 My YouTube Videos</span>', unsafe_allow_html=True)
@@ -839,23 +886,43 @@ def list_videos_page():
         st.error(f"❌ Client secrets not found. Please add '{CLIENT_SECRETS_FILE}'")
         return
     
-    # Initialize session state for videos
+    # Initialize session state for videos from the local mirror (no API calls)
     if 'channel_videos' not in st.session_state:
-        st.session_state.channel_videos = []
+        with MetadataStore() as store:
+            st.session_state.channel_videos = store.videos()
     if 'selected_videos' not in st.session_state:
         st.session_state.selected_videos = []
     
     col1, col2 = st.columns([1, 1])
     with col1:
-        if st.button("🔄 Fetch My Videos", type="primary", width="stretch"):
-            with st.spinner("Authenticating and fetching videos..."):
+        if st.button("🔄 Sync My Videos", type="primary", width="stretch",
+                     help="Fetch uploads newer than the last sync and revalidate the rest"):
+            with st.spinner("Authenticating and syncing videos..."):
                 youtube = get_youtube_service()
                 
                 if youtube is None:
                     st.error("Failed to authenticate")
                     return
                 
-                videos = list_videos(youtube, max_results=50)
+                progress_text = st.empty()
+                
+                def _on_sync(stage, done, total):
+                    if stage == 'listing':
+                        progress_text.text(f"Listed {done} new videos...")
+                    elif stage == 'details':
+                        progress_text.text(f"Checking video details {done}/{total}...")
+                    else:
+                        progress_text.text(f"Indexing playlists {done}/{total}...")
+                
+                with MetadataStore() as store:
+                    try:
+                        stats = store.sync(youtube, on_progress=_on_sync)
+                    except Exception as e:
+                        stats = None
+                        st.warning(f"Sync incomplete, showing stored videos: {e}")
+                    videos = store.videos()
+                
+                progress_text.empty()
                 
                 if not videos:
                     st.markdown('''
@@ -866,43 +933,24 @@ def list_videos_page():
                     </div>''', unsafe_allow_html=True)
                     return
                 
-                # Enrich videos with details (is_short, playlists)
-                enriched_videos = []
-                progress_text = st.empty()
-                for i, video in enumerate(videos):
-                    video_id = video['snippet']['resourceId']['videoId']
-                    progress_text.text(f"Getting details for video {i+1}/{len(videos)}...")
-                    
-                    # Get video details to determine if it's a Short
-                    try:
-                        details = get_video_details(youtube, video_id)
-                        if details:
-                            video['is_short'] = details.get('is_short', False)
-                            video['duration_seconds'] = details.get('duration_seconds', 0)
-                        else:
-                            video['is_short'] = False
-                            video['duration_seconds'] = 0
-                    except Exception:
-                        video['is_short'] = False
-                        video['duration_seconds'] = 0
-                    
-                    # Get playlists this video belongs to
-                    try:
-                        playlists = get_video_playlists(youtube, video_id)
-                        video['playlists'] = playlists
-                    except Exception:
-                        video['playlists'] = []
-                    
-                    enriched_videos.append(video)
-                
-                progress_text.empty()
-                st.session_state.channel_videos = enriched_videos
+                st.session_state.channel_videos = videos
                 st.session_state.selected_videos = []
-                st.success(f"Found {len(enriched_videos)} videos")
+                if stats:
+                    st.success(
+                        f"{len(videos)} videos ({stats['new']} new, {stats['updated']} updated, "
+                        f"{stats['removed']} removed, {stats['unchanged']} unchanged; "
+                        f"playlists refreshed in {stats['playlist_calls']} API calls)"
+                    )
     
     with col2:
         num_selected = len(st.session_state.selected_videos)
         st.metric("Selected", num_selected)
+        with MetadataStore() as store:
+            last_synced = store.last_synced()
+        if last_synced:
+            st.caption(f"Last synced {datetime.fromtimestamp(last_synced):%Y-%m-%d %H:%M}")
+        if default_tracker.daily_limit:
+            st.caption(f"API quota today: {default_tracker.used:,} / {default_tracker.daily_limit:,} units")
     
     # Check for intro
     intro_available = os.path.exists(INTRO_VIDEO)
@@ -939,9 +987,30 @@ def list_videos_page():
                 )
             with col2:
                 reupload = st.checkbox("Re-upload to YouTube", value=True, key="reupload_check")
+                smart_render = st.checkbox(
+                    "Smart render",
+                    value=True,
+                    key="smart_render_check",
+                    help="Only re-encode the intro and fade region; stream-copy the rest of the video when possible"
+                )
+                pipeline = st.checkbox(
+                    "Overlap stages",
+                    value=True,
+                    key="pipeline_check",
+                    help="Download the next video and upload the previous one while stitching"
+                )
             with col3:
+                workers = st.number_input(
+                    "Parallel workers",
+                    min_value=0,
+                    max_value=get_cpu_count(),
+                    value=1,
+                    key="workers_input",
+                    help="Stitch several videos at once in separate processes (0 = size from CPU count)"
+                )
                 if st.button(f"🎬 Process {num_selected} Videos", type="primary", width="stretch", key="process_btn"):
-                    process_selected_videos(st.session_state.selected_videos, new_privacy, reupload)
+                    process_selected_videos(st.session_state.selected_videos, new_privacy, reupload,
+                                            smart_render, int(workers) or None, pipeline)
         elif num_selected == 0:
             st.info("👇 Select videos below to process them")
         else:
@@ -1020,7 +1089,118 @@ def list_videos_page():
             st.divider()
 
 
-def process_selected_videos(video_ids, privacy_status, reupload):
+def _prepare_selected_video(video_id, title, format_policy=None):
+    """
+    Download a selected video and pick the intro/thumbnail matching its orientation.
+    
+    Runs on pipeline worker threads, which can't read st.session_state, so
+    the format policy is passed in from the script thread.
+    """
+    download_path = DOWNLOAD_DIR / f"{video_id}.mp4"
+    
+    if not cached_download(video_id, download_path, format_policy=format_policy):
+        return None
+    
+    # Detect if downloaded video is vertical (for Shorts)
+    video_is_vertical = probe_video(str(download_path)).is_vertical
+    
+    # Select the intro closest to the video's aspect ratio (INTRO_VARIANTS included)
+    intro_to_use = select_intro_for_video(str(download_path), INTRO_VIDEO, INTRO_VIDEO_SHORT)
+    if intro_to_use == INTRO_VIDEO_SHORT:
+        thumbnail_to_use = INTRO_THUMBNAIL_SHORT if os.path.exists(INTRO_THUMBNAIL_SHORT) else INTRO_THUMBNAIL
+    else:
+        thumbnail_to_use = INTRO_THUMBNAIL
+    
+    return {
+        'download_path': download_path,
+        'output_path': OUTPUT_DIR / f"{video_id}_with_intro.mp4",
+        'is_vertical': video_is_vertical,
+        'intro': intro_to_use,
+        'thumbnail': thumbnail_to_use,
+    }
+
+
+def _publish_selected_video(youtube, video_id, info, prepared, smart, privacy_status, reupload, set_status,
+                            encoder_profile=None):
+    """Build the result for a stitched video, re-uploading it if requested."""
+    title = info['title']
+    description = info['description']
+    is_short = info['is_short']
+    playlist_index = PlaylistIndex()
+    original_playlists = playlist_index.playlists_for(video_id) or info['playlists']
+    video_is_vertical = prepared['is_vertical']
+    output_path = prepared['output_path']
+    thumbnail_to_use = prepared['thumbnail']
+    
+    result = {
+        'id': video_id, 
+        'title': title, 
+        'status': 'processed', 
+        'output': str(output_path),
+        'is_short': is_short or video_is_vertical,
+        'used_vertical_intro': prepared['intro'] == INTRO_VIDEO_SHORT,
+        'smart_render': smart
+    }
+    
+    # Re-upload if requested
+    if reupload and youtube:
+        set_status(f"Uploading: {title[:40]}...")
+        
+        # For Shorts, ensure #Shorts tag is in title if not already
+        upload_title = title
+        if (is_short or video_is_vertical) and '#shorts' not in title.lower():
+            upload_title = f"{title} #Shorts"
+        
+        response = upload_video(
+            youtube,
+            str(output_path),
+            upload_title,
+            description or f"Re-uploaded with intro. Original: https://youtu.be/{video_id}",
+            privacy_status=privacy_status
+        )
+        
+        new_video_id = response['id']
+        result['new_id'] = new_video_id
+        result['new_url'] = f"https://www.youtube.com/watch?v={new_video_id}"
+        result['status'] = 'uploaded'
+        
+        # Set thumbnail (use vertical thumbnail for Shorts if available)
+        if os.path.exists(thumbnail_to_use):
+            try:
+                set_thumbnail(youtube, new_video_id, thumbnail_to_use)
+                result['thumbnail'] = True
+            except:
+                result['thumbnail'] = False
+        
+        # Add to same playlists as original
+        if original_playlists:
+            set_status(f"Adding to playlists: {title[:40]}...")
+            added_playlists = []
+            for playlist in original_playlists:
+                try:
+                    add_video_to_playlist(youtube, new_video_id, playlist['id'])
+                    playlist_index.record_membership(new_video_id, playlist['id'])
+                    added_playlists.append(playlist['title'])
+                except Exception as e:
+                    pass  # Silently skip if can't add to playlist
+            if added_playlists:
+                playlist_index.save()
+            result['playlists_added'] = added_playlists
+    
+    # Log to history
+    event_type = 'upload' if result.get('status') == 'uploaded' else 'process'
+    add_history_event(event_type, title, {
+        'is_short': result.get('is_short', False),
+        'new_url': result.get('new_url'),
+        'new_id': result.get('new_id'),
+        'encoder_profile': encoder_profile,
+    })
+    
+    return result
+
+
+def process_selected_videos(video_ids, privacy_status, reupload, smart_render=False, workers=1,
+                            pipeline=False):
     """Process selected videos: download, add intro, optionally re-upload."""
     
     # Get video info from session state
@@ -1050,105 +1230,164 @@ def process_selected_videos(video_ids, privacy_status, reupload):
             st.error("Failed to authenticate with YouTube")
             return
     
-    for idx, video_id in enumerate(video_ids):
-        info = video_info.get(video_id, {'title': video_id, 'description': '', 'is_short': False, 'playlists': []})
-        title = info['title']
-        description = info['description']
-        is_short = info['is_short']
-        original_playlists = info['playlists']
-        
-        status_text.text(f"Processing {idx + 1}/{total}: {title[:40]}...")
-        progress_bar.progress((idx) / total)
-        
-        try:
-            # Download
-            download_path = DOWNLOAD_DIR / f"{video_id}.mp4"
+    def _info(video_id):
+        return video_info.get(video_id, {'title': video_id, 'description': '', 'is_short': False, 'playlists': []})
+    
+    encoder_profile = get_encoder_profile_setting()
+    rate_control = get_rate_control_setting()
+    format_policy = get_format_policy_setting()
+    
+    # Set once today's quota can't cover a re-upload, so no more videos are
+    # downloaded and stitched just to fail at the upload
+    quota_stop = threading.Event()
+    
+    def _check_upload_quota(video_id):
+        if not reupload:
+            return
+        cost = reupload_cost(thumbnail=os.path.exists(INTRO_THUMBNAIL) or os.path.exists(INTRO_THUMBNAIL_SHORT),
+                             playlists=len(_info(video_id)['playlists']))
+        if quota_stop.is_set() or not default_tracker.can_afford(cost):
+            quota_stop.set()
+            raise QuotaExceededError("Today's API quota can't cover another upload")
+    
+    def _quota_skipped(video_id, error):
+        return {'id': video_id, 'title': _info(video_id)['title'], 'status': 'quota_exceeded', 'error': error}
+    
+    if workers == 1 and not pipeline:
+        for idx, video_id in enumerate(video_ids):
+            title = _info(video_id)['title']
+            
+            status_text.text(f"Processing {idx + 1}/{total}: {title[:40]}...")
+            progress_bar.progress((idx) / total)
             
-            if not download_path.exists():
+            try:
+                _check_upload_quota(video_id)
+                
+                # Download
                 status_text.text(f"Downloading: {title[:40]}...")
-                if not download_video(video_id, download_path):
+                prepared = _prepare_selected_video(video_id, title, format_policy)
+                if prepared is None:
                     results.append({'id': video_id, 'title': title, 'status': 'download_failed'})
                     continue
-            
-            # Detect if downloaded video is vertical (for Shorts)
-            video_is_vertical = is_vertical_video(str(download_path))
-            
-            # Select appropriate intro based on video orientation
-            if video_is_vertical and os.path.exists(INTRO_VIDEO_SHORT):
-                intro_to_use = INTRO_VIDEO_SHORT
-                thumbnail_to_use = INTRO_THUMBNAIL_SHORT if os.path.exists(INTRO_THUMBNAIL_SHORT) else INTRO_THUMBNAIL
-            else:
-                intro_to_use = INTRO_VIDEO
-                thumbnail_to_use = INTRO_THUMBNAIL
-            
-            # Add intro
-            status_text.text(f"Adding intro: {title[:40]}...")
-            output_path = OUTPUT_DIR / f"{video_id}_with_intro.mp4"
-            stitch_intro(str(intro_to_use), str(download_path), str(output_path))
-            
-            result = {
-                'id': video_id, 
-                'title': title, 
-                'status': 'processed', 
-                'output': str(output_path),
-                'is_short': is_short or video_is_vertical,
-                'used_vertical_intro': video_is_vertical and os.path.exists(INTRO_VIDEO_SHORT)
-            }
-            
-            # Re-upload if requested
-            if reupload and youtube:
-                status_text.text(f"Uploading: {title[:40]}...")
-                
-                # For Shorts, ensure #Shorts tag is in title if not already
-                upload_title = title
-                if (is_short or video_is_vertical) and '#shorts' not in title.lower():
-                    upload_title = f"{title} #Shorts"
                 
-                response = upload_video(
-                    youtube,
-                    str(output_path),
-                    upload_title,
-                    description or f"Re-uploaded with intro. Original: https://youtu.be/{video_id}",
-                    privacy_status=privacy_status
-                )
+                # Add intro
+                status_text.text(f"Adding intro: {title[:40]}...")
+                def _on_progress(p, idx=idx, title=title):
+                    progress_bar.progress(min((idx + p.fraction) / total, 1.0))
+                    status_text.text(f"Adding intro: {title[:40]} · {format_progress(p)}")
                 
-                new_video_id = response['id']
-                result['new_id'] = new_video_id
-                result['new_url'] = f"https://www.youtube.com/watch?v={new_video_id}"
-                result['status'] = 'uploaded'
+                with track_peak_rss() as rss:
+                    smart = stitch_intro(str(prepared['intro']), str(prepared['download_path']),
+                                         str(prepared['output_path']), smart_render=smart_render,
+                                         on_progress=_on_progress, encoder_profile=encoder_profile,
+                                         rate_control=rate_control)
                 
-                # Set thumbnail (use vertical thumbnail for Shorts if available)
-                if os.path.exists(thumbnail_to_use):
-                    try:
-                        set_thumbnail(youtube, new_video_id, thumbnail_to_use)
-                        result['thumbnail'] = True
-                    except:
-                        result['thumbnail'] = False
+                result = _publish_selected_video(
+                    youtube, video_id, _info(video_id), prepared, smart,
+                    privacy_status, reupload, status_text.text, encoder_profile
+                )
+                result['peak_rss'] = rss.peak
+                results.append(result)
                 
-                # Add to same playlists as original
-                if original_playlists:
-                    status_text.text(f"Adding to playlists: {title[:40]}...")
-                    added_playlists = []
-                    for playlist in original_playlists:
-                        try:
-                            add_video_to_playlist(youtube, new_video_id, playlist['id'])
-                            added_playlists.append(playlist['title'])
-                        except Exception as e:
-                            pass  # Silently skip if can't add to playlist
-                    result['playlists_added'] = added_playlists
-            
-            results.append(result)
-            
-            # Log to history
-            event_type = 'upload' if result.get('status') == 'uploaded' else 'process'
-            add_history_event(event_type, title, {
-                'is_short': result.get('is_short', False),
-                'new_url': result.get('new_url'),
-                'new_id': result.get('new_id'),
-            })
-            
-        except Exception as e:
-            results.append({'id': video_id, 'title': title, 'status': 'error', 'error': str(e)})
+            except QuotaExceededError as e:
+                results.extend(_quota_skipped(vid, str(e)) for vid in video_ids[idx:])
+                break
+            except Exception as e:
+                results.append({'id': video_id, 'title': title, 'status': 'error', 'error': str(e)})
+    else:
+        # Overlap stages: download the next video and upload the previous one while stitching
+        pool_size, threads = plan_workers(len(video_ids), max_workers=workers, encoder_profile=encoder_profile)
+        
+        def _admitted(video_ids):
+            for video_id in video_ids:
+                if quota_stop.is_set():
+                    return
+                yield video_id
+        
+        def _download_stage(job):
+            video_id = job['item']
+            try:
+                _check_upload_quota(video_id)
+            except QuotaExceededError:
+                job['quota_exceeded'] = True
+                raise
+            job['prepared'] = _prepare_selected_video(video_id, _info(video_id)['title'], format_policy)
+            if job['prepared'] is None:
+                raise RuntimeError('download_failed')
+            return job
+        
+        def _stitch_stage(job):
+            prepared = job['prepared']
+            job_result = run_pooled_stitch_job(pool, {
+                'id': job['item'],
+                'intro_path': str(prepared['intro']),
+                'main_path': str(prepared['download_path']),
+                'output_path': str(prepared['output_path']),
+                'smart_render': smart_render,
+                'encoder_profile': encoder_profile,
+                'rate_control': rate_control,
+            }, threads, on_progress=job['report_progress'])
+            if job_result['status'] != 'success':
+                raise RuntimeError(job_result['error'])
+            job['smart_render'] = job_result['smart_render']
+            job['peak_rss'] = job_result['peak_rss']
+            return job
+        
+        def _upload_stage(job):
+            # Worker threads can't draw to the page; progress comes from pipeline events
+            try:
+                job['result'] = _publish_selected_video(
+                    youtube, job['item'], _info(job['item']), job['prepared'],
+                    job['smart_render'], privacy_status, reupload, lambda message: None, encoder_profile
+                )
+            except QuotaExceededError:
+                quota_stop.set()
+                job['quota_exceeded'] = True
+                raise
+            job['result']['peak_rss'] = job['peak_rss']
+            return job
+        
+        stages = [
+            PipelineStage('download', _download_stage, workers=DOWNLOAD_WORKERS),
+            PipelineStage('stitch', _stitch_stage, workers=pool_size),
+            PipelineStage('upload', _upload_stage, workers=1, queue_size=2),
+        ]
+        finished = {'count': 0}
+        encoding = {}
+        
+        def _on_event(event, stage, job):
+            title = _info(job['item'])['title'][:40]
+            if event == 'started':
+                status_text.text(f"{stage.capitalize()}: {title}...")
+                return
+            if event == 'progress':
+                encoding[job['item']] = job['progress'].fraction
+                status_text.text(f"Stitch: {title} · {format_progress(job['progress'])}")
+            else:
+                encoding.pop(job['item'], None)
+                # Failed jobs skip their remaining stages
+                finished['count'] += 1 if event == 'finished' else len(stages) - [s.name for s in stages].index(stage)
+            done = finished['count'] + sum(encoding.values())
+            progress_bar.progress(min(done / (total * len(stages)), 1.0))
+        
+        status_text.text(f"Processing {total} videos ({pool_size} stitch workers x {threads} threads)...")
+        with create_stitch_pool(pool_size) as pool:
+            jobs = run_pipeline(_admitted(video_ids), stages, on_event=_on_event)
+        
+        for job in jobs:
+            video_id = job['item']
+            title = _info(video_id)['title']
+            if job['status'] == 'success':
+                results.append(job['result'])
+            elif job.get('quota_exceeded'):
+                results.append(_quota_skipped(video_id, job['error']))
+            elif job.get('error') == 'download_failed':
+                results.append({'id': video_id, 'title': title, 'status': 'download_failed'})
+            else:
+                results.append({'id': video_id, 'title': title, 'status': 'error', 'error': job['error']})
+        started = {job['item'] for job in jobs}
+        results.extend(_quota_skipped(video_id, "Today's API quota can't cover another upload")
+                       for video_id in video_ids if video_id not in started)
     
     progress_bar.progress(1.0)
     status_text.text("Complete!")
@@ -1174,11 +1413,12 @@ def process_selected_videos(video_ids, privacy_status, reupload):
                 playlists_info = ""
                 if r.get('playlists_added'):
                     playlists_info = f" (Added to: {', '.join(r['playlists_added'])})"
+                memory_info = f" · peak memory {format_size(r['peak_rss'])}" if r.get('peak_rss') else ""
                 
                 if 'new_url' in r:
-                    st.markdown(f"- **{r['title'][:50]}**{short_badge} → [New Video]({r['new_url']}){playlists_info}")
+                    st.markdown(f"- **{r['title'][:50]}**{short_badge} → [New Video]({r['new_url']}){playlists_info}{memory_info}")
                 else:
-                    st.markdown(f"- **{r['title'][:50]}**{short_badge} → Saved to {r.get('output', 'output/')}")
+                    st.markdown(f"- **{r['title'][:50]}**{short_badge} → Saved to {r.get('output', 'output/')}{memory_info}")
         
         if failed:
             st.error("Failed:")
@@ -1310,7 +1550,10 @@ def settings_page():
             'client_secrets': CLIENT_SECRETS_FILE,
             'default_privacy': 'private',
             'auto_cleanup': False,
-            'fade_duration': 0.5
+            'fade_duration': 0.5,
+            'encoder_profile': DEFAULT_ENCODER_PROFILE,
+            'rate_control': DEFAULT_RATE_CONTROL,
+            'format_policy': DEFAULT_FORMAT_POLICY
         }
     
     # Tabs for different settings sections
@@ -1422,6 +1665,37 @@ def settings_page():
                 help="Automatically delete processed files after successful upload",
                 key="settings_auto_cleanup"
             )
+            
+            profile_names = list(ENCODER_PROFILES)
+            current_profile = st.session_state.app_settings.get('encoder_profile', DEFAULT_ENCODER_PROFILE)
+            encoder_profile = st.selectbox(
+                "Encoder Profile",
+                profile_names,
+                index=profile_names.index(current_profile) if current_profile in profile_names else 0,
+                help="draft: fastest, largest files · fast-upload: quick encodes for YouTube · "
+                     "balanced: default quality/speed · archive: slow, highest quality",
+                key="settings_encoder_profile"
+            )
+            
+            current_rate_control = st.session_state.app_settings.get('rate_control', DEFAULT_RATE_CONTROL)
+            rate_control = st.selectbox(
+                "Rate Control",
+                list(RATE_CONTROL_MODES),
+                index=RATE_CONTROL_MODES.index(current_rate_control) if current_rate_control in RATE_CONTROL_MODES else 0,
+                help="crf: quality-based, size follows the content · "
+                     "capped: never exceed the source video's bitrate",
+                key="settings_rate_control"
+            )
+            
+            policy_names = list(FORMAT_POLICIES)
+            current_policy = st.session_state.app_settings.get('format_policy', DEFAULT_FORMAT_POLICY)
+            format_policy = st.selectbox(
+                "Download Format",
+                policy_names,
+                index=policy_names.index(current_policy) if current_policy in policy_names else 0,
+                help=" · ".join(f"{name}: {policy.description}" for name, policy in FORMAT_POLICIES.items()),
+                key="settings_format_policy"
+            )
     
     with settings_tab3:
         st.subheader("Import/Export Configuration")
@@ -1442,7 +1716,10 @@ def settings_page():
                 'client_secrets': st.session_state.app_settings['client_secrets'],
                 'default_privacy': st.session_state.app_settings['default_privacy'],
                 'auto_cleanup': st.session_state.app_settings['auto_cleanup'],
-                'fade_duration': st.session_state.app_settings['fade_duration']
+                'fade_duration': st.session_state.app_settings['fade_duration'],
+                'encoder_profile': st.session_state.app_settings.get('encoder_profile', DEFAULT_ENCODER_PROFILE),
+                'rate_control': st.session_state.app_settings.get('rate_control', DEFAULT_RATE_CONTROL),
+                'format_policy': st.session_state.app_settings.get('format_policy', DEFAULT_FORMAT_POLICY)
             }
             
             import json
@@ -1468,6 +1745,9 @@ DOWNLOAD_DIR={export_config['download_dir']}
 DEFAULT_PRIVACY={export_config['default_privacy']}
 AUTO_CLEANUP={str(export_config['auto_cleanup']).lower()}
 FADE_DURATION={export_config['fade_duration']}
+ENCODER_PROFILE={export_config['encoder_profile']}
+RATE_CONTROL={export_config['rate_control']}
+DOWNLOAD_FORMAT_POLICY={export_config['format_policy']}
 """
             
             st.download_button(
@@ -1518,7 +1798,10 @@ FADE_DURATION={export_config['fade_duration']}
                                     'download_dir': 'download_dir',
                                     'default_privacy': 'default_privacy',
                                     'auto_cleanup': 'auto_cleanup',
-                                    'fade_duration': 'fade_duration'
+                                    'fade_duration': 'fade_duration',
+                                    'encoder_profile': 'encoder_profile',
+                                    'rate_control': 'rate_control',
+                                    'download_format_policy': 'format_policy'
                                 }
                                 
                                 if key in key_map:
@@ -1553,7 +1836,10 @@ FADE_DURATION={export_config['fade_duration']}
                 'client_secrets': st.session_state.get('settings_client_secrets', CLIENT_SECRETS_FILE),
                 'default_privacy': st.session_state.get('settings_default_privacy', 'private'),
                 'auto_cleanup': st.session_state.get('settings_auto_cleanup', False),
-                'fade_duration': st.session_state.get('settings_fade_duration', 0.5)
+                'fade_duration': st.session_state.get('settings_fade_duration', 0.5),
+                'encoder_profile': st.session_state.get('settings_encoder_profile', DEFAULT_ENCODER_PROFILE),
+                'rate_control': st.session_state.get('settings_rate_control', DEFAULT_RATE_CONTROL),
+                'format_policy': st.session_state.get('settings_format_policy', DEFAULT_FORMAT_POLICY)
             })
             st.success("✓ Settings saved for this session!")
             st.info("💡 To make settings permanent, export and save as .env file in the project folder.")
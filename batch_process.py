@@ -6,15 +6,26 @@ Downloads videos, adds intro, and re-uploads to YouTube
 
 import os
 import sys
-import subprocess
-import json
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
 from yt_automation.auth import get_service
-from yt_automation.editor import stitch_intro
+from yt_automation.editor import STITCH_BACKENDS, select_intro_for_video, stitch_intro
+from yt_automation.encoder_profiles import ENCODER_PROFILES
+from yt_automation.format_policy import FORMAT_POLICIES
+from yt_automation.rate_control import RATE_CONTROL_MODES, estimate_output_size
+from yt_automation.download_cache import cached_download
+from yt_automation.downloader import DOWNLOAD_WORKERS, cli_download_progress, get_download_manager
+from yt_automation.batch_engine import get_cpu_count, plan_workers, create_stitch_pool, run_pooled_stitch_job
+from yt_automation.memory import track_peak_rss
+from yt_automation.pipeline import PipelineStage, run_pipeline
+from yt_automation.playlist import duration_filter, iter_playlist_videos, title_filter
+from yt_automation.quota import QuotaExceededError, default_tracker
+from yt_automation.backfill import Backfill, plan_backfill, reupload_cost
+from yt_automation.progress import cli_progress, format_progress
 from yt_automation.youtube_ops import upload_video, set_thumbnail
-from yt_automation.storage import check_storage_warning, cleanup_processed_videos, storage_status
+from yt_automation.storage import check_storage_warning, cleanup_processed_videos, format_size, storage_status
 
 # Load environment variables
 load_dotenv()
@@ -25,6 +36,7 @@ SCOPES = ['https://www.googleapis.com/auth/youtube.upload',
           'https://www.googleapis.com/auth/youtube']
 CLIENT_SECRETS_FILE = os.getenv('CLIENT_SECRETS_FILE', 'client_secrets.json')
 INTRO_VIDEO = os.getenv('INTRO_VIDEO', 'intro.mp4')
+INTRO_VIDEO_SHORT = os.getenv('INTRO_VIDEO_SHORT', 'intro_short.mp4')
 INTRO_THUMBNAIL = os.getenv('INTRO_THUMBNAIL', 'intro.jpg')
 DOWNLOAD_DIR = Path('downloads')
 OUTPUT_DIR = Path('output')
@@ -36,88 +48,354 @@ def ensure_directories():
     OUTPUT_DIR.mkdir(exist_ok=True)
 
 
-def get_playlist_videos(playlist_url, limit=None):
+def get_playlist_videos(playlist_url, limit=None, filters=None):
     """
     Get video metadata from a YouTube playlist.
     
+    Waits for the listing to finish; process_batch streams it with
+    iter_playlist_videos instead.
+    
     Args:
         playlist_url: URL of the YouTube playlist
         limit: Maximum number of videos to retrieve
+        filters: Optional callables taking a video dict and returning True to keep it
         
     Returns:
         List of video dictionaries with id, title, description
     """
-    cmd = [
-        sys.executable, '-m', 'yt_dlp',
-        '--flat-playlist',
-        '--print', '%(id)s',
-        '--print', '%(title)s',
-        '--print', '%(description)s',
-        '--print', '---END---',
-        playlist_url
-    ]
+    return list(iter_playlist_videos(playlist_url, limit, filters))
+
+
+def fetch_video(video, format_policy=None):
+    """
+    Download a playlist video unless it is already cached.
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    lines = result.stdout.strip().split('\n')
-    
-    videos = []
-    i = 0
-    while i < len(lines):
-        if i + 3 < len(lines):
-            video_id = lines[i].strip()
-            title = lines[i + 1].strip()
-            description = lines[i + 2].strip() if lines[i + 2].strip() != 'NA' else ''
-            
-            # Skip private/unavailable videos
-            if video_id and title and '[Private video]' not in title and '[Unavailable]' not in title:
-                videos.append({
-                    'id': video_id,
-                    'title': title,
-                    'description': description
-                })
-            i += 4  # Move past ---END---
-        else:
-            break
+    Args:
+        video: Video dict with id, title, description
+        format_policy: Download format policy (None uses DOWNLOAD_FORMAT_POLICY)
+        
+    Returns:
+        Path to the downloaded file, or None if the download failed
+    """
+    download_path = DOWNLOAD_DIR / f"{video['id']}.mp4"
+    print(f"⬇️  Downloading...")
     
-    # Remove duplicates based on video ID
-    seen_ids = set()
-    unique_videos = []
-    for v in videos:
-        if v['id'] not in seen_ids:
-            seen_ids.add(v['id'])
-            unique_videos.append(v)
+    result = cached_download(video['id'], download_path, on_progress=cli_download_progress("   "),
+                             format_policy=format_policy)
+    if not result:
+        print(f"❌ Failed to download video {video['id']}: {result.error}")
+        return None
+    if result.cached:
+        print(f"   (Using verified cached download)")
     
-    if limit:
-        unique_videos = unique_videos[:limit]
+    print(f"✓ Downloaded: {download_path}")
+    return download_path
+
+
+def upload_cost():
+    """Quota units one re-upload costs (the upload plus the thumbnail, if there is one)."""
+    return reupload_cost(thumbnail=os.path.exists(INTRO_THUMBNAIL))
+
+
+def print_quota_wait(resets_at):
+    """Tell the user the batch is paused until the quota resets."""
+    print(f"⏸️  Daily API quota used up; waiting for the reset at "
+          f"{resets_at.astimezone():%Y-%m-%d %H:%M} (local time)...")
+
+
+def check_upload_quota(backfill=None):
+    """
+    Make sure today's quota still covers an upload before working on a video.
     
-    return unique_videos
+    Backfills wait for the reset at upload time instead, so they always pass.
+    
+    Raises:
+        QuotaExceededError: If the quota can't cover another upload today
+    """
+    if backfill is None and not default_tracker.can_afford(upload_cost()):
+        raise QuotaExceededError("Today's API quota can't cover another upload "
+                                 "(use --backfill to continue after the reset)")
 
 
-def download_video(video_id, output_path):
+def upload_processed_video(youtube, video, output_path, privacy_status, backfill=None):
     """
-    Download a video from YouTube.
+    Upload a stitched video and set its thumbnail.
     
     Args:
-        video_id: YouTube video ID
-        output_path: Path to save the downloaded video
+        youtube: YouTube API service object
+        video: Video dict with id, title, description
+        output_path: Path to the stitched video
+        privacy_status: Privacy status for the upload
+        backfill: Optional Backfill; the upload then waits for the quota to
+                  reset instead of failing, and the video is marked done
         
     Returns:
-        True if successful, False otherwise
+        Result dict for the batch summary
+    """
+    video_id = video['id']
+    description = video['description'] or f"Re-uploaded with intro. Original: https://youtu.be/{video_id}"
+    print(f"⬆️  Uploading to YouTube (privacy: {privacy_status})...")
+    
+    try:
+        while True:
+            if backfill is not None:
+                backfill.wait_for_quota(upload_cost(), on_wait=print_quota_wait)
+            try:
+                response = upload_video(
+                    youtube,
+                    str(output_path),
+                    video['title'],
+                    description,
+                    privacy_status=privacy_status
+                )
+                break
+            except QuotaExceededError:
+                if backfill is None:
+                    raise
+                backfill.quota_refused(on_wait=print_quota_wait)
+        
+        new_video_id = response['id']
+        new_url = f"https://www.youtube.com/watch?v={new_video_id}"
+        print(f"✓ Uploaded successfully!")
+        print(f"   New URL: {new_url}")
+        
+        # Set thumbnail if available
+        if os.path.exists(INTRO_THUMBNAIL):
+            print(f"🖼️  Setting thumbnail...")
+            try:
+                set_thumbnail(youtube, new_video_id, INTRO_THUMBNAIL)
+                print(f"✓ Thumbnail set")
+            except Exception as thumb_error:
+                print(f"⚠️  Warning: Could not set thumbnail: {thumb_error}")
+        
+        if backfill is not None:
+            backfill.mark_done(video_id)
+        
+        return {
+            'video': video,
+            'status': 'success',
+            'new_id': new_video_id,
+            'new_url': new_url
+        }
+        
+    except Exception as e:
+        print(f"❌ Failed to upload: {e}")
+        status = 'quota_exceeded' if isinstance(e, QuotaExceededError) else 'upload_failed'
+        return {'video': video, 'status': status, 'error': str(e)}
+
+
+def process_sequential(videos, youtube, privacy_status, smart_render=False, segment_workers=1,
+                       backend=None, encoder_profile=None, rate_control=None, format_policy=None,
+                       backfill=None):
+    """
+    Download, stitch and upload each video in turn.
+    
+    Args:
+        videos: Iterable of video dicts (may still be being listed)
+        youtube: YouTube API service object
+        privacy_status: Privacy status for uploaded videos
+        smart_render: Only re-encode the intro and fade region when possible
+        segment_workers: Encode long videos as this many parallel segments
+        backend: Stitch backend ('moviepy' or 'ffmpeg', None uses STITCH_BACKEND)
+        encoder_profile: Encoder profile name (None uses ENCODER_PROFILE)
+        rate_control: 'crf' or 'capped' (None uses RATE_CONTROL)
+        format_policy: Download format policy (None uses DOWNLOAD_FORMAT_POLICY)
+        backfill: Optional Backfill to wait for quota resets in and record progress to
+        
+    Returns:
+        List of result dicts
+    """
+    results = []
+    for i, video in enumerate(videos, 1):
+        print(f"\n{'='*60}")
+        total = f"/{len(videos)}" if isinstance(videos, list) else ""
+        print(f"Processing video {i}{total}: {video['title'][:40]}...")
+        print("=" * 60)
+        
+        # Don't download and stitch a video that can't be uploaded today
+        try:
+            check_upload_quota(backfill)
+        except QuotaExceededError as e:
+            print(f"❌ {e}")
+            results.append({'video': video, 'status': 'quota_exceeded', 'error': str(e)})
+            break
+        
+        download_path = fetch_video(video, format_policy)
+        if download_path is None:
+            results.append({'video': video, 'status': 'download_failed'})
+            continue
+        
+        # Add intro
+        output_path = OUTPUT_DIR / f"{video['id']}_with_intro.mp4"
+        print(f"🎬 Adding intro...")
+        
+        try:
+            intro_path = select_intro_for_video(str(download_path), INTRO_VIDEO, INTRO_VIDEO_SHORT)
+            expected = estimate_output_size(intro_path, str(download_path), encoder_profile, rate_control)
+            if expected:
+                print(f"   Expected output size: up to {format_size(expected)}")
+            with track_peak_rss() as rss:
+                smart = stitch_intro(str(intro_path), str(download_path), str(output_path),
+                                     smart_render=smart_render, segment_workers=segment_workers,
+                                     on_progress=cli_progress("   "), backend=backend,
+                                     encoder_profile=encoder_profile, rate_control=rate_control)
+            print(f"✓ Intro added: {output_path}{' (smart render)' if smart else ''}")
+            if rss.peak:
+                print(f"   Peak memory: {format_size(rss.peak)}")
+        except Exception as e:
+            print(f"❌ Failed to add intro: {e}")
+            results.append({'video': video, 'status': 'processing_failed', 'error': str(e)})
+            continue
+        
+        results.append(upload_processed_video(youtube, video, output_path, privacy_status, backfill))
+    
+    return results
+
+
+def process_pipelined(videos, youtube, privacy_status, smart_render=False, workers=None,
+                      download_workers=None, upload_workers=1, segment_workers=1, backend=None,
+                      encoder_profile=None, rate_control=None, format_policy=None, backfill=None):
     """
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    cmd = [
-        sys.executable, '-m', 'yt_dlp',
-        '-f', 'best[height<=1080]',
-        '-o', str(output_path),
-        '--no-playlist',
-        url
+    Overlap downloading, stitching and uploading across videos.
+    
+    Video N+1 downloads while video N is stitched and video N-1 uploads.
+    Downloads wait while the stitch queue is full, so finished downloads
+    never pile up on disk faster than they can be encoded.
+    
+    Args:
+        videos: Iterable of video dicts
+        youtube: YouTube API service object
+        privacy_status: Privacy status for uploaded videos
+        smart_render: Only re-encode the intro and fade region when possible
+        workers: Maximum stitch worker processes (None sizes the pool from the CPU count)
+        download_workers: Concurrent downloads (None uses DOWNLOAD_WORKERS)
+        upload_workers: Concurrent uploads
+        segment_workers: Encode long videos as this many parallel segments
+        backend: Stitch backend ('moviepy' or 'ffmpeg', None uses STITCH_BACKEND)
+        encoder_profile: Encoder profile name (None uses ENCODER_PROFILE)
+        rate_control: 'crf' or 'capped' (None uses RATE_CONTROL)
+        format_policy: Download format policy (None uses DOWNLOAD_FORMAT_POLICY)
+        backfill: Optional Backfill to wait for quota resets in and record progress to
+        
+    Returns:
+        List of result dicts
+    """
+    download_workers = download_workers or DOWNLOAD_WORKERS
+    
+    # The batch size may not be known yet, so plan for a full machine
+    stitch_workers, threads = plan_workers(workers or get_cpu_count(), max_workers=workers,
+                                           encoder_profile=encoder_profile)
+    print(f"\n🔀 Pipeline: {download_workers} download / {stitch_workers} stitch "
+          f"(x{threads} threads) / {upload_workers} upload workers\n")
+    
+    # Set once an upload can't be afforded; the listing stops feeding new videos
+    quota_stop = threading.Event()
+    
+    def admitted(videos):
+        for video in videos:
+            if quota_stop.is_set():
+                return
+            yield video
+    
+    def download_stage(job):
+        video = job['item']
+        try:
+            check_upload_quota(backfill)
+        except QuotaExceededError:
+            job['quota_exceeded'] = True
+            quota_stop.set()
+            raise
+        download_path = DOWNLOAD_DIR / f"{video['id']}.mp4"
+        result = cached_download(video['id'], download_path, format_policy=format_policy)
+        if not result:
+            raise RuntimeError(f"Failed to download video {video['id']}: {result.error}")
+        job['download_path'] = download_path
+        return job
+    
+    def stitch_stage(job):
+        video = job['item']
+        intro_path = select_intro_for_video(str(job['download_path']), INTRO_VIDEO, INTRO_VIDEO_SHORT)
+        expected = estimate_output_size(intro_path, str(job['download_path']), encoder_profile, rate_control)
+        if expected:
+            print(f"📏 {video['title'][:40]}: expected output size up to {format_size(expected)}")
+        stitch_job = {
+            'id': video['id'],
+            'intro_path': str(intro_path),
+            'main_path': str(job['download_path']),
+            'output_path': str(OUTPUT_DIR / f"{video['id']}_with_intro.mp4"),
+            'smart_render': smart_render,
+            'segment_workers': segment_workers,
+            'backend': backend,
+            'encoder_profile': encoder_profile,
+            'rate_control': rate_control,
+        }
+        job_result = run_pooled_stitch_job(pool, stitch_job, threads,
+                                           on_progress=job['report_progress'])
+        if job_result['status'] != 'success':
+            raise RuntimeError(job_result['error'])
+        job['output_path'] = job_result['output']
+        job['smart_render'] = job_result['smart_render']
+        job['peak_rss'] = job_result['peak_rss']
+        return job
+    
+    def upload_stage(job):
+        job['result'] = upload_processed_video(youtube, job['item'], job['output_path'], privacy_status,
+                                               backfill)
+        if job['result']['status'] == 'quota_exceeded':
+            quota_stop.set()
+        if job['result']['status'] != 'success':
+            raise RuntimeError(job['result'].get('error', 'upload failed'))
+        return job
+    
+    icons = {'download': '⬇️ ', 'stitch': '🎬', 'upload': '⬆️ '}
+    
+    def report(event, stage, job):
+        title = job['item']['title'][:40]
+        if event == 'progress':
+            # Several encodes share the terminal, so print a line per 25% step
+            step = int(job['progress'].fraction * 4)
+            if step > job.get('progress_step', 0) and not job['progress'].done:
+                job['progress_step'] = step
+                print(f"   {title}: {format_progress(job['progress'])}")
+        elif event == 'started':
+            print(f"{icons[stage]} {stage.capitalize()}: {title}...")
+        elif event == 'finished' and stage == 'stitch':
+            print(f"✓ Intro added: {title}{' (smart render)' if job.get('smart_render') else ''}")
+            if job.get('peak_rss'):
+                print(f"   Peak memory: {format_size(job['peak_rss'])}")
+        elif event == 'failed' and job.get('quota_exceeded'):
+            print(f"⏸️  Skipped {title}: {job['error']}")
+        elif event == 'failed':
+            print(f"❌ {stage.capitalize()} failed for {title}: {job['error']}")
+    
+    stages = [
+        PipelineStage('download', download_stage, workers=download_workers),
+        PipelineStage('stitch', stitch_stage, workers=stitch_workers),
+        PipelineStage('upload', upload_stage, workers=upload_workers, queue_size=2),
     ]
+    with create_stitch_pool(stitch_workers) as pool:
+        jobs = run_pipeline(admitted(videos), stages, on_event=report)
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode == 0
+    status_map = {'download_failed': 'download_failed', 'stitch_failed': 'processing_failed'}
+    results = []
+    for job in jobs:
+        if 'result' in job:
+            results.append(job['result'])
+        elif job.get('quota_exceeded'):
+            results.append({'video': job['item'], 'status': 'quota_exceeded', 'error': job.get('error')})
+        else:
+            results.append({
+                'video': job['item'],
+                'status': status_map.get(job['status'], job['status']),
+                'error': job.get('error')
+            })
+    return results
 
 
-def process_batch(playlist_url, limit=6, privacy_status='private'):
+def process_batch(playlist_url, limit=6, privacy_status='private', smart_render=False, workers=1,
+                  pipeline=False, segment_workers=1, backend=None, encoder_profile=None,
+                  rate_control=None, download_workers=None, bandwidth_limit=None, format_policy=None,
+                  filters=None, backfill=None):
     """
     Process a batch of videos from a playlist.
     
@@ -125,12 +403,39 @@ def process_batch(playlist_url, limit=6, privacy_status='private'):
         playlist_url: URL of the YouTube playlist
         limit: Number of videos to process
         privacy_status: Privacy status for uploaded videos
+        smart_render: Only re-encode the intro and fade region when possible
+        workers: Stitch videos in a process pool of up to this many workers
+                 (None sizes the pool from the CPU count)
+        pipeline: Overlap downloads, stitching and uploads. Always on when
+                  workers is not 1; otherwise videos are processed one by one.
+        segment_workers: Split videos longer than SEGMENT_PARALLEL_MIN_DURATION
+                         into this many segments encoded in parallel
+                         (None sizes it from the CPU count)
+        backend: Stitch backend, 'moviepy' or 'ffmpeg' (None uses the
+                 STITCH_BACKEND env var)
+        encoder_profile: 'draft', 'fast-upload', 'balanced' or 'archive'
+                         (None uses the ENCODER_PROFILE env var)
+        rate_control: 'crf', or 'capped' to cap each output's bitrate at its
+                      source's (None uses the RATE_CONTROL env var)
+        download_workers: Videos downloaded at once in pipelined mode
+                          (None uses the DOWNLOAD_WORKERS env var)
+        bandwidth_limit: Combined download bandwidth, e.g. '20M' bytes/s
+                         (None uses the DOWNLOAD_BANDWIDTH_LIMIT env var)
+        format_policy: 'compatible' (H.264 + AAC, stream-copy friendly), 'best'
+                       or 'progressive' (None uses the DOWNLOAD_FORMAT_POLICY env var)
+        filters: Optional callables taking a playlist video dict and returning
+                 True to process it (see yt_automation.playlist)
+        backfill: Name of a backfill to spread the batch over several days of
+                  API quota; videos it already re-uploaded are skipped, and
+                  uploads wait for the daily reset instead of failing
     """
     print("=" * 60)
     print("ClipStream - Batch Video Processor")
     print("=" * 60 + "\n")
     
     ensure_directories()
+    if bandwidth_limit:
+        get_download_manager().set_bandwidth_limit(bandwidth_limit)
     
     # Check storage status at start
     storage_status([OUTPUT_DIR, DOWNLOAD_DIR])
@@ -140,97 +445,57 @@ def process_batch(playlist_url, limit=6, privacy_status='private'):
         print(f"❌ Error: Intro video not found at '{INTRO_VIDEO}'")
         sys.exit(1)
     
-    # Get playlist videos
-    print(f"📋 Fetching playlist videos (limit: {limit})...")
-    videos = get_playlist_videos(playlist_url, limit)
-    
-    if not videos:
-        print("❌ No videos found in playlist")
-        sys.exit(1)
-    
-    print(f"✓ Found {len(videos)} videos to process:\n")
-    for i, v in enumerate(videos, 1):
-        print(f"  {i}. {v['title'][:50]}{'...' if len(v['title']) > 50 else ''}")
-    print()
-    
     # Authenticate with YouTube
     print("🔐 Authenticating with YouTube...")
     youtube = get_service(CLIENT_SECRETS_FILE, SCOPES)
     print("✓ Authenticated\n")
     
+    # Check the day's API quota before any work is done
+    if backfill:
+        backfill = Backfill(backfill)
+        filters = list(filters or []) + [lambda video: not backfill.is_done(video['id'])]
+        print(f"📅 Backfill '{backfill.name}': {len(backfill.done)} videos already re-uploaded")
+    remaining = default_tracker.remaining()
+    if remaining is not None:
+        cost = upload_cost()
+        print(f"📊 API quota: {default_tracker.used:,}/{default_tracker.daily_limit:,} units used today "
+              f"(room for {remaining // cost} uploads at {cost:,} units each)")
+        if backfill:
+            if limit:
+                days = plan_backfill(range(limit), cost)
+                print(f"   Up to {limit} uploads will take {len(days)} quota day(s)")
+        elif remaining < cost:
+            print("❌ Not enough API quota left today for an upload (use --backfill to wait for the reset)")
+            sys.exit(1)
+        elif limit and remaining // cost < limit:
+            print(f"⚠️  Only {remaining // cost} of {limit} uploads fit in today's quota "
+                  f"(use --backfill to continue after the reset)")
+        print()
+    
+    # Stream the playlist: the first video is processed while the rest are still being listed
+    print(f"📋 Listing playlist videos (limit: {limit})...")
+    
+    def listed_videos():
+        for i, v in enumerate(iter_playlist_videos(playlist_url, limit, filters), 1):
+            print(f"  {i}. {v['title'][:50]}{'...' if len(v['title']) > 50 else ''}")
+            yield v
+    
+    videos = listed_videos()
+    
     # Process each video
-    results = []
-    for i, video in enumerate(videos, 1):
-        print(f"\n{'='*60}")
-        print(f"Processing video {i}/{len(videos)}: {video['title'][:40]}...")
-        print("=" * 60)
-        
-        video_id = video['id']
-        title = video['title']
-        description = video['description'] or f"Re-uploaded with intro. Original: https://youtu.be/{video_id}"
-        
-        # Download
-        download_path = DOWNLOAD_DIR / f"{video_id}.mp4"
-        print(f"⬇️  Downloading...")
-        
-        if download_path.exists():
-            print(f"   (Using cached download)")
-        else:
-            if not download_video(video_id, download_path):
-                print(f"❌ Failed to download video {video_id}")
-                results.append({'video': video, 'status': 'download_failed'})
-                continue
-        
-        print(f"✓ Downloaded: {download_path}")
-        
-        # Add intro
-        output_path = OUTPUT_DIR / f"{video_id}_with_intro.mp4"
-        print(f"🎬 Adding intro...")
-        
-        try:
-            stitch_intro(str(INTRO_VIDEO), str(download_path), str(output_path))
-            print(f"✓ Intro added: {output_path}")
-        except Exception as e:
-            print(f"❌ Failed to add intro: {e}")
-            results.append({'video': video, 'status': 'processing_failed', 'error': str(e)})
-            continue
-        
-        # Upload
-        print(f"⬆️  Uploading to YouTube (privacy: {privacy_status})...")
-        
-        try:
-            response = upload_video(
-                youtube,
-                str(output_path),
-                title,
-                description,
-                privacy_status=privacy_status
-            )
-            
-            new_video_id = response['id']
-            new_url = f"https://www.youtube.com/watch?v={new_video_id}"
-            print(f"✓ Uploaded successfully!")
-            print(f"   New URL: {new_url}")
-            
-            # Set thumbnail if available
-            if os.path.exists(INTRO_THUMBNAIL):
-                print(f"🖼️  Setting thumbnail...")
-                try:
-                    set_thumbnail(youtube, new_video_id, INTRO_THUMBNAIL)
-                    print(f"✓ Thumbnail set")
-                except Exception as thumb_error:
-                    print(f"⚠️  Warning: Could not set thumbnail: {thumb_error}")
-            
-            results.append({
-                'video': video,
-                'status': 'success',
-                'new_id': new_video_id,
-                'new_url': new_url
-            })
-            
-        except Exception as e:
-            print(f"❌ Failed to upload: {e}")
-            results.append({'video': video, 'status': 'upload_failed', 'error': str(e)})
+    if workers == 1 and not pipeline:
+        results = process_sequential(videos, youtube, privacy_status, smart_render, segment_workers,
+                                     backend, encoder_profile, rate_control, format_policy, backfill)
+    else:
+        results = process_pipelined(videos, youtube, privacy_status, smart_render, workers,
+                                    download_workers=download_workers,
+                                    segment_workers=segment_workers, backend=backend,
+                                    encoder_profile=encoder_profile, rate_control=rate_control,
+                                    format_policy=format_policy, backfill=backfill)
+    
+    if not results:
+        print("❌ No videos found in playlist")
+        sys.exit(1)
     
     # Summary
     print("\n" + "=" * 60)
@@ -278,11 +543,55 @@ if __name__ == "__main__":
     parser.add_argument('--limit', '-l', type=int, default=6, help='Number of videos to process (default: 6)')
     parser.add_argument('--privacy', '-p', choices=['private', 'unlisted', 'public'], 
                         default='private', help='Privacy status for uploads (default: private)')
+    parser.add_argument('--smart-render', action='store_true',
+                        help='Re-encode only the intro and fade region, stream-copy the rest when possible')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Parallel stitch workers (default: 1, 0 = size from CPU count)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Download the next video and upload the previous one while stitching')
+    parser.add_argument('--segment-workers', type=int, default=1,
+                        help='Encode long videos as parallel keyframe-aligned segments '
+                             '(default: 1 = off, 0 = size from CPU count)')
+    parser.add_argument('--backend', choices=sorted(STITCH_BACKENDS),
+                        help='Stitch engine: moviepy (frame by frame in Python) or ffmpeg '
+                             '(one filtergraph in a single process) (default: STITCH_BACKEND or moviepy)')
+    parser.add_argument('--profile', choices=list(ENCODER_PROFILES),
+                        help='Encoder profile trading speed for quality and size '
+                             '(default: ENCODER_PROFILE or balanced)')
+    parser.add_argument('--rate-control', choices=RATE_CONTROL_MODES,
+                        help='crf: profile CRF only; capped: also cap the bitrate at the source\'s '
+                             '(default: RATE_CONTROL or crf)')
+    parser.add_argument('--download-workers', type=int,
+                        help='Videos downloaded at once in pipelined mode (default: DOWNLOAD_WORKERS or 3)')
+    parser.add_argument('--bandwidth-limit',
+                        help='Combined download bandwidth in bytes/s, e.g. 20M '
+                             '(default: DOWNLOAD_BANDWIDTH_LIMIT or unlimited)')
+    parser.add_argument('--match-title',
+                        help='Only process videos whose title matches this regular expression')
+    parser.add_argument('--min-duration', type=float, metavar='SECONDS',
+                        help='Skip videos shorter than this')
+    parser.add_argument('--max-duration', type=float, metavar='SECONDS',
+                        help='Skip videos longer than this')
+    parser.add_argument('--format-policy', choices=list(FORMAT_POLICIES),
+                        help='Download format: compatible (H.264 + AAC, copied without transcoding), '
+                             'best (any codec) or progressive (default: DOWNLOAD_FORMAT_POLICY or compatible)')
+    parser.add_argument('--backfill', metavar='NAME',
+                        help='Spread the batch over several days of API quota, waiting for each daily '
+                             'reset; rerunning with the same name skips videos already re-uploaded')
     
     args = parser.parse_args()
     
+    filters = []
+    if args.match_title:
+        filters.append(title_filter(args.match_title))
+    if args.min_duration is not None or args.max_duration is not None:
+        filters.append(duration_filter(args.min_duration, args.max_duration))
+    
     try:
-        process_batch(args.playlist_url, args.limit, args.privacy)
+        process_batch(args.playlist_url, args.limit, args.privacy, args.smart_render,
+                      args.workers or None, args.pipeline, args.segment_workers or None, args.backend,
+                      args.profile, args.rate_control, args.download_workers, args.bandwidth_limit,
+                      args.format_policy, filters or None, args.backfill)
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
         sys.exit(0)
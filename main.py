@@ -10,9 +10,12 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from yt_automation.auth import get_service
-from yt_automation.editor import stitch_intro
+from yt_automation.editor import select_intro_for_video, stitch_intro
+from yt_automation.encoder_profiles import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES
+from yt_automation.progress import cli_progress
+from yt_automation.rate_control import estimate_output_size
 from yt_automation.youtube_ops import list_videos, upload_video, set_thumbnail
-from yt_automation.storage import check_storage_warning, cleanup_processed_videos, storage_status
+from yt_automation.storage import check_storage_warning, cleanup_processed_videos, format_size, storage_status
 
 
 # Load environment variables
@@ -26,16 +29,30 @@ SCOPES = ['https://www.googleapis.com/auth/youtube.upload',
 # Paths
 CLIENT_SECRETS_FILE = os.getenv('CLIENT_SECRETS_FILE', 'client_secrets.json')
 INTRO_VIDEO = os.getenv('INTRO_VIDEO', 'intro.mp4')
+INTRO_VIDEO_SHORT = os.getenv('INTRO_VIDEO_SHORT', 'intro_short.mp4')
 INTRO_THUMBNAIL = os.getenv('INTRO_THUMBNAIL', 'intro.jpg')
 OUTPUT_DIR = Path(os.getenv('OUTPUT_DIR', 'output'))
 
+# Parallel segment encodes for long videos (1 = off, 0 = size from CPU count)
+SEGMENT_WORKERS = int(os.getenv('SEGMENT_WORKERS', '1')) or None
+
 
 def ensure_directories():
     """Create necessary directories if they don't exist."""
     OUTPUT_DIR.mkdir(exist_ok=True)
     
 
-def process_video(intro_path, video_path, output_filename=None):
+def ask_encoder_profile():
+    """Prompt for an encoder profile, defaulting to ENCODER_PROFILE."""
+    names = '/'.join(ENCODER_PROFILES)
+    while True:
+        profile = input(f"Encoder profile ({names}) [{DEFAULT_ENCODER_PROFILE}]: ").strip()
+        if not profile or profile in ENCODER_PROFILES:
+            return profile or DEFAULT_ENCODER_PROFILE
+        print(f"❌ Unknown profile '{profile}'")
+
+
+def process_video(intro_path, video_path, output_filename=None, encoder_profile=None):
     """
     Add intro to a video.
     
@@ -43,6 +60,7 @@ def process_video(intro_path, video_path, output_filename=None):
         intro_path: Path to the intro video
         video_path: Path to the main video
         output_filename: Optional custom output filename
+        encoder_profile: Encoder profile name (default: ENCODER_PROFILE)
         
     Returns:
         Path to the processed video
@@ -56,8 +74,14 @@ def process_video(intro_path, video_path, output_filename=None):
     print(f"Processing: {video_path}")
     print(f"Adding intro: {intro_path}")
     print(f"Output: {output_path}")
+    print(f"Encoder profile: {encoder_profile or DEFAULT_ENCODER_PROFILE}")
+    expected = estimate_output_size(str(intro_path), str(video_path), encoder_profile)
+    if expected:
+        print(f"Expected output size: up to {format_size(expected)}")
     
-    stitch_intro(str(intro_path), str(video_path), str(output_path))
+    stitch_intro(str(intro_path), str(video_path), str(output_path),
+                 segment_workers=SEGMENT_WORKERS, on_progress=cli_progress("Encoding: "),
+                 encoder_profile=encoder_profile)
     
     print(f"✓ Video processed successfully: {output_path}\n")
     return output_path
@@ -119,7 +143,8 @@ def main():
             print(f"❌ Error: Video file not found at '{video_path}'")
             sys.exit(1)
         
-        process_video(INTRO_VIDEO, video_path)
+        intro_path = select_intro_for_video(video_path, INTRO_VIDEO, INTRO_VIDEO_SHORT)
+        process_video(intro_path, video_path, encoder_profile=ask_encoder_profile())
         print("✓ Done! Check the output directory for your processed video.")
     
     elif choice == '2':
@@ -135,9 +160,11 @@ def main():
         title = input("Enter video title: ").strip()
         description = input("Enter video description: ").strip()
         privacy = input("Privacy (private/unlisted/public) [private]: ").strip() or 'private'
+        encoder_profile = ask_encoder_profile()
         
         # Process video
-        output_path = process_video(INTRO_VIDEO, video_path)
+        intro_path = select_intro_for_video(video_path, INTRO_VIDEO, INTRO_VIDEO_SHORT)
+        output_path = process_video(intro_path, video_path, encoder_profile=encoder_profile)
         
         # Authenticate and upload
         print("Authenticating with YouTube...")
@@ -174,15 +201,16 @@ def main():
         youtube = get_service(CLIENT_SECRETS_FILE, SCOPES)
         
         print("\nFetching your videos...\n")
-        videos = list_videos(youtube, max_results=10)
+        # Print each video as soon as its page arrives
+        count = 0
+        for count, item in enumerate(list_videos(youtube, max_results=10), 1):
+            title = item['snippet']['title']
+            video_id = item['snippet']['resourceId']['videoId']
+            print(f"{count}. {title}")
+            print(f"   URL: https://www.youtube.com/watch?v={video_id}\n")
         
-        if videos:
-            print(f"Found {len(videos)} recent videos:\n")
-            for idx, item in enumerate(videos, 1):
-                title = item['snippet']['title']
-                video_id = item['snippet']['resourceId']['videoId']
-                print(f"{idx}. {title}")
-                print(f"   URL: https://www.youtube.com/watch?v={video_id}\n")
+        if count:
+            print(f"Found {count} recent videos.")
         else:
             print("No videos found on your channel.")
     
@@ -0,0 +1,56 @@
+"""
+Tests for the smart render plan's fallbacks to a full encode.
+"""
+
+import pytest
+
+pytest.importorskip('moviepy')
+
+from yt_automation import editor
+from yt_automation.encoder_profiles import get_encoder_profile
+from yt_automation.probe import VideoInfo
+
+
+INTRO = VideoInfo(width=1920, height=1080, fps=30.0, duration=5.0, video_codec='h264',
+                  pix_fmt='yuv420p', audio_codec='aac', audio_profile='LC', audio_sample_rate=48000,
+                  audio_channels=2)
+MAIN = VideoInfo(width=1920, height=1080, fps=30.0, duration=600.0, video_codec='h264',
+                 pix_fmt='yuv420p', audio_codec='aac', audio_profile='LC', audio_sample_rate=48000,
+                 audio_channels=2)
+
+
+def _plan(monkeypatch, main, intro=INTRO, keyframes=(0.0, 2.0, 4.0)):
+    infos = {'intro.mp4': intro, 'main.mp4': main}
+    monkeypatch.setattr(editor, 'probe_video', lambda path: infos[path])
+    monkeypatch.setattr(editor, 'output_size', lambda path: (main.width, main.height))
+    monkeypatch.setattr(editor, 'get_keyframe_times', lambda path, until=None: list(keyframes))
+    return editor._smart_render_plan('intro.mp4', 'main.mp4', 1.0, get_encoder_profile('balanced'))
+
+
+def test_compatible_video_is_cut_at_first_keyframe_after_fade(monkeypatch):
+    plan = _plan(monkeypatch, MAIN)
+    assert plan is not None
+    assert plan['cut'] == 2.0
+
+
+@pytest.mark.parametrize('changes', [
+    {'video_codec': 'vp9'},
+    {'audio_codec': 'opus'},
+    {'audio_codec': 'mp3'},
+    {'audio_profile': 'HE-AAC'},
+    {'pix_fmt': 'yuv420p10le'},
+    {'pix_fmt': 'yuv444p'},
+    {'rotation': 90},
+])
+def test_incompatible_streams_fall_back(monkeypatch, changes):
+    main = VideoInfo(**{**MAIN.__dict__, **changes})
+    assert _plan(monkeypatch, main) is None
+
+
+def test_audio_mismatch_with_intro_falls_back(monkeypatch):
+    main = VideoInfo(**{**MAIN.__dict__, 'audio_codec': None})
+    assert _plan(monkeypatch, main) is None
+
+
+def test_no_keyframe_after_fade_falls_back(monkeypatch):
+    assert _plan(monkeypatch, MAIN, keyframes=(0.0,)) is None
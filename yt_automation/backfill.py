@@ -0,0 +1,156 @@
+"""
+Backfill Module
+Spreads large re-upload runs across days within the YouTube API quota, resuming after each reset
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from yt_automation.quota import QUOTA_COSTS, default_tracker, next_reset, quota_day
+from yt_automation.storage import atomic_write_json
+
+
+BACKFILL_DIR = Path('.clipstream_cache') / 'backfills'
+
+# Seconds to wait past midnight Pacific before trusting that the quota reset
+RESET_GRACE = 60
+
+
+def reupload_cost(thumbnail=True, playlists=0):
+    """
+    Get the quota units re-uploading one video costs.
+
+    Args:
+        thumbnail: Whether a custom thumbnail is set after the upload
+        playlists: Playlists the new video is added to
+
+    Returns:
+        Units (1,650 for an upload with a thumbnail)
+    """
+    return (QUOTA_COSTS['youtube.videos.insert']
+            + (QUOTA_COSTS['youtube.thumbnails.set'] if thumbnail else 0)
+            + QUOTA_COSTS['youtube.playlistItems.insert'] * playlists)
+
+
+@dataclass
+class BackfillDay:
+    """Items scheduled for one quota day."""
+    day: str  # YYYY-MM-DD, Pacific time
+    items: list = field(default_factory=list)
+    units: int = 0
+
+
+def plan_backfill(items, cost, tracker=None):
+    """
+    Split a backlog into quota days.
+
+    The first day gets what is left of today's quota, every later day the
+    full daily quota. Order is kept: an item never runs before one listed
+    ahead of it.
+
+    Args:
+        items: Work items in the order they should run
+        cost: Units per item, or a callable taking an item and returning its units
+        tracker: QuotaTracker (default: default_tracker)
+
+    Returns:
+        List of BackfillDay, today first
+    """
+    tracker = tracker or default_tracker
+    cost_of = cost if callable(cost) else (lambda item: cost)
+    if not tracker.daily_limit:
+        return [BackfillDay(quota_day(), list(items), sum(cost_of(item) for item in items))]
+
+    reset = next_reset()
+    days = [BackfillDay(quota_day())]
+    available = tracker.remaining()
+    for item in items:
+        units = cost_of(item)
+        if units > tracker.daily_limit:
+            raise ValueError(f"An item needs {units} quota units, more than the daily quota of {tracker.daily_limit}")
+        if units > available - days[-1].units:
+            days.append(BackfillDay(quota_day(reset + timedelta(days=len(days) - 1))))
+            available = tracker.daily_limit
+        days[-1].items.append(item)
+        days[-1].units += units
+    return [day for day in days if day.items]
+
+
+def wait_for_quota(units, tracker=None, on_wait=None, sleep=time.sleep):
+    """
+    Block until today's quota can cover units, sleeping through resets.
+
+    Args:
+        units: Units the next piece of work needs
+        tracker: QuotaTracker (default: default_tracker)
+        on_wait: Optional callback receiving the reset datetime before sleeping
+        sleep: Sleep function (seconds)
+    """
+    tracker = tracker or default_tracker
+    if units > (tracker.daily_limit or units):
+        raise ValueError(f"{units} quota units is more than the daily quota of {tracker.daily_limit}")
+    while not tracker.can_afford(units):
+        if on_wait:
+            on_wait(next_reset())
+        sleep(tracker.wait_time() + RESET_GRACE)
+
+
+class Backfill:
+    """
+    A named backlog worked through across as many quota days as it takes.
+
+    Finished item IDs are saved after each item, so a backfill that is
+    stopped (or whose machine restarts) picks up where it left off.
+    """
+
+    def __init__(self, name, tracker=None, state_dir=None):
+        """
+        Args:
+            name: Backfill name; runs with the same name share progress
+            tracker: QuotaTracker (default: default_tracker)
+            state_dir: Directory progress is kept in (default: BACKFILL_DIR)
+        """
+        self.name = name
+        self.tracker = tracker or default_tracker
+        self.state_path = Path(state_dir or BACKFILL_DIR) / f"{name}.json"
+        self._lock = threading.Lock()
+        try:
+            with open(self.state_path) as f:
+                self.done = set(json.load(f).get('done', []))
+        except (OSError, ValueError):
+            self.done = set()
+
+    def _save(self):
+        atomic_write_json(self.state_path, {'name': self.name, 'done': sorted(self.done)})
+
+    def is_done(self, item_id):
+        """Whether an item already finished in an earlier run."""
+        return item_id in self.done
+
+    def mark_done(self, item_id):
+        """Record a finished item."""
+        with self._lock:
+            self.done.add(item_id)
+            self._save()
+
+    def wait_for_quota(self, units, on_wait=None, sleep=time.sleep):
+        """Block until the quota can cover units (see wait_for_quota)."""
+        wait_for_quota(units, self.tracker, on_wait, sleep)
+
+    def quota_refused(self, on_wait=None, sleep=time.sleep):
+        """
+        Note that a call was refused for quota, so the next wait lasts until the reset.
+
+        Also covers a refusal by the local tracker when an item cost more than
+        estimated, which would otherwise be retried straight away. With the
+        accounting disabled there is nothing to wait on, so this sleeps itself.
+        """
+        self.tracker.exhaust()
+        if not self.tracker.daily_limit:
+            if on_wait:
+                on_wait(next_reset())
+            sleep(self.tracker.wait_time() + RESET_GRACE)
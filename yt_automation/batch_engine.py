@@ -0,0 +1,204 @@
+"""
+Batch Engine Module
+Runs stitch_intro jobs in a process pool sized to the machine
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from yt_automation.editor import DEFAULT_STITCH_BACKEND, planned_segment_workers, stitch_intro
+from yt_automation.encoder_profiles import get_encoder_profile
+from yt_automation.memory import default_budget, estimate_stitch_memory, track_peak_rss
+
+
+# libx264 scales well up to a handful of threads per instance; past that it is
+# cheaper to run more encodes side by side than to give one encode more threads.
+# Each encoder profile sets its own count; this env var overrides them all
+THREADS_PER_JOB = int(os.getenv('ENCODER_THREADS_PER_JOB', '0')) or None
+
+# Carries progress updates back from worker processes; started on first use
+_progress_manager = None
+_progress_manager_lock = threading.Lock()
+
+
+def get_cpu_count():
+    """
+    Number of CPUs this process may run on.
+
+    Returns:
+        CPU count (at least 1)
+    """
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_workers(num_jobs, threads_per_job=None, max_workers=None, encoder_profile=None):
+    """
+    Size the pool so workers x encoder threads roughly matches the core count.
+
+    Args:
+        num_jobs: Number of jobs to run
+        threads_per_job: Encoder threads per job (default: ENCODER_THREADS_PER_JOB,
+                         or the encoder profile's threads)
+        max_workers: Optional hard cap on the number of worker processes
+        encoder_profile: Encoder profile the jobs use (default: ENCODER_PROFILE)
+
+    Returns:
+        Tuple of (workers, threads_per_job)
+    """
+    cpus = get_cpu_count()
+    threads_per_job = threads_per_job or THREADS_PER_JOB or get_encoder_profile(encoder_profile).threads
+    threads_per_job = max(1, min(threads_per_job, cpus))
+    workers = max(1, cpus // threads_per_job)
+    if max_workers:
+        workers = min(workers, max_workers)
+    workers = max(1, min(workers, num_jobs))
+
+    # With fewer jobs than slots, hand the idle cores to the jobs we do have
+    if workers == num_jobs:
+        threads_per_job = max(threads_per_job, cpus // workers)
+
+    return workers, threads_per_job
+
+
+def run_stitch_job(job, threads=None, progress_queue=None):
+    """
+    Run a single stitch job and report the outcome instead of raising.
+
+    Args:
+        job: Dict with 'intro_path', 'main_path', 'output_path' and optional
+             'id', 'fade_duration', 'smart_render', 'segment_workers', 'backend',
+             'encoder_profile', 'rate_control' keys
+        threads: Encoder threads for this job
+        progress_queue: Optional queue that receives EncodeProgress updates
+
+    Returns:
+        Result dict with 'id', 'status' ('success' or 'failed'), 'output',
+        'smart_render', 'elapsed', 'peak_rss' (bytes, None if unknown; the
+        process that ran the job plus its ffmpeg and segment worker children)
+        and, on failure, 'error'
+    """
+    started = time.monotonic()
+    result = {
+        'id': job.get('id', job['main_path']),
+        'main_path': job['main_path'],
+        'output': job['output_path'],
+        'pid': os.getpid(),
+    }
+    with track_peak_rss() as rss:
+        try:
+            result['smart_render'] = stitch_intro(
+                str(job['intro_path']),
+                str(job['main_path']),
+                str(job['output_path']),
+                job.get('fade_duration', 0.5),
+                smart_render=job.get('smart_render', False),
+                threads=threads,
+                segment_workers=job.get('segment_workers', 1),
+                backend=job.get('backend'),
+                encoder_profile=job.get('encoder_profile'),
+                rate_control=job.get('rate_control'),
+                on_progress=progress_queue.put if progress_queue is not None else None
+            )
+            result['status'] = 'success'
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+    result['peak_rss'] = rss.peak
+    result['elapsed'] = time.monotonic() - started
+    return result
+
+
+def create_stitch_pool(workers):
+    """
+    Create a process pool for stitch jobs.
+
+    Args:
+        workers: Number of worker processes
+
+    Returns:
+        ProcessPoolExecutor; submit run_stitch_job to it
+    """
+    # spawn keeps workers independent of Streamlit's threads and open handles
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def job_memory(job):
+    """
+    Estimate the memory a stitch job will need.
+
+    Args:
+        job: Job dict (see run_stitch_job)
+
+    Returns:
+        Bytes; 0 if the main video can't be probed (the job will fail on its own)
+    """
+    try:
+        backend = job.get('backend') or DEFAULT_STITCH_BACKEND
+        encodes = planned_segment_workers(
+            job['intro_path'], job['main_path'], job.get('fade_duration', 0.5),
+            smart_render=job.get('smart_render', False), segment_workers=job.get('segment_workers', 1),
+            backend=backend, encoder_profile=job.get('encoder_profile')
+        )
+        return estimate_stitch_memory(job['main_path'], backend, encodes, job['intro_path'])
+    except Exception:
+        return 0
+
+
+def _get_progress_manager():
+    """Start (once) the manager process that hosts progress queues."""
+    global _progress_manager
+    with _progress_manager_lock:
+        if _progress_manager is None:
+            _progress_manager = multiprocessing.get_context('spawn').Manager()
+        return _progress_manager
+
+
+def run_pooled_stitch_job(pool, job, threads=None, on_progress=None, memory_budget=None):
+    """
+    Run a stitch job in a pool worker and wait for it, relaying its progress.
+
+    The job is only submitted once its estimated memory fits in the budget,
+    so concurrent callers sharing a pool can't push the machine into swap.
+
+    Args:
+        pool: Pool from create_stitch_pool
+        job: Job dict (see run_stitch_job)
+        threads: Encoder threads for this job
+        on_progress: Optional callback receiving EncodeProgress updates,
+                     called in the waiting thread
+        memory_budget: MemoryBudget shared by the callers (default: the
+                       process-wide budget)
+
+    Returns:
+        Result dict from run_stitch_job
+    """
+    with (memory_budget or default_budget).reserve(job_memory(job)):
+        return _wait_pooled_stitch_job(pool, job, threads, on_progress)
+
+
+def _wait_pooled_stitch_job(pool, job, threads, on_progress):
+    """Submit a job to the pool and wait for it, relaying its progress."""
+    if on_progress is None:
+        return pool.submit(run_stitch_job, job, threads).result()
+
+    progress_queue = _get_progress_manager().Queue()
+    future = pool.submit(run_stitch_job, job, threads, progress_queue)
+    while not future.done():
+        try:
+            on_progress(progress_queue.get(timeout=0.5))
+        except queue.Empty:
+            continue
+    while True:
+        try:
+            on_progress(progress_queue.get_nowait())
+        except queue.Empty:
+            break
+    return future.result()
@@ -0,0 +1,196 @@
+"""
+Download Cache Module
+Indexes finished downloads so only verified files are reused and interrupted ones resume
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from yt_automation.downloader import DownloadResult, download_video
+from yt_automation.format_policy import DOWNLOAD_MAX_HEIGHT, get_format_policy
+from yt_automation.intro_cache import file_fingerprint
+from yt_automation.probe import probe_video
+from yt_automation.storage import atomic_write_json
+
+
+# Verified downloads, one entry file per video ID
+DOWNLOAD_INDEX_DIR = Path('.clipstream_cache') / 'downloads'
+
+# A probed duration this much shorter than YouTube's (seconds, or fraction of
+# the duration if larger) marks a truncated file
+DURATION_TOLERANCE = 1.0
+DURATION_TOLERANCE_FRACTION = 0.02
+
+
+def _entry_path(video_id, index_dir=None):
+    """Path of the index entry for a video."""
+    return Path(index_dir or DOWNLOAD_INDEX_DIR) / f"{video_id}.json"
+
+
+def load_entry(video_id, index_dir=None):
+    """
+    Read a video's index entry.
+
+    Returns:
+        Entry dict, or None if the video has none
+    """
+    try:
+        with open(_entry_path(video_id, index_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def record_download(video_id, path, duration=None, format_id=None, index_dir=None, **selection):
+    """
+    Add a finished download to the index.
+
+    Args:
+        video_id: YouTube video ID
+        path: Path of the downloaded file
+        duration: Duration YouTube reports for the video, in seconds
+        format_id: yt-dlp format ID that was downloaded
+        index_dir: Index directory (default: DOWNLOAD_INDEX_DIR)
+        **selection: How the format was chosen (format_policy, max_height)
+
+    Returns:
+        The entry dict
+    """
+    stat = os.stat(path)
+    entry = {
+        **selection,
+        'id': video_id,
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'duration': duration,
+        'format_id': format_id,
+        'fingerprint': file_fingerprint(path),
+        'created': time.time(),
+    }
+
+    atomic_write_json(_entry_path(video_id, index_dir), entry)
+    return entry
+
+
+def forget_download(video_id, index_dir=None):
+    """Drop a video's index entry (the file itself is left alone)."""
+    try:
+        os.unlink(_entry_path(video_id, index_dir))
+    except FileNotFoundError:
+        pass
+
+
+def check_file(path, expected_duration=None):
+    """
+    Check that a downloaded file is a complete, readable video.
+
+    Only the container headers are probed, so this is cheap even for long
+    videos. A file ffprobe can't read (e.g. an MP4 cut off before its index)
+    or whose duration falls short of YouTube's is treated as corrupt.
+
+    Args:
+        path: Path to the file
+        expected_duration: Duration YouTube reports, in seconds (None skips the check)
+
+    Returns:
+        None if the file is fine, otherwise the reason it isn't
+    """
+    try:
+        info = probe_video(str(path))
+    except Exception as e:
+        return f"unreadable: {e}"
+    if not info.duration or not info.width:
+        return "no video stream"
+    if expected_duration:
+        tolerance = max(DURATION_TOLERANCE, expected_duration * DURATION_TOLERANCE_FRACTION)
+        if info.duration < expected_duration - tolerance:
+            return f"truncated: {info.duration:.1f}s of {expected_duration:.1f}s"
+    return None
+
+
+def verify_download(video_id, path, index_dir=None, **selection):
+    """
+    Check whether a cached download can be used.
+
+    The file must have the index entry's path, size and mtime, have been
+    downloaded with the same format selection and pass check_file. Files
+    with no entry (e.g. left by an older version or an interrupted run) are
+    never trusted.
+
+    Args:
+        video_id: YouTube video ID
+        path: Path the caller expects the download at
+        index_dir: Index directory (default: DOWNLOAD_INDEX_DIR)
+        **selection: Required format selection (format_policy, max_height)
+
+    Returns:
+        The entry dict if the download is valid, None otherwise
+    """
+    entry = load_entry(video_id, index_dir)
+    if entry is None or entry.get('path') != os.path.abspath(path):
+        return None
+    if any(entry.get(field) != value for field, value in selection.items()):
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size != entry.get('size') or stat.st_mtime_ns != entry.get('mtime_ns'):
+        return None
+    if check_file(path, entry.get('duration')) is not None:
+        return None
+    return entry
+
+
+def cached_download(video_id, output_path, on_progress=None, index_dir=None, format_policy=None,
+                    max_height=None):
+    """
+    Return a verified download of a video, fetching it if needed.
+
+    An invalid file at output_path is deleted and downloaded again. yt-dlp's
+    .part file is kept, so an interrupted download resumes where it stopped
+    rather than starting over.
+
+    Args:
+        video_id: YouTube video ID
+        output_path: Path to save the video
+        on_progress: Optional callback receiving DownloadProgress updates
+        index_dir: Index directory (default: DOWNLOAD_INDEX_DIR)
+        format_policy: Format policy name (default: DOWNLOAD_FORMAT_POLICY);
+                       a file downloaded under another policy is fetched again
+        max_height: Tallest video stream to download (default: DOWNLOAD_MAX_HEIGHT)
+
+    Returns:
+        DownloadResult; cached is True when the existing file was reused
+    """
+    output_path = Path(output_path)
+    policy = get_format_policy(format_policy)
+    selection = {
+        'format_policy': policy.name,
+        'max_height': max_height or DOWNLOAD_MAX_HEIGHT,
+    }
+    entry = verify_download(video_id, output_path, index_dir, **selection)
+    if entry is not None:
+        return DownloadResult(video_id, output_path, 'success', size=entry['size'],
+                              format_id=entry.get('format_id'), duration=entry.get('duration'),
+                              cached=True)
+
+    forget_download(video_id, index_dir)
+    if output_path.exists():
+        output_path.unlink()
+
+    result = download_video(video_id, output_path, on_progress, policy, selection['max_height'])
+    if not result:
+        return result
+
+    problem = check_file(output_path, result.duration)
+    if problem is not None:
+        output_path.unlink()
+        return DownloadResult(video_id, None, 'failed', elapsed=result.elapsed,
+                              error=f"Downloaded file is invalid ({problem})")
+
+    record_download(video_id, output_path, result.duration, result.format_id, index_dir, **selection)
+    return result
@@ -0,0 +1,366 @@
+"""
+Downloader Module
+Downloads videos in-process with long-lived yt-dlp instances, several at once under one bandwidth limit
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import parse_bytes
+
+from yt_automation.format_policy import get_format_policy
+from yt_automation.storage import format_size
+
+
+# Videos downloaded at once by DownloadManager (and so by batch pipelines)
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '3'))
+
+# Fragments fetched in parallel per download; only fragmented formats (HLS,
+# e.g. live recordings) have fragments, regular YouTube formats are one file
+DOWNLOAD_FRAGMENTS = int(os.getenv('DOWNLOAD_FRAGMENTS', '4'))
+
+# Combined download bandwidth in bytes per second, e.g. '20M' (empty = unlimited),
+# so downloads leave room for uploads running at the same time
+DOWNLOAD_BANDWIDTH_LIMIT = os.getenv('DOWNLOAD_BANDWIDTH_LIMIT', '')
+
+# Shared by every download in this process; started on first use
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DownloadProgress:
+    """Snapshot of a download in progress."""
+    video_id: str
+    downloaded_bytes: int
+    total_bytes: int | None  # None until yt-dlp knows (or estimates) the size
+    speed: float | None  # bytes per second
+    eta: float | None  # seconds
+    elapsed: float
+
+    @property
+    def fraction(self):
+        """Completed fraction between 0 and 1 (0 while the size is unknown)."""
+        if not self.total_bytes:
+            return 0.0
+        return min(self.downloaded_bytes / self.total_bytes, 1.0)
+
+    @property
+    def done(self):
+        """True once every byte has arrived."""
+        return bool(self.total_bytes) and self.downloaded_bytes >= self.total_bytes
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    """Outcome of one download; truthy when it succeeded."""
+    video_id: str
+    path: Path | None
+    status: str  # 'success' or 'failed'
+    size: int = 0
+    elapsed: float = 0.0
+    format_id: str | None = None
+    duration: float | None = None  # as reported by YouTube
+    cached: bool = False  # reused from the download cache
+    error: str | None = None
+
+    @property
+    def ok(self):
+        return self.status == 'success'
+
+    def __bool__(self):
+        return self.ok
+
+
+class Downloader:
+    """
+    Wraps one YoutubeDL instance for many downloads.
+
+    Keeping the instance alive reuses its extractors and HTTP connections
+    instead of starting a new interpreter and session per video. yt-dlp
+    isn't safe for concurrent downloads on one instance, so downloads on
+    the same Downloader run one at a time.
+    """
+
+    def __init__(self, fragments=1, **params):
+        """
+        Args:
+            fragments: Fragments of a DASH/HLS format fetched in parallel
+            **params: Extra YoutubeDL options
+        """
+        self._lock = threading.Lock()
+        self._on_progress = None
+        self._video_id = None
+        self._started = 0.0
+        self._ydl = YoutubeDL({
+            **get_format_policy().ydl_params(),
+            'noplaylist': True,
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            # Keep .part files and resume from them after an interruption
+            'continuedl': True,
+            'nopart': False,
+            'progress_hooks': [self._progress_hook],
+            'concurrent_fragment_downloads': max(fragments, 1),
+            **params,
+        })
+
+    def set_rate_limit(self, bytes_per_second):
+        """
+        Limit each connection of this downloader (None = unlimited).
+
+        The limit applies from the next download or fragment request; a
+        single HTTP transfer already in progress keeps the limit it started with.
+        """
+        self._ydl.params['ratelimit'] = int(bytes_per_second) if bytes_per_second else None
+
+    def _progress_hook(self, status):
+        """Turn yt-dlp's progress dicts into DownloadProgress callbacks."""
+        if self._on_progress is None or status.get('status') not in ('downloading', 'finished'):
+            return
+        total = status.get('total_bytes') or status.get('total_bytes_estimate')
+        downloaded = status.get('downloaded_bytes') or 0
+        if status['status'] == 'finished' and total:
+            downloaded = max(downloaded, int(total))
+        self._on_progress(DownloadProgress(
+            self._video_id, downloaded, int(total) if total else None,
+            status.get('speed'), status.get('eta'), time.monotonic() - self._started
+        ))
+
+    def download(self, video_id, output_path, on_progress=None, format_policy=None, max_height=None):
+        """
+        Download a video to output_path.
+
+        Args:
+            video_id: YouTube video ID
+            output_path: Path to save the video
+            on_progress: Optional callback receiving DownloadProgress updates,
+                         called on the downloading thread
+            format_policy: Name of an entry in FORMAT_POLICIES or a FormatPolicy
+                           (default: the DOWNLOAD_FORMAT_POLICY env var)
+            max_height: Tallest video stream to download (default: DOWNLOAD_MAX_HEIGHT)
+
+        Returns:
+            DownloadResult (errors are reported in it, not raised)
+        """
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        output_path = Path(output_path)
+        with self._lock:
+            self._on_progress = on_progress
+            self._video_id = video_id
+            self._started = time.monotonic()
+            self._ydl.params['outtmpl'] = {'default': str(output_path)}
+            # yt-dlp reads these per video, so each download can use its own policy
+            self._ydl.params.update(get_format_policy(format_policy).ydl_params(max_height))
+            try:
+                info = self._ydl.extract_info(url, download=True)
+            except Exception as e:
+                return DownloadResult(video_id, None, 'failed', elapsed=time.monotonic() - self._started,
+                                      error=str(e))
+            finally:
+                self._on_progress = None
+            elapsed = time.monotonic() - self._started
+
+        if not output_path.exists():
+            return DownloadResult(video_id, None, 'failed', elapsed=elapsed,
+                                  error=f"yt-dlp finished without writing {output_path}")
+        info = info or {}
+        return DownloadResult(video_id, output_path, 'success', size=output_path.stat().st_size,
+                              elapsed=elapsed, format_id=info.get('format_id'),
+                              duration=info.get('duration'))
+
+    def close(self):
+        """Close the underlying HTTP connections."""
+        self._ydl.close()
+
+
+def parse_bandwidth(limit):
+    """
+    Parse a bandwidth limit like '500K' or '20M' into bytes per second.
+
+    Args:
+        limit: String, number of bytes per second, or None/'' for unlimited
+
+    Returns:
+        Integer bytes per second, or None
+    """
+    if not limit:
+        return None
+    if isinstance(limit, (int, float)):
+        return int(limit)
+    value = parse_bytes(str(limit).strip())
+    if value is None:
+        raise ValueError(f"Invalid bandwidth limit '{limit}'")
+    return value
+
+
+class DownloadManager:
+    """
+    Runs several downloads at once under one shared bandwidth limit.
+
+    Each concurrent slot has its own Downloader (yt-dlp instances can't be
+    shared between threads); fragmented formats also fetch several fragments
+    at once. The bandwidth limit is split evenly between the running
+    downloads (yt-dlp's ratelimit applies per download) and rebalanced
+    whenever one starts or ends; a new share takes effect from each
+    download's next request, not midway through a transfer.
+    """
+
+    def __init__(self, workers=None, fragments=None, bandwidth_limit=None):
+        """
+        Args:
+            workers: Concurrent downloads (default: DOWNLOAD_WORKERS)
+            fragments: Parallel fragments per download (default: DOWNLOAD_FRAGMENTS)
+            bandwidth_limit: Combined limit in bytes per second or a string
+                             like '20M' (default: DOWNLOAD_BANDWIDTH_LIMIT)
+        """
+        self.workers = max(workers or DOWNLOAD_WORKERS, 1)
+        self.fragments = max(fragments or DOWNLOAD_FRAGMENTS, 1)
+        self.bandwidth_limit = parse_bandwidth(
+            DOWNLOAD_BANDWIDTH_LIMIT if bandwidth_limit is None else bandwidth_limit
+        )
+        self._idle = queue.Queue()
+        self._created = 0
+        self._active = []
+        self._lock = threading.Lock()
+
+    def set_bandwidth_limit(self, bandwidth_limit):
+        """Change the combined limit (None = unlimited), from each download's next request."""
+        with self._lock:
+            self.bandwidth_limit = parse_bandwidth(bandwidth_limit)
+            self._rebalance()
+
+    def _rebalance(self):
+        """Split the bandwidth limit between the running downloads."""
+        if not self._active:
+            return
+        share = None
+        if self.bandwidth_limit:
+            # Most formats are single-connection downloads, so dividing by the
+            # fragment count too would cap the total well below the limit
+            share = max(self.bandwidth_limit // len(self._active), 1)
+        for downloader in self._active:
+            downloader.set_rate_limit(share)
+
+    def _checkout(self):
+        """Take an idle Downloader, creating one while under the worker count."""
+        with self._lock:
+            if self._idle.empty() and self._created < self.workers:
+                self._created += 1
+                self._idle.put(Downloader(fragments=self.fragments))
+        downloader = self._idle.get()
+        with self._lock:
+            self._active.append(downloader)
+            self._rebalance()
+        return downloader
+
+    def _checkin(self, downloader):
+        with self._lock:
+            self._active.remove(downloader)
+            self._rebalance()
+        self._idle.put(downloader)
+
+    def download(self, video_id, output_path, on_progress=None, format_policy=None, max_height=None):
+        """
+        Download one video, waiting for a free slot if all are busy.
+
+        Args:
+            video_id: YouTube video ID
+            output_path: Path to save the video
+            on_progress: Optional callback receiving DownloadProgress updates
+            format_policy: Format policy name or FormatPolicy (default: DOWNLOAD_FORMAT_POLICY)
+            max_height: Tallest video stream to download (default: DOWNLOAD_MAX_HEIGHT)
+
+        Returns:
+            DownloadResult
+        """
+        downloader = self._checkout()
+        try:
+            return downloader.download(video_id, output_path, on_progress, format_policy, max_height)
+        finally:
+            self._checkin(downloader)
+
+
+def get_download_manager():
+    """
+    Get the process-wide DownloadManager, creating it on first use.
+
+    Every download in the process goes through it, so they all share one
+    bandwidth limit.
+
+    Returns:
+        DownloadManager
+    """
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = DownloadManager()
+        return _default_manager
+
+
+def download_video(video_id, output_path, on_progress=None, format_policy=None, max_height=None):
+    """
+    Download a YouTube video through the process-wide DownloadManager.
+
+    Args:
+        video_id: YouTube video ID
+        output_path: Path to save the video
+        on_progress: Optional callback receiving DownloadProgress updates
+        format_policy: 'compatible', 'best' or 'progressive' (default: the
+                       DOWNLOAD_FORMAT_POLICY env var, or 'compatible')
+        max_height: Tallest video stream to download (default: DOWNLOAD_MAX_HEIGHT)
+
+    Returns:
+        DownloadResult; truthy if the download succeeded
+    """
+    return get_download_manager().download(video_id, output_path, on_progress, format_policy, max_height)
+
+
+def format_download_progress(progress):
+    """
+    Format download progress as a one-line summary.
+
+    Args:
+        progress: DownloadProgress
+
+    Returns:
+        String like "48.20 MB/310.50 MB (16%) · 12.40 MB/s · ETA 0:21"
+    """
+    text = format_size(progress.downloaded_bytes)
+    if progress.total_bytes:
+        text += f"/{format_size(progress.total_bytes)} ({progress.fraction * 100:.0f}%)"
+    if progress.speed:
+        text += f" · {format_size(progress.speed)}/s"
+    if progress.eta is not None and not progress.done:
+        minutes, seconds = divmod(int(progress.eta), 60)
+        text += f" · ETA {minutes}:{seconds:02d}"
+    return text
+
+
+def cli_download_progress(prefix='', stream=None):
+    """
+    Build an on_progress callback that redraws a single terminal line.
+
+    Args:
+        prefix: Text shown before the progress summary
+        stream: Output stream (default: sys.stdout)
+
+    Returns:
+        Callable suitable for download_video's on_progress
+    """
+    stream = stream or sys.stdout
+
+    def on_progress(progress):
+        stream.write(f"\r{prefix}{format_download_progress(progress)}\033[K")
+        if progress.done:
+            stream.write("\n")
+        stream.flush()
+
+    return on_progress
@@ -1,7 +1,43 @@
 from moviepy import VideoFileClip, concatenate_videoclips
-from moviepy.video.fx import FadeIn, FadeOut
+from moviepy.video.fx import FadeOut
+import multiprocessing
 import os
+from dataclasses import asdict
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 
+from yt_automation.ffmpeg_utils import (
+    get_keyframe_times, remux_to_ts, concat_segments, mux_audio, run_ffmpeg, run_ffmpeg_progress
+)
+from yt_automation.encoder_profiles import get_encoder_profile
+from yt_automation.frame_cache import (
+    cached_frames, fade_in, fade_out_frames, fits_frame_cache, frames_clip
+)
+from yt_automation.intro_cache import file_fingerprint, get_intro_variant
+from yt_automation.memory import default_budget, estimate_stitch_memory
+from yt_automation.output_cache import atomic_output, lookup_output, output_key, record_output
+from yt_automation.probe import default_channel_layout, probe_video
+from yt_automation.progress import EncodeProgressLogger
+from yt_automation.rate_control import apply_rate_control
+from yt_automation.resolution import (
+    DEFAULT_RESOLUTION_POLICY, INTRO_VARIANTS, closest_intro, fit_clip, intro_fit_filter, output_size
+)
+
+
+# Smart render only pays off if the re-encoded head is short; beyond this the
+# first keyframe is too far in and a full encode is just as cheap.
+SMART_RENDER_MAX_HEAD = 30.0
+
+# Videos shorter than this keep the single-pass encode even when segment
+# workers are requested; each segment adds process and seek overhead.
+SEGMENT_PARALLEL_MIN_DURATION = float(os.getenv('SEGMENT_PARALLEL_MIN_DURATION', '600'))
+
+# Engine behind stitch_intro when no backend is passed:
+#   moviepy - composite frame by frame in Python
+#   ffmpeg  - one ffmpeg filtergraph in a single subprocess
+DEFAULT_STITCH_BACKEND = os.getenv('STITCH_BACKEND', 'moviepy')
 
 def is_vertical_video(video_path):
     """
@@ -13,10 +49,7 @@ def is_vertical_video(video_path):
     Returns:
         True if video is vertical (height > width), False otherwise
     """
-    clip = VideoFileClip(video_path)
-    is_vertical = clip.h > clip.w
-    clip.close()
-    return is_vertical
+    return probe_video(video_path).is_vertical
 
 
 def get_video_aspect_ratio(video_path):
@@ -29,69 +62,856 @@ def get_video_aspect_ratio(video_path):
     Returns:
         Tuple of (width, height, aspect_ratio)
     """
-    clip = VideoFileClip(video_path)
-    w, h = clip.w, clip.h
-    aspect = w / h
-    clip.close()
-    return w, h, aspect
+    info = probe_video(video_path)
+    return info.display_width, info.display_height, info.aspect_ratio
 
 
-def select_intro_for_video(main_video_path, intro_horizontal, intro_vertical):
+def select_intro_for_video(main_video_path, intro_horizontal, intro_vertical, extra_intros=None):
     """
     Select the appropriate intro based on the main video's aspect ratio.
     
+    The intro whose aspect ratio is closest to the main video's wins, so the
+    resolution policy has as little padding or cropping to do as possible.
+    
     Args:
         main_video_path: Path to the main video
         intro_horizontal: Path to 16:9 intro
         intro_vertical: Path to 9:16 intro (for Shorts)
+        extra_intros: Other pre-rendered intros, e.g. 1:1 or 4:5
+            (default: the INTRO_VARIANTS env var)
         
     Returns:
-        Path to the appropriate intro video
+        Path to the appropriate intro video (the horizontal one if none exist)
     """
-    if is_vertical_video(main_video_path):
-        # Use vertical intro if available, otherwise fall back to horizontal
-        if os.path.exists(intro_vertical):
-            return intro_vertical
-        else:
-            return intro_horizontal
-    else:
-        return intro_horizontal
+    if extra_intros is None:
+        extra_intros = INTRO_VARIANTS
+    candidates = [intro_horizontal, intro_vertical, *extra_intros]
+    return closest_intro(main_video_path, candidates) or intro_horizontal
 
 
-def stitch_intro(intro_path, main_path, output_path, fade_duration=0.5):
+def _smart_render_plan(intro_path, main_path, fade_duration, profile=None):
     """
-    Stitch an intro video to the beginning of a main video.
+    Decide whether a video can be smart-rendered and where to cut it.
+    
+    Smart rendering requires the main video to use H.264/AAC-LC at an even,
+    unrotated resolution, in the pixel format the head is encoded in, so its
+    tail can be stream-copied and joined to the head. The intro is fitted to
+    that resolution.
+    
+    Args:
+        intro_path: Path to the intro video
+        main_path: Path to the main video
+        fade_duration: Duration of fade transition in seconds
+        profile: EncoderProfile the head is encoded with (default: ENCODER_PROFILE)
+        
+    Returns:
+        Dict with the cut point and output parameters, or None to fall back
+    """
+    profile = get_encoder_profile(profile)
+    intro_info = probe_video(intro_path)
+    main_info = probe_video(main_path)
+    
+    if main_info.video_codec != 'h264':
+        return None
+    # The copied tail must match the head's pixel format and AAC-LC audio (the
+    # join uses aac_adtstoasc), or the concat breaks
+    if main_info.pix_fmt != profile.pix_fmt:
+        return None
+    if main_info.has_audio and (main_info.audio_codec != 'aac' or main_info.audio_profile != 'LC'):
+        return None
+    if main_info.rotation:
+        return None
+    if (main_info.width, main_info.height) != output_size(main_path):
+        return None
+    # Both clips need audio (or neither) so the stream layout is consistent
+    if main_info.has_audio != intro_info.has_audio:
+        return None
+    
+    keyframes = get_keyframe_times(main_path, until=SMART_RENDER_MAX_HEAD)
+    
+    # Cut at the first keyframe that leaves the whole fade inside the head
+    cut = next((t for t in keyframes if t >= fade_duration and t > 0), None)
+    if cut is None or cut >= main_info.duration:
+        return None
+    
+    return {
+        'cut': cut,
+        'width': main_info.width,
+        'height': main_info.height,
+        'fps': main_info.fps,
+        'audio_fps': main_info.audio_sample_rate,
+        'audio_channels': main_info.audio_channels,
+    }
+
+
+def _encode_logger(on_progress):
+    """MoviePy logger for write_videofile: a progress reporter, or the default bar."""
+    return EncodeProgressLogger(on_progress) if on_progress else 'bar'
+
+
+def _frame_reporter(on_progress, total_frames):
+    """on_frame callback for run_ffmpeg_progress that forwards EncodeProgress, or None."""
+    if not on_progress:
+        return None
+    logger = EncodeProgressLogger(on_progress, total_frames=max(total_frames, 1))
+    return lambda frames: logger.report(frames, force=frames >= total_frames)
+
+
+def _encode_head_ffmpeg(main_path, head_path, plan, fade_duration, profile, threads=None,
+                        on_progress=None):
+    """Encode the faded-in head of a smart render with ffmpeg's filters instead of MoviePy."""
+    fps = plan['fps']
+    filters = ['setpts=PTS-STARTPTS', f"fps={fps}"]
+    if fade_duration > 0:
+        filters.append(f"fade=t=in:st=0:d={fade_duration:.3f}")
+    
+    args = [
+        '-t', f"{plan['cut']:.6f}", '-i', str(main_path),
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', ','.join(filters),
+        '-c:v', 'libx264', *profile.video_args(threads),
+        '-c:a', 'aac', *profile.audio_args(),
+    ]
+    if plan['audio_fps']:
+        args += ['-ar', str(plan['audio_fps'])]
+    args += ['-f', 'mp4', str(head_path)]
+    run_ffmpeg_progress(args, _frame_reporter(on_progress, int(plan['cut'] * fps)))
+
+
+def _smart_render(intro_path, main_path, output_path, fade_duration, plan, profile, threads=None,
+                  on_progress=None, resolution_policy=None, backend='moviepy'):
+    """
+    Re-encode only the head of the main video, copy the rest.
     
     Args:
         intro_path: Path to the intro video
         main_path: Path to the main video
         output_path: Path for the output video
         fade_duration: Duration of fade transition in seconds
+        plan: Plan returned by _smart_render_plan
+        profile: EncoderProfile for the head encode
+        threads: Number of encoder threads (None lets x264 pick)
+        on_progress: Optional callback receiving EncodeProgress for the head encode
+        resolution_policy: How the intro is fitted to the main video's resolution
+        backend: 'moviepy' or 'ffmpeg', the engine that encodes the head
+    """
+    work_dir = Path(tempfile.mkdtemp(dir=Path(output_path).parent))
+    try:
+        intro_ts = work_dir / 'intro.ts'
+        head_mp4 = work_dir / 'head.mp4'
+        head_ts = work_dir / 'head.ts'
+        tail_ts = work_dir / 'tail.ts'
+        
+        # The intro is pulled pre-faded and pre-encoded from the variant cache,
+        # so only the head of the main video is encoded
+        intro_variant = get_intro_variant(
+            intro_path, plan['width'], plan['height'], plan['fps'],
+            audio_fps=plan['audio_fps'] or 44100,
+            fade_duration=fade_duration,
+            audio_channels=plan['audio_channels'],
+            policy=resolution_policy
+        )
+        
+        if backend == 'ffmpeg':
+            _encode_head_ffmpeg(main_path, head_mp4, plan, fade_duration, profile, threads, on_progress)
+        else:
+            main = VideoFileClip(main_path)
+            head = fade_in(main.subclipped(0, plan['cut']), fade_duration)
+            write_kwargs = {}
+            if plan['audio_fps']:
+                write_kwargs['audio_fps'] = plan['audio_fps']
+            head.write_videofile(
+                str(head_mp4),
+                fps=plan['fps'],
+                codec="libx264",
+                audio_codec="aac",
+                # MoviePy's default is named after head.mp4 in the working
+                # directory, which every concurrent smart render would share
+                temp_audiofile=str(work_dir / 'head_audio.m4a'),
+                logger=_encode_logger(on_progress),
+                **profile.moviepy_kwargs(threads),
+                **write_kwargs
+            )
+            main.close()
+        
+        remux_to_ts(intro_variant, intro_ts)
+        remux_to_ts(head_mp4, head_ts)
+        remux_to_ts(main_path, tail_ts, start=plan['cut'])
+        concat_segments(
+            [intro_ts.resolve(), head_ts.resolve(), tail_ts.resolve()],
+            output_path,
+            work_dir / 'segments.txt'
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _intro_variant_path(intro_path, fade_duration, size, resolution_policy=None):
+    """Get the cached intro variant fitted to size (width, height) at the intro's own frame rate."""
+    width, height = size
+    return get_intro_variant(
+        intro_path, width, height, probe_video(intro_path).fps,
+        fade_duration=fade_duration, policy=resolution_policy
+    )
+
+
+def _open_intro(intro_path, fade_duration, use_intro_cache, size, audio=True, resolution_policy=None,
+                cache_frames=True):
+    """
+    Open the intro fitted to size (width, height) and already faded out to black.
+    
+    With cache_frames, the decoded and faded frames are kept in this process's
+    frame cache, so the next video stitched here plays them back from memory
+    instead of decoding, fitting and fading the intro again.
+    """
+    width, height = size
+    if use_intro_cache:
+        source = _intro_variant_path(intro_path, fade_duration, size, resolution_policy)
+        # The variant path is content-addressed, so it identifies the frames on its own
+        key = ('variant', str(source))
+        fade_out = 0
+    else:
+        source = intro_path
+        key = ('intro', file_fingerprint(intro_path), size,
+               resolution_policy or DEFAULT_RESOLUTION_POLICY, round(float(fade_duration), 3))
+        fade_out = fade_duration
+    
+    info = probe_video(source)
+    if not cache_frames or not fits_frame_cache(size, info.fps, info.duration):
+        intro = VideoFileClip(str(source), audio=audio)
+        if use_intro_cache:
+            return intro
+        intro = fit_clip(intro, width, height, resolution_policy, reuse_buffer=True)
+        return intro.with_effects([FadeOut(fade_duration)])
+    
+    def decode():
+        clip = VideoFileClip(str(source), audio=False)
+        fps = clip.fps
+        if not use_intro_cache:
+            clip = fit_clip(clip, width, height, resolution_policy)
+        frames = list(clip.iter_frames(fps=fps, dtype='uint8'))
+        clip.close()
+        fade_out_frames(frames, fps, fade_out)
+        return fps, frames
+    
+    fps, frames = cached_frames(key, decode)
+    return frames_clip(fps, frames, source if audio and info.has_audio else None)
+
+
+def _open_main(main_path, size, audio=True):
+    """Open the main video at its native resolution (trimmed to even dimensions)."""
+    main = VideoFileClip(main_path, audio=audio)
+    width, height = size
+    if tuple(main.size) != size:
+        main = main.cropped(x1=0, y1=0, width=width, height=height)
+    return main
+
+
+def _concatenate(intro, main):
+    """
+    Join the intro and the main video into one timeline.
+    
+    The intro is always fitted to the main video's canvas, so the clips are
+    chained and each frame is streamed from whichever clip is playing. Only
+    clips of different sizes fall back to compositing, which allocates a
+    full-frame canvas per frame.
+    """
+    method = 'chain' if tuple(intro.size) == tuple(main.size) else 'compose'
+    return concatenate_videoclips([intro, main], method=method)
+
+
+def _plan_segments(main_path, fade_duration, count):
+    """
+    Split the main video at keyframes into roughly equal segments.
+    
+    Args:
+        main_path: Path to the main video
+        fade_duration: Duration of fade transition in seconds
+        count: Desired number of segments
+        
+    Returns:
+        List of (start, end) tuples; end is None for the last segment
+    """
+    info = probe_video(main_path)
+    keyframes = get_keyframe_times(main_path)
+    
+    cuts = []
+    for i in range(1, count):
+        target = info.duration * i / count
+        cut = min(keyframes, key=lambda t: abs(t - target), default=None)
+        # The fade must stay inside the first segment and cuts must increase
+        if cut is not None and cut > max([fade_duration] + cuts) and cut < info.duration:
+            cuts.append(cut)
+    
+    bounds = [0.0] + cuts
+    return [(start, end) for start, end in zip(bounds, cuts + [None])]
+
+
+def _segment_count(main_path, segment_workers):
+    """Segments a full MoviePy encode splits into (1 when the video is too short to split)."""
+    if segment_workers is None:
+        segment_workers = max(1, (os.cpu_count() or 1) // 2)
+    if segment_workers <= 1 or probe_video(main_path).duration < SEGMENT_PARALLEL_MIN_DURATION:
+        return 1
+    return segment_workers
+
+
+def _encode_segment(spec):
+    """
+    Encode one video-only segment of a segment-parallel stitch.
+    
+    Runs in a worker process, so it takes a plain dict and reopens the clips.
+    The first segment carries the intro and the fade-in.
+    
+    Args:
+        spec: Dict with intro_path, main_path, start, end, first, fps, size,
+              resolution_policy, fade_duration, use_intro_cache, profile,
+              threads and output keys
     """
-    intro = VideoFileClip(intro_path)
-    main = VideoFileClip(main_path)
+    size = tuple(spec['size'])
+    main = _open_main(spec['main_path'], size, audio=False)
+    part = main.subclipped(spec['start'], spec['end'])
+    
+    # Only the first segment needs the intro; opening it elsewhere would pin
+    # its cached frames in every worker process
+    # The intro is fitted to the main video, so every segment shares its canvas
+    intro = None
+    if spec['first']:
+        intro = _open_intro(spec['intro_path'], spec['fade_duration'], spec['use_intro_cache'], size,
+                            audio=False, resolution_policy=spec['resolution_policy'])
+        part = fade_in(part, spec['fade_duration'])
+        clip = _concatenate(intro, part)
+    else:
+        clip = part
+    
+    clip.write_videofile(
+        spec['output'],
+        fps=spec['fps'],
+        codec="libx264",
+        audio=False,
+        logger=None,
+        **spec['profile'].moviepy_kwargs(spec['threads'])
+    )
+    if intro is not None:
+        intro.close()
+    main.close()
 
-    # Ensure they have the same resolution to avoid crashes
-    # In MoviePy 2.x, use resize with height parameter
-    if main.h != intro.h:
-        main = main.resized(height=intro.h)
+
+def _audio_passthrough_plan(intro_path, main_path):
+    """
+    Decide whether the main video's audio stream can be copied as-is.
+    
+    Args:
+        intro_path: Path to the intro video
+        main_path: Path to the main video
+        
+    Returns:
+        Dict of audio_fps, audio_channels and audio_layout for the output, or
+        None if the audio has to be re-encoded
+    """
+    intro_info = probe_video(intro_path)
+    main_info = probe_video(main_path)
     
-    # Also ensure same width (for vertical videos, width might differ)
-    if main.w != intro.w:
-        main = main.resized(width=intro.w)
+    if main_info.audio_codec != 'aac' or not main_info.audio_sample_rate:
+        return None
+    # The intro's track comes from ffmpeg's AAC encoder, which writes AAC-LC;
+    # copying an HE-AAC stream behind it would decode with the wrong extradata
+    if main_info.audio_profile != 'LC':
+        return None
+    # The intro's audio must already sound like the main's, or the join would
+    # switch sample rate or layout mid-stream
+    if intro_info.has_audio and (
+        intro_info.audio_sample_rate != main_info.audio_sample_rate
+        or intro_info.audio_channels != main_info.audio_channels
+        or intro_info.audio_layout != main_info.audio_layout
+    ):
+        return None
+    
+    return {
+        'audio_fps': main_info.audio_sample_rate,
+        'audio_channels': main_info.audio_channels or 2,
+        'audio_layout': main_info.audio_layout,
+    }
 
-    # Add fade transition: fade out intro to black, fade in main video from black
-    intro = intro.with_effects([FadeOut(fade_duration)])
-    main = main.with_effects([FadeIn(fade_duration)])
 
-    final = concatenate_videoclips([intro, main], method="compose")
-    final.write_videofile(output_path, codec="libx264", audio_codec="aac")
+def _passthrough_audio(intro_path, main_path, intro_duration, plan, work_dir, profile):
+    """
+    Build the output audio track without re-encoding the main video's audio.
+    
+    Only the intro region is encoded (padded or trimmed to the intro's video
+    length so the main audio stays in sync); the main AAC stream is copied
+    behind it, so only the intro uses the profile's audio bitrate.
+    
+    Returns:
+        Path to the joined audio file
+    """
+    intro_audio = work_dir / 'intro_audio.m4a'
+    main_audio = work_dir / 'main_audio.m4a'
+    audio_path = work_dir / 'audio.m4a'
+    
+    if probe_video(intro_path).has_audio:
+        args = ['-i', str(intro_path), '-map', '0:a:0', '-af', 'apad']
+    else:
+        # Silence in the main's layout, so the join doesn't switch layout
+        layout = plan['audio_layout'] or 'mono'
+        args = ['-f', 'lavfi', '-i', f"anullsrc=r={plan['audio_fps']}:cl={layout}"]
+    args += [
+        '-t', f"{intro_duration:.6f}",
+        '-c:a', 'aac', *profile.audio_args(),
+        '-ar', str(plan['audio_fps']),
+        '-ac', str(plan['audio_channels']),
+        '-f', 'mp4', str(intro_audio)
+    ]
+    run_ffmpeg(args)
+    run_ffmpeg(['-i', str(main_path), '-map', '0:a:0', '-c', 'copy', '-f', 'mp4', str(main_audio)])
+    
+    concat_segments([intro_audio.resolve(), main_audio.resolve()], audio_path,
+                    work_dir / 'audio.txt')
+    return audio_path
+
+
+def _segment_parallel_stitch(intro_path, main_path, output_path, fade_duration,
+                             use_intro_cache, workers, threads, profile, audio_passthrough=True,
+                             on_progress=None, resolution_policy=None):
+    """
+    Encode the main video as keyframe-aligned segments in parallel processes.
+    
+    Video segments are encoded without audio and joined losslessly; the audio
+    track is built once for the whole timeline so there are no gaps at the joins.
+    Segments encode in other processes, so on_progress is called as each
+    segment completes rather than per frame.
+    
+    Returns:
+        True if the video was stitched, False if it couldn't be split
+    """
+    segments = _plan_segments(main_path, fade_duration, workers)
+    if len(segments) < 2:
+        return False
+    
+    intro_info = probe_video(intro_path)
+    main_info = probe_video(main_path)
+    fps = max(intro_info.fps, main_info.fps)
+    size = output_size(main_path)
+    
+    work_dir = Path(tempfile.mkdtemp(dir=Path(output_path).parent))
+    try:
+        specs = [{
+            'intro_path': intro_path,
+            'main_path': main_path,
+            'start': start,
+            'end': end,
+            'first': index == 0,
+            'fps': fps,
+            'size': size,
+            'resolution_policy': resolution_policy,
+            'fade_duration': fade_duration,
+            'use_intro_cache': use_intro_cache,
+            'profile': profile,
+            'threads': threads,
+            'output': str(work_dir / f"segment_{index:03d}.mp4"),
+        } for index, (start, end) in enumerate(segments)]
+        
+        # Warm the intro cache once instead of racing to render it in every worker
+        if use_intro_cache:
+            _intro_variant_path(intro_path, fade_duration, size, resolution_policy)
+        
+        main_duration = main_info.duration
+        segment_frames = [
+            int(((spec['end'] or main_duration) - spec['start']
+                 + (intro_info.duration if spec['first'] else 0)) * fps)
+            for spec in specs
+        ]
+        logger = EncodeProgressLogger(on_progress, total_frames=sum(segment_frames)) if on_progress else None
+        
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(specs), mp_context=context) as pool:
+            futures = {pool.submit(_encode_segment, spec): index for index, spec in enumerate(specs)}
+            frames_done = 0
+            for future in as_completed(futures):
+                future.result()
+                frames_done += segment_frames[futures[future]]
+                if logger:
+                    logger.report(frames_done, force=True)
+        
+        # Audio in one pass over the full timeline
+        audio_path = None
+        intro = _open_intro(intro_path, fade_duration, use_intro_cache, size,
+                            resolution_policy=resolution_policy, cache_frames=False)
+        audio_plan = _audio_passthrough_plan(intro_path, main_path) if audio_passthrough else None
+        if audio_plan is not None:
+            audio_path = _passthrough_audio(intro_path, main_path, intro.duration, audio_plan,
+                                            work_dir, profile)
+        else:
+            main = _open_main(main_path, size)
+            timeline = _concatenate(intro, main)
+            if timeline.audio is not None:
+                audio_path = work_dir / 'audio.m4a'
+                timeline.audio.write_audiofile(str(audio_path), fps=44100, codec='aac',
+                                               bitrate=profile.audio_bitrate, logger=None)
+            main.close()
+        intro.close()
+        
+        segment_ts = []
+        for spec in specs:
+            ts_path = Path(spec['output']).with_suffix('.ts')
+            remux_to_ts(spec['output'], ts_path)
+            segment_ts.append(ts_path.resolve())
+        concat_segments(segment_ts, output_path, work_dir / 'segments.txt', audio_path=audio_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
+
+
+def _moviepy_stitch(intro_path, main_path, output_path, fade_duration, smart_render=False,
+                    use_intro_cache=True, threads=None, segment_workers=1, audio_passthrough=True,
+                    on_progress=None, resolution_policy=None, encoder_profile=None):
+    """
+    Stitch through MoviePy's frame pipeline (the 'moviepy' backend).
+    
+    Takes the same arguments as stitch_intro.
+    
+    Returns:
+        True if the video was smart-rendered, False if it was fully encoded
+    """
+    profile = get_encoder_profile(encoder_profile)
+    if smart_render:
+        plan = _smart_render_plan(intro_path, main_path, fade_duration, profile)
+        if plan is not None:
+            _smart_render(intro_path, main_path, output_path, fade_duration, plan, profile,
+                          threads=threads, on_progress=on_progress,
+                          resolution_policy=resolution_policy)
+            return True
+    
+    segment_workers = _segment_count(main_path, segment_workers)
+    if segment_workers > 1:
+        # The job's thread budget (or the whole machine) is shared by its segment
+        # processes, so a pooled job doesn't multiply its threads by segment_workers
+        segment_threads = max(1, (threads or os.cpu_count() or 1) // segment_workers)
+        if _segment_parallel_stitch(intro_path, main_path, output_path, fade_duration,
+                                    use_intro_cache, segment_workers, segment_threads, profile,
+                                    audio_passthrough, on_progress, resolution_policy):
+            return False
+    
+    size = output_size(main_path)
+    intro = _open_intro(intro_path, fade_duration, use_intro_cache, size,
+                        resolution_policy=resolution_policy)
+    main = _open_main(main_path, size)
+
+    # Add fade transition: the intro is already faded out to black, fade in main video from black
+    main = fade_in(main, fade_duration)
+
+    final = _concatenate(intro, main)
+    audio_plan = _audio_passthrough_plan(intro_path, main_path) if audio_passthrough else None
+    if audio_plan is None:
+        final.write_videofile(output_path, codec="libx264", audio_codec="aac",
+                              logger=_encode_logger(on_progress), **profile.moviepy_kwargs(threads))
+    else:
+        work_dir = Path(tempfile.mkdtemp(dir=Path(output_path).parent))
+        try:
+            video_path = work_dir / 'video.mp4'
+            final.write_videofile(str(video_path), codec="libx264", audio=False,
+                                  logger=_encode_logger(on_progress), **profile.moviepy_kwargs(threads))
+            audio_path = _passthrough_audio(intro_path, main_path, intro.duration, audio_plan,
+                                            work_dir, profile)
+            mux_audio(video_path, audio_path, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
     intro.close()
     main.close()
+    return False
+
+
+def _stitch_filtergraph(intro_info, main_info, size, fps, fade_duration, fit_intro=True,
+                        resolution_policy=None, audio=None):
+    """
+    Build the ffmpeg filtergraph that fits, fades and joins the intro and main video.
+    
+    Input 0 is the intro and input 1 the main video. The transition is the
+    same dip to black as the MoviePy backend: the intro fades out, the main
+    video fades in, and the two are concatenated without overlapping.
+    
+    Args:
+        intro_info: VideoInfo of input 0
+        main_info: VideoInfo of input 1
+        size: Output (width, height)
+        fps: Output frame rate
+        fade_duration: Duration of fade transition in seconds
+        fit_intro: Fit and fade the intro here; False when input 0 is an
+            already fitted and faded variant from the intro cache
+        resolution_policy: How the intro is fitted to the main video's resolution
+        audio: (sample_rate, channel_layout) of the output audio, or None for
+            a video-only graph
+    
+    Returns:
+        Filtergraph string producing [v] (and [a] when audio is set)
+    """
+    width, height = size
+    
+    intro_chain = ['setpts=PTS-STARTPTS']
+    if fit_intro:
+        intro_chain.append(intro_fit_filter(width, height, resolution_policy))
+    intro_chain.append(f"fps={fps}")
+    if fit_intro and fade_duration > 0:
+        fade_start = max(intro_info.duration - fade_duration, 0)
+        intro_chain.append(f"fade=t=out:st={fade_start:.3f}:d={fade_duration:.3f}")
+    
+    main_chain = ['setpts=PTS-STARTPTS']
+    if (main_info.display_width, main_info.display_height) != size:
+        main_chain.append(f"crop={width}:{height}:0:0")
+    main_chain.append(f"fps={fps}")
+    if fade_duration > 0:
+        main_chain.append(f"fade=t=in:st=0:d={fade_duration:.3f}")
+    
+    graph = [
+        f"[0:v:0]{','.join(intro_chain + ['format=yuv420p', 'setsar=1'])}[v0]",
+        f"[1:v:0]{','.join(main_chain + ['format=yuv420p', 'setsar=1'])}[v1]",
+    ]
+    if audio is None:
+        graph.append("[v0][v1]concat=n=2:v=1:a=0[v]")
+        return ';'.join(graph)
+    
+    # Each side's audio is padded or trimmed to its video length (silence if
+    # it has none) so the join stays in sync
+    sample_rate, layout = audio
+    for index, info in enumerate((intro_info, main_info)):
+        if info.has_audio:
+            graph.append(
+                f"[{index}:a:0]asetpts=PTS-STARTPTS,aresample={sample_rate},"
+                f"aformat=sample_rates={sample_rate}:channel_layouts={layout},"
+                f"apad,atrim=0:{info.duration:.6f}[a{index}]"
+            )
+        else:
+            graph.append(f"anullsrc=r={sample_rate}:cl={layout},atrim=0:{info.duration:.6f}[a{index}]")
+    graph.append("[v0][a0][v1][a1]concat=n=2:v=1:a=1[v][a]")
+    return ';'.join(graph)
+
+
+def _ffmpeg_stitch(intro_path, main_path, output_path, fade_duration, smart_render=False,
+                   use_intro_cache=True, threads=None, segment_workers=1, audio_passthrough=True,
+                   on_progress=None, resolution_policy=None, encoder_profile=None):
+    """
+    Stitch with a single ffmpeg filtergraph (the 'ffmpeg' backend).
+    
+    Scaling, fades and the join all run inside one ffmpeg process, so frames
+    never round-trip through Python. Takes the same arguments as stitch_intro;
+    segment_workers is ignored because one ffmpeg encode already spreads
+    across all cores.
+    
+    Returns:
+        True if the video was smart-rendered, False if it was fully encoded
+    """
+    profile = get_encoder_profile(encoder_profile)
+    if smart_render:
+        plan = _smart_render_plan(intro_path, main_path, fade_duration, profile)
+        if plan is not None:
+            _smart_render(intro_path, main_path, output_path, fade_duration, plan, profile,
+                          threads=threads, on_progress=on_progress,
+                          resolution_policy=resolution_policy, backend='ffmpeg')
+            return True
+    
+    size = output_size(main_path)
+    intro_input = intro_path
+    if use_intro_cache:
+        intro_input = _intro_variant_path(intro_path, fade_duration, size, resolution_policy)
+    intro_info = probe_video(intro_input)
+    main_info = probe_video(main_path)
+    fps = max(intro_info.fps, main_info.fps)
+    
+    audio_plan = _audio_passthrough_plan(intro_path, main_path) if audio_passthrough else None
+    audio = None
+    if audio_plan is None and (intro_info.has_audio or main_info.has_audio):
+        channels = main_info.audio_channels or intro_info.audio_channels or 2
+        audio = (
+            main_info.audio_sample_rate or intro_info.audio_sample_rate or 44100,
+            default_channel_layout(channels),
+        )
+    
+    graph = _stitch_filtergraph(intro_info, main_info, size, fps, fade_duration,
+                                fit_intro=not use_intro_cache,
+                                resolution_policy=resolution_policy, audio=audio)
+    args = ['-i', str(intro_input), '-i', str(main_path), '-filter_complex', graph, '-map', '[v]']
+    if audio is not None:
+        args += ['-map', '[a]', '-c:a', 'aac', *profile.audio_args(), '-ar', str(audio[0])]
+    args += ['-c:v', 'libx264', *profile.video_args(threads), '-movflags', '+faststart']
+    
+    total_frames = int((intro_info.duration + main_info.duration) * fps)
+    on_frame = _frame_reporter(on_progress, total_frames)
+    if audio_plan is None:
+        run_ffmpeg_progress(args + ['-f', 'mp4', str(output_path)], on_frame)
+    else:
+        work_dir = Path(tempfile.mkdtemp(dir=Path(output_path).parent))
+        try:
+            video_path = work_dir / 'video.mp4'
+            run_ffmpeg_progress(args + ['-f', 'mp4', str(video_path)], on_frame)
+            audio_path = _passthrough_audio(intro_path, main_path, intro_info.duration,
+                                            audio_plan, work_dir, profile)
+            mux_audio(video_path, audio_path, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if on_frame:
+        on_frame(total_frames)
+    return False
+
+
+# Stitch backends by name. A backend is called with stitch_intro's arguments
+# (encoder_profile already resolved to an EncoderProfile) and returns True if
+# it smart-rendered the video.
+STITCH_BACKENDS = {
+    'moviepy': _moviepy_stitch,
+    'ffmpeg': _ffmpeg_stitch,
+}
+
+
+def register_stitch_backend(name, stitch):
+    """
+    Make a stitch backend selectable by name.
+    
+    Args:
+        name: Name used for the backend argument and STITCH_BACKEND
+        stitch: Callable taking stitch_intro's arguments (intro_path,
+            main_path, output_path, fade_duration and the keyword options)
+            and returning True if the video was smart-rendered
+    """
+    STITCH_BACKENDS[name] = stitch
+
+
+def get_stitch_backend(name=None):
+    """
+    Look up a stitch backend by name.
+    
+    Args:
+        name: Backend name (default: the STITCH_BACKEND env var, or 'moviepy')
+        
+    Returns:
+        The backend callable
+    """
+    name = name or DEFAULT_STITCH_BACKEND
+    if name not in STITCH_BACKENDS:
+        raise ValueError(f"Unknown stitch backend '{name}' (expected one of {', '.join(STITCH_BACKENDS)})")
+    return STITCH_BACKENDS[name]
+
+
+def planned_segment_workers(intro_path, main_path, fade_duration=0.5, smart_render=False,
+                            segment_workers=1, backend=None, encoder_profile=None):
+    """
+    Get how many segment processes a stitch will run.
+
+    Mirrors the backends: only a full 'moviepy' encode of a video at least
+    SEGMENT_PARALLEL_MIN_DURATION long is split, so the ffmpeg backend, a
+    smart render and short videos run as one encode.
+
+    Args:
+        Same as stitch_intro
+
+    Returns:
+        Number of parallel encodes (1 if the video isn't split)
+    """
+    if (backend or DEFAULT_STITCH_BACKEND) != 'moviepy':
+        return 1
+    count = _segment_count(main_path, segment_workers)
+    if count > 1 and smart_render and _smart_render_plan(
+            intro_path, main_path, fade_duration, get_encoder_profile(encoder_profile)) is not None:
+        return 1
+    return count
+
+
+def stitch_intro(intro_path, main_path, output_path, fade_duration=0.5, smart_render=False,
+                 use_intro_cache=True, threads=None, segment_workers=1, audio_passthrough=True,
+                 on_progress=None, resolution_policy=None, backend=None, use_output_cache=True,
+                 encoder_profile=None, rate_control=None, memory_budget=None):
+    """
+    Stitch an intro video to the beginning of a main video.
+    
+    The output keeps the main video's native resolution; only the intro is
+    scaled, padded or cropped to match it. It is written under a temporary
+    name and renamed into place once complete.
+    
+    Args:
+        intro_path: Path to the intro video
+        main_path: Path to the main video
+        output_path: Path for the output video
+        fade_duration: Duration of fade transition in seconds
+        smart_render: Re-encode only the intro and the keyframe-aligned head
+            of the main video and stream-copy the rest. Falls back to a full
+            encode when the main video's codecs or resolution don't match.
+        use_intro_cache: Reuse a pre-faded, pre-encoded intro from the on-disk
+            variant cache instead of decoding and fading the intro every time
+        threads: Number of encoder threads (None lets x264 pick; pooled batches pass
+            the encoder profile's threads per job, see plan_workers)
+        segment_workers: For full encodes of videos longer than
+            SEGMENT_PARALLEL_MIN_DURATION, split the main video at keyframes
+            and encode this many segments in parallel processes, which share
+            threads between them (1 disables, None uses half the CPU count)
+        audio_passthrough: Copy the main video's audio stream instead of
+            re-encoding it when it is AAC-LC with the intro's sample rate and
+            channel layout; only the intro's audio is encoded
+        on_progress: Optional callback receiving an EncodeProgress (frames
+            encoded, encode fps, elapsed time and ETA) while the video encodes.
+            It is called on the calling thread.
+        resolution_policy: How the intro is fitted when its aspect ratio
+            differs from the main video's: 'pad', 'crop' or 'scale'
+            (default: the INTRO_RESOLUTION_POLICY env var, or 'pad')
+        backend: Engine that does the compositing: 'moviepy' (frames go
+            through Python) or 'ffmpeg' (one filtergraph in a single ffmpeg
+            process; segment_workers is ignored) or any registered backend
+            (default: the STITCH_BACKEND env var, or 'moviepy')
+        use_output_cache: Return the output of an earlier stitch with the
+            same main video, intro and settings instead of encoding again
+        encoder_profile: Name of an entry in ENCODER_PROFILES ('draft',
+            'fast-upload', 'balanced' or 'archive') or an EncoderProfile
+            (default: the ENCODER_PROFILE env var, or 'balanced')
+        rate_control: 'crf' to encode at the profile's CRF alone, or 'capped'
+            to keep CRF as the quality floor but cap the bitrate at the main
+            video's (scaled to the output resolution), so a low-bitrate source
+            never comes out larger (default: the RATE_CONTROL env var, or 'crf')
+        memory_budget: MemoryBudget the encode's estimated memory is reserved
+            from; it waits while concurrent stitches would exceed it
+            (default: the process-wide budget, MEMORY_BUDGET_MB or half the RAM)
+            
+    Returns:
+        True if the video was smart-rendered, False if it was fully encoded
+    """
+    backend = backend or DEFAULT_STITCH_BACKEND
+    stitch = get_stitch_backend(backend)
+    profile = apply_rate_control(encoder_profile, main_path, rate_control)
+    
+    key = None
+    if use_output_cache:
+        key = output_key(
+            main_path, intro_path,
+            fade_duration=round(float(fade_duration), 3),
+            backend=backend,
+            smart_render=smart_render,
+            use_intro_cache=use_intro_cache,
+            audio_passthrough=audio_passthrough,
+            resolution_policy=resolution_policy or DEFAULT_RESOLUTION_POLICY,
+            encoder_profile=asdict(profile),
+        )
+        entry = lookup_output(key, output_path)
+        if entry is not None:
+            return entry.get('smart_render', False)
+    
+    budget = memory_budget or default_budget
+    encodes = planned_segment_workers(intro_path, main_path, fade_duration, smart_render,
+                                      segment_workers, backend, profile)
+    needed = estimate_stitch_memory(main_path, backend, encodes, intro_path)
+    with budget.reserve(needed), atomic_output(output_path) as temp_path:
+        smart = stitch(intro_path, main_path, temp_path, fade_duration, smart_render=smart_render,
+                       use_intro_cache=use_intro_cache, threads=threads,
+                       segment_workers=segment_workers, audio_passthrough=audio_passthrough,
+                       on_progress=on_progress, resolution_policy=resolution_policy,
+                       encoder_profile=profile)
+    
+    if key is not None:
+        record_output(key, output_path, smart_render=smart)
+    return smart
 
 
 def stitch_intro_auto(main_path, output_path, intro_horizontal='intro.mp4', 
-                       intro_vertical='intro_short.mp4', fade_duration=0.5):
+                       intro_vertical='intro_short.mp4', fade_duration=0.5,
+                       smart_render=False, use_intro_cache=True, segment_workers=1,
+                       on_progress=None, resolution_policy=None, extra_intros=None, backend=None,
+                       encoder_profile=None, rate_control=None):
     """
     Automatically select and stitch the appropriate intro based on video orientation.
     
@@ -101,14 +921,31 @@ def stitch_intro_auto(main_path, output_path, intro_horizontal='intro.mp4',
         intro_horizontal: Path to 16:9 intro
         intro_vertical: Path to 9:16 intro (for Shorts)
         fade_duration: Duration of fade transition in seconds
+        smart_render: Only re-encode the fade region when possible
+        use_intro_cache: Reuse cached pre-faded intro variants
+        segment_workers: Parallel segment encodes for long videos (1 disables)
+        on_progress: Optional callback receiving EncodeProgress updates
+        resolution_policy: How the intro is fitted to the main video ('pad',
+            'crop' or 'scale')
+        extra_intros: Other pre-rendered intros to choose from by aspect ratio
+            (default: the INTRO_VARIANTS env var)
+        backend: Stitch backend, 'moviepy' or 'ffmpeg' (default: the
+            STITCH_BACKEND env var)
+        encoder_profile: Encoder profile name (default: the ENCODER_PROFILE
+            env var)
+        rate_control: 'crf' or 'capped' (default: the RATE_CONTROL env var)
         
     Returns:
         The intro_path that was used
     """
     # Select appropriate intro
-    intro_path = select_intro_for_video(main_path, intro_horizontal, intro_vertical)
+    intro_path = select_intro_for_video(main_path, intro_horizontal, intro_vertical, extra_intros)
     
     # Stitch videos
-    stitch_intro(intro_path, main_path, output_path, fade_duration)
+    stitch_intro(intro_path, main_path, output_path, fade_duration,
+                 smart_render=smart_render, use_intro_cache=use_intro_cache,
+                 segment_workers=segment_workers, on_progress=on_progress,
+                 resolution_policy=resolution_policy, backend=backend,
+                 encoder_profile=encoder_profile, rate_control=rate_control)
     
     return intro_path
\ No newline at end of file
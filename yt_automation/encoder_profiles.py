@@ -0,0 +1,110 @@
+"""
+Encoder Profiles Module
+Named x264/AAC settings that trade encode speed against quality and file size
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """x264 video and AAC audio settings for an output encode."""
+    name: str
+    preset: str
+    crf: int | None = 23
+    bitrate: str | None = None  # e.g. '4M'; a fixed bitrate instead of CRF
+    maxrate: str | None = None  # VBV cap on top of CRF (see rate_control.py)
+    bufsize: str | None = None
+    threads: int = 4  # encoder threads per job when encodes share the machine (see plan_workers)
+    gop: int | None = None  # keyframe interval in frames (None keeps x264's default)
+    pix_fmt: str = 'yuv420p'
+    audio_bitrate: str = '128k'
+
+    def video_args(self, threads=None):
+        """
+        ffmpeg output arguments for the video stream (without -c:v).
+
+        Args:
+            threads: Encoder threads (None lets x264 pick)
+        """
+        args = ['-preset', self.preset]
+        if self.bitrate:
+            args += ['-b:v', self.bitrate]
+        elif self.crf is not None:
+            args += ['-crf', str(self.crf)]
+        args += self._vbv_args()
+        if self.gop:
+            args += ['-g', str(self.gop)]
+        args += ['-pix_fmt', self.pix_fmt]
+        if threads is not None:
+            args += ['-threads', str(threads)]
+        return args
+
+    def _vbv_args(self):
+        """-maxrate/-bufsize arguments when the profile is rate-capped."""
+        if not self.maxrate:
+            return []
+        return ['-maxrate', self.maxrate, '-bufsize', self.bufsize or self.maxrate]
+
+    def audio_args(self):
+        """ffmpeg output arguments for the audio stream (without -c:a)."""
+        return ['-b:a', self.audio_bitrate]
+
+    def moviepy_kwargs(self, threads=None):
+        """
+        Keyword arguments for MoviePy's write_videofile.
+
+        Args:
+            threads: Encoder threads (None lets x264 pick)
+        """
+        ffmpeg_params = []
+        if not self.bitrate and self.crf is not None:
+            ffmpeg_params += ['-crf', str(self.crf)]
+        ffmpeg_params += self._vbv_args()
+        if self.gop:
+            ffmpeg_params += ['-g', str(self.gop)]
+        ffmpeg_params += ['-pix_fmt', self.pix_fmt]
+        return {
+            'preset': self.preset,
+            'bitrate': self.bitrate,
+            'audio_bitrate': self.audio_bitrate,
+            'threads': threads,
+            'ffmpeg_params': ffmpeg_params,
+        }
+
+
+ENCODER_PROFILES = {
+    profile.name: profile for profile in (
+        # Fast presets do little work per frame, so x264's threads stop paying
+        # off sooner and more encodes should run side by side instead
+        # Quick previews; large files, visible artifacts
+        EncoderProfile('draft', preset='ultrafast', crf=30, threads=2, gop=250, audio_bitrate='96k'),
+        # YouTube re-encodes everything anyway, so spend bits rather than encode time
+        EncoderProfile('fast-upload', preset='veryfast', crf=21, threads=3, gop=120, audio_bitrate='192k'),
+        # MoviePy's defaults
+        EncoderProfile('balanced', preset='medium', crf=23, threads=4, gop=250, audio_bitrate='128k'),
+        # Keep-forever masters; slow to encode
+        EncoderProfile('archive', preset='slow', crf=18, threads=6, gop=250, audio_bitrate='320k'),
+    )
+}
+DEFAULT_ENCODER_PROFILE = os.getenv('ENCODER_PROFILE', 'balanced')
+
+
+def get_encoder_profile(profile=None):
+    """
+    Look up an encoder profile.
+
+    Args:
+        profile: Profile name, an EncoderProfile (returned as-is) or None for
+                 the ENCODER_PROFILE env var (default: 'balanced')
+
+    Returns:
+        EncoderProfile
+    """
+    if isinstance(profile, EncoderProfile):
+        return profile
+    name = profile or DEFAULT_ENCODER_PROFILE
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{name}' (expected one of {', '.join(ENCODER_PROFILES)})")
+    return ENCODER_PROFILES[name]
@@ -0,0 +1,158 @@
+"""
+FFmpeg Utilities Module
+Helpers for running ffmpeg directly when MoviePy's frame pipeline is not needed
+"""
+
+import re
+import subprocess
+import tempfile
+
+from moviepy.config import FFMPEG_BINARY
+
+
+def run_ffmpeg(args):
+    """
+    Run ffmpeg with the given arguments and raise on failure.
+
+    Args:
+        args: List of ffmpeg arguments (without the binary itself)
+
+    Returns:
+        CompletedProcess from subprocess.run
+    """
+    cmd = [FFMPEG_BINARY, '-y', '-hide_banner', '-loglevel', 'error'] + list(args)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+    return result
+
+
+def run_ffmpeg_progress(args, on_frame=None):
+    """
+    Run ffmpeg like run_ffmpeg, reporting how many frames have been written.
+
+    Progress is read from ffmpeg's -progress output, so it works for encodes
+    that never pass through MoviePy.
+
+    Args:
+        args: List of ffmpeg arguments (without the binary itself)
+        on_frame: Optional callable receiving the number of frames written so far
+    """
+    if on_frame is None:
+        run_ffmpeg(args)
+        return
+
+    cmd = [FFMPEG_BINARY, '-y', '-hide_banner', '-loglevel', 'error',
+           '-nostats', '-progress', 'pipe:1'] + list(args)
+    # stderr goes to a file so a chatty encode can't fill the pipe and stall
+    with tempfile.TemporaryFile(mode='w+') as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'frame' and value.isdigit():
+                on_frame(int(value))
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().strip()}")
+
+
+def get_keyframe_times(video_path, until=None):
+    """
+    List the keyframe timestamps of a video's first video stream.
+
+    Only keyframes are decoded, so this is cheap even for long videos.
+
+    Args:
+        video_path: Path to the video file
+        until: Optional time in seconds after which to stop scanning
+
+    Returns:
+        Sorted list of keyframe times in seconds, relative to the start of the
+        file (without -copyts, ffmpeg already subtracts the container start time)
+    """
+    cmd = [FFMPEG_BINARY, '-hide_banner', '-skip_frame', 'nokey', '-i', str(video_path)]
+    if until is not None:
+        cmd += ['-t', str(until)]
+    cmd += ['-map', '0:v:0', '-vf', 'showinfo', '-f', 'null', '-']
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+
+    times = [float(t) for t in re.findall(r'pts_time:\s*([-\d.]+)', result.stderr)]
+    return sorted(t for t in times if t >= 0)
+
+
+def remux_to_ts(input_path, output_path, start=None):
+    """
+    Stream-copy a video into an MPEG-TS file with in-band H.264 headers.
+
+    MPEG-TS segments can be joined with the concat demuxer even when they
+    were produced by different encoders.
+
+    Args:
+        input_path: Source MP4 file
+        output_path: Destination .ts file
+        start: Optional keyframe time to start copying from
+    """
+    args = []
+    if start:
+        args += ['-ss', f"{start:.6f}"]
+    args += [
+        '-i', str(input_path),
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-c', 'copy',
+        '-bsf:v', 'h264_mp4toannexb',
+        '-f', 'mpegts',
+        str(output_path)
+    ]
+    run_ffmpeg(args)
+
+
+def concat_segments(segment_paths, output_path, list_path, audio_path=None):
+    """
+    Losslessly join segments with the ffmpeg concat demuxer.
+
+    Args:
+        segment_paths: Ordered list of segment files
+        output_path: Destination MP4 file
+        list_path: Path where the concat list file is written
+        audio_path: Optional separately encoded audio track to mux in
+            instead of the segments' own audio
+    """
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            escaped = str(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    args = ['-f', 'concat', '-safe', '0', '-i', str(list_path)]
+    if audio_path:
+        args += ['-i', str(audio_path), '-map', '0:v:0', '-map', '1:a:0']
+    args += [
+        '-c', 'copy',
+        '-bsf:a', 'aac_adtstoasc',
+        '-movflags', '+faststart',
+        str(output_path)
+    ]
+    run_ffmpeg(args)
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """
+    Combine the video stream of one file with the audio stream of another.
+
+    Both streams are copied, nothing is re-encoded.
+
+    Args:
+        video_path: File providing the video stream
+        audio_path: File providing the audio stream
+        output_path: Destination MP4 file
+    """
+    run_ffmpeg([
+        '-i', str(video_path),
+        '-i', str(audio_path),
+        '-map', '0:v:0', '-map', '1:a:0',
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        str(output_path)
+    ])
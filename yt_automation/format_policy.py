@@ -0,0 +1,84 @@
+"""
+Format Policy Module
+Chooses which YouTube streams to download so the stitch can copy them instead of transcoding
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class FormatPolicy:
+    """yt-dlp format selection for downloads."""
+    name: str
+    format: str  # yt-dlp format selector; {height} is replaced by the height limit
+    format_sort: tuple = ()  # yt-dlp -S fields, most important first
+    description: str = ''
+
+    def ydl_params(self, max_height=None):
+        """
+        YoutubeDL options that apply the policy.
+
+        Args:
+            max_height: Tallest video stream to download (default: DOWNLOAD_MAX_HEIGHT)
+        """
+        height = max_height or DOWNLOAD_MAX_HEIGHT
+        return {
+            'format': self.format.format(height=height),
+            'format_sort': [field.format(height=height) for field in self.format_sort],
+            # Separate streams are remuxed into MP4 by ffmpeg, never re-encoded
+            'merge_output_format': 'mp4',
+        }
+
+
+FORMAT_POLICIES = {
+    policy.name: policy for policy in (
+        # H.264 video + AAC audio, downloaded separately and merged: matches the
+        # intro's codecs, so smart render and audio passthrough can copy streams
+        FormatPolicy(
+            'compatible',
+            format=('bv*[vcodec^=avc1][height<={height}]+ba[acodec^=mp4a]'
+                    '/b[vcodec^=avc1][acodec^=mp4a][height<={height}]'
+                    '/bv*[height<={height}]+ba/b[height<={height}]'),
+            format_sort=('res:{height}', 'vcodec:h264', 'acodec:aac', 'ext:mp4:m4a'),
+            description='H.264 + AAC streams at the target resolution (no transcoding)',
+        ),
+        # Highest quality at the target resolution in any codec (VP9/AV1 + Opus
+        # usually); always fully re-encoded
+        FormatPolicy(
+            'best',
+            format='bv*[height<={height}]+ba/b[height<={height}]',
+            format_sort=('res:{height}',),
+            description='Best quality in any codec (forces a full re-encode)',
+        ),
+        # A single file with audio and video; often capped at 360p or 720p
+        FormatPolicy(
+            'progressive',
+            format='best[height<={height}]',
+            description='Single progressive file (legacy, often low resolution)',
+        ),
+    )
+}
+DEFAULT_FORMAT_POLICY = os.getenv('DOWNLOAD_FORMAT_POLICY', 'compatible')
+
+# Tallest video stream downloaded; the output keeps the download's resolution
+DOWNLOAD_MAX_HEIGHT = int(os.getenv('DOWNLOAD_MAX_HEIGHT', '1080'))
+
+
+def get_format_policy(policy=None):
+    """
+    Look up a format policy.
+
+    Args:
+        policy: Policy name, a FormatPolicy (returned as-is) or None for the
+                DOWNLOAD_FORMAT_POLICY env var (default: 'compatible')
+
+    Returns:
+        FormatPolicy
+    """
+    if isinstance(policy, FormatPolicy):
+        return policy
+    name = policy or DEFAULT_FORMAT_POLICY
+    if name not in FORMAT_POLICIES:
+        raise ValueError(f"Unknown format policy '{name}' (expected one of {', '.join(FORMAT_POLICIES)})")
+    return FORMAT_POLICIES[name]
@@ -0,0 +1,205 @@
+"""
+Frame Cache Module
+Keeps the intro's decoded, faded frames in memory so a worker stitching many videos decodes it once
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from moviepy import AudioFileClip, VideoClip
+
+
+# Upper bound for decoded intro frames held per process (default 256 MB).
+# The frames stay resident for the life of every stitch worker, so this is
+# multiplied by the worker count; 256 MB fits about 3 s of 720p30, and larger
+# intros are decoded per video as before.
+INTRO_FRAME_CACHE_MAX_BYTES = int(os.getenv('INTRO_FRAME_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# key -> (fps, frames); least recently used first
+_frames = OrderedDict()
+_frames_bytes = 0
+_lock = threading.Lock()
+
+
+def fade_coefficients(count, fade_frames, fade_out=False):
+    """
+    Precompute the per-frame brightness factors of a linear fade.
+
+    Matches MoviePy's FadeIn/FadeOut: factor = t / fade_duration for a fade-in,
+    (duration - t) / fade_duration for a fade-out, clipped to [0, 1].
+
+    Args:
+        count: Number of frames the table covers
+        fade_frames: Fade duration in frames (fade_duration * fps)
+        fade_out: Count down from the last frame instead of up from the first
+
+    Returns:
+        float32 array of length count
+    """
+    steps = np.arange(count, dtype=np.float32)
+    if fade_out:
+        steps = count - steps
+    return np.clip(steps / max(fade_frames, 1e-6), 0.0, 1.0)
+
+
+def scale_frame(frame, coefficient):
+    """
+    Multiply a uint8 frame by a brightness factor in place.
+
+    The product is computed in NumPy's small ufunc buffers and written straight
+    back as uint8, so no full-frame float copy is allocated.
+
+    Args:
+        frame: H x W x 3 uint8 array (copied first if read-only)
+        coefficient: Factor between 0 and 1
+
+    Returns:
+        The scaled frame
+    """
+    if not frame.flags.writeable:
+        frame = frame.copy()
+    np.multiply(frame, coefficient, out=frame, casting='unsafe')
+    return frame
+
+
+def fade_in(clip, fade_duration):
+    """
+    Fade a clip in from black using a precomputed coefficient table.
+
+    Drop-in replacement for with_effects([FadeIn(fade_duration)]) for clips
+    streamed to the encoder; frames after the fade are passed through
+    untouched. Read-only frames (as the video reader returns them) are faded
+    into one buffer reused for the whole fade, so a frame is only valid
+    until the next one is requested.
+
+    Args:
+        clip: MoviePy video clip
+        fade_duration: Fade duration in seconds
+
+    Returns:
+        Transformed clip
+    """
+    if fade_duration <= 0:
+        return clip
+    fps = clip.fps
+    coefficients = fade_coefficients(math.ceil(fade_duration * fps), fade_duration * fps)
+    buffer = None
+
+    def apply(get_frame, t):
+        nonlocal buffer
+        frame = get_frame(t)
+        index = int(round(t * fps))
+        if index >= len(coefficients):
+            return frame
+        if frame.flags.writeable:
+            return scale_frame(frame, coefficients[index])
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = np.empty_like(frame)
+        np.multiply(frame, coefficients[index], out=buffer, casting='unsafe')
+        return buffer
+
+    return clip.transform(apply)
+
+
+def fade_out_frames(frames, fps, fade_duration):
+    """
+    Fade the tail of a decoded frame list out to black, in place.
+
+    Args:
+        frames: List of uint8 frames (replaced by copies where read-only)
+        fps: Frame rate of the list
+        fade_duration: Fade duration in seconds
+    """
+    if fade_duration <= 0 or not frames:
+        return
+    coefficients = fade_coefficients(len(frames), fade_duration * fps, fade_out=True)
+    for index in range(len(frames)):
+        if coefficients[index] < 1.0:
+            frames[index] = scale_frame(frames[index], coefficients[index])
+
+
+def fits_frame_cache(size, fps, duration, max_bytes=None):
+    """
+    Check whether an intro's decoded frames fit in the cache.
+
+    Args:
+        size: Frame (width, height)
+        fps: Frame rate
+        duration: Duration in seconds
+        max_bytes: Cache size limit (default: INTRO_FRAME_CACHE_MAX_BYTES)
+
+    Returns:
+        True if the frames can be cached
+    """
+    max_bytes = INTRO_FRAME_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    width, height = size
+    return width * height * 3 * math.ceil(duration * fps) <= max_bytes
+
+
+def cached_frames(key, decode, max_bytes=None):
+    """
+    Return decoded frames from the cache, decoding them on a miss.
+
+    Cached frames are made read-only so one stitch can't alter another's intro.
+    Least-recently-used entries are evicted to stay within max_bytes.
+
+    Args:
+        key: Hashable identifying the frames (source, size, fade, ...)
+        decode: Callable returning (fps, list of uint8 frames)
+        max_bytes: Cache size limit (default: INTRO_FRAME_CACHE_MAX_BYTES)
+
+    Returns:
+        Tuple of (fps, frames)
+    """
+    global _frames_bytes
+    max_bytes = INTRO_FRAME_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    with _lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return _frames[key]
+
+    fps, frames = decode()
+    for frame in frames:
+        frame.flags.writeable = False
+    size = sum(frame.nbytes for frame in frames)
+
+    with _lock:
+        if size <= max_bytes and key not in _frames:
+            _frames[key] = (fps, frames)
+            _frames_bytes += size
+            while _frames_bytes > max_bytes:
+                _, (_, evicted) = _frames.popitem(last=False)
+                _frames_bytes -= sum(frame.nbytes for frame in evicted)
+    return fps, frames
+
+
+def clear_frame_cache():
+    """Drop every cached intro from memory."""
+    global _frames_bytes
+    with _lock:
+        _frames.clear()
+        _frames_bytes = 0
+
+
+def frames_clip(fps, frames, audio_path=None):
+    """
+    Build a clip that plays back decoded frames.
+
+    Args:
+        fps: Frame rate of the frames
+        frames: List of uint8 frames
+        audio_path: Optional file whose audio track is attached
+
+    Returns:
+        MoviePy VideoClip
+    """
+    last = len(frames) - 1
+    clip = VideoClip(lambda t: frames[min(int(t * fps + 1e-6), last)], duration=len(frames) / fps)
+    clip = clip.with_fps(fps)
+    if audio_path:
+        clip = clip.with_audio(AudioFileClip(str(audio_path)))
+    return clip
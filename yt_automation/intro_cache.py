@@ -0,0 +1,196 @@
+"""
+Intro Cache Module
+Keeps pre-faded, pre-encoded intro variants on disk so batches only render them once
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from yt_automation.ffmpeg_utils import run_ffmpeg
+from yt_automation.probe import probe_video
+from yt_automation.resolution import DEFAULT_RESOLUTION_POLICY, intro_fit_filter
+
+
+# Default cache location and size limit (2 GB)
+INTRO_CACHE_DIR = Path('.clipstream_cache') / 'intros'
+INTRO_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Intro variants are re-encoded once and reused many times, so favour quality
+INTRO_VARIANT_CRF = 18
+
+# (path, size, mtime) -> sha256 hex digest
+_fingerprints = {}
+
+
+def file_fingerprint(file_path):
+    """
+    Compute a SHA-256 content hash of a file, memoized by path, size and mtime.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _fingerprints:
+        return _fingerprints[memo_key]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    _fingerprints[memo_key] = digest.hexdigest()
+    return _fingerprints[memo_key]
+
+
+def intro_variant_key(intro_path, width, height, fps, audio_fps, fade_duration,
+                      codec='libx264', audio_channels=None, policy=None):
+    """
+    Build the cache key for an intro variant.
+
+    Args:
+        intro_path: Path to the source intro video
+        width: Target width in pixels
+        height: Target height in pixels
+        fps: Target frame rate
+        audio_fps: Target audio sample rate
+        fade_duration: Fade-out duration in seconds
+        codec: Video codec used for the variant
+        audio_channels: Target audio channel count (None keeps the source layout)
+        policy: Resolution policy used to fit the intro (see resolution.py)
+
+    Returns:
+        Short hex string identifying the variant
+    """
+    parts = [
+        file_fingerprint(intro_path),
+        f"{width}x{height}",
+        policy or DEFAULT_RESOLUTION_POLICY,
+        f"{float(fps):.3f}",
+        codec,
+        str(audio_fps),
+        str(audio_channels or 'src'),
+        f"{float(fade_duration):.3f}",
+    ]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+
+def _render_intro_variant(intro_path, output_path, width, height, fps, audio_fps,
+                          fade_duration, codec, audio_channels, policy):
+    """Fit, fade and encode the intro in a single ffmpeg pass."""
+    duration = probe_video(intro_path).duration
+
+    filters = [intro_fit_filter(width, height, policy), f"fps={fps}"]
+    if fade_duration > 0:
+        fade_start = max(duration - fade_duration, 0)
+        filters.append(f"fade=t=out:st={fade_start:.3f}:d={fade_duration:.3f}")
+    filters.append("format=yuv420p")
+
+    args = [
+        '-i', str(intro_path),
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', ','.join(filters),
+        '-c:v', codec, '-crf', str(INTRO_VARIANT_CRF),
+        '-c:a', 'aac', '-ar', str(audio_fps),
+    ]
+    if audio_channels:
+        args += ['-ac', str(audio_channels)]
+    args += ['-f', 'mp4', str(output_path)]
+    run_ffmpeg(args)
+
+
+def get_intro_variant(intro_path, width, height, fps, audio_fps=44100, fade_duration=0.5,
+                      codec='libx264', audio_channels=None, policy=None, cache_dir=None,
+                      max_bytes=None):
+    """
+    Return a cached, already-faded and encoded intro at the requested profile.
+
+    The variant is rendered on the first request and reused afterwards.
+    Hits refresh the entry's modification time so eviction is least-recently-used.
+
+    Args:
+        intro_path: Path to the source intro video
+        width: Target width in pixels
+        height: Target height in pixels
+        fps: Target frame rate
+        audio_fps: Target audio sample rate
+        fade_duration: Fade-out duration in seconds
+        codec: Video codec for the variant
+        audio_channels: Target audio channel count (None keeps the source layout)
+        policy: How the intro is fitted when its aspect ratio differs from
+                width x height: 'pad', 'crop' or 'scale' (default:
+                DEFAULT_RESOLUTION_POLICY)
+        cache_dir: Cache directory (default: INTRO_CACHE_DIR)
+        max_bytes: Cache size limit (default: INTRO_CACHE_MAX_BYTES)
+
+    Returns:
+        Path to the cached MP4 variant
+    """
+    cache_dir = Path(cache_dir or INTRO_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    key = intro_variant_key(intro_path, width, height, fps, audio_fps, fade_duration,
+                            codec, audio_channels, policy)
+    variant_path = cache_dir / f"{key}.mp4"
+
+    if variant_path.exists():
+        os.utime(variant_path)
+        return variant_path
+
+    # Render to a temp file first so an interrupted encode is never a cache hit
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=cache_dir)
+    os.close(fd)
+    try:
+        _render_intro_variant(intro_path, temp_path, width, height, fps, audio_fps,
+                              fade_duration, codec, audio_channels, policy)
+        os.replace(temp_path, variant_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    evict_intro_cache(cache_dir, max_bytes, keep=variant_path)
+    return variant_path
+
+
+def evict_intro_cache(cache_dir=None, max_bytes=None, keep=None):
+    """
+    Delete least-recently-used intro variants until the cache fits its limit.
+
+    Args:
+        cache_dir: Cache directory (default: INTRO_CACHE_DIR)
+        max_bytes: Cache size limit (default: INTRO_CACHE_MAX_BYTES)
+        keep: Optional path that must not be evicted
+
+    Returns:
+        Number of variants deleted
+    """
+    cache_dir = Path(cache_dir or INTRO_CACHE_DIR)
+    max_bytes = INTRO_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not cache_dir.exists():
+        return 0
+
+    entries = []
+    for f in cache_dir.glob('*.mp4'):
+        stat = f.stat()
+        entries.append((stat.st_mtime, stat.st_size, f))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, f in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and f == Path(keep):
+            continue
+        try:
+            f.unlink()
+            total -= size
+            deleted += 1
+        except OSError:
+            continue
+
+    return deleted
@@ -0,0 +1,244 @@
+"""
+Memory Module
+Estimates per-job memory, admits concurrent stitches within a budget and measures peak RSS
+"""
+
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+from yt_automation.frame_cache import fits_frame_cache
+from yt_automation.probe import probe_video
+from yt_automation.resolution import output_size
+
+
+# RGB frames MoviePy holds per job: the reader's buffer, the current frame of
+# each clip, fade and crop results and the frame being piped to ffmpeg
+MOVIEPY_FRAMES_IN_FLIGHT = 6
+
+# YUV 4:2:0 frames x264 keeps for lookahead and reference frames
+ENCODER_FRAMES_IN_FLIGHT = 60
+
+# Interpreter, MoviePy, ffmpeg binaries and codec state
+JOB_BASE_BYTES = 300 * 1024 * 1024
+
+
+def _physical_memory():
+    """Total physical memory in bytes, or None where the OS doesn't say."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _default_budget_bytes():
+    """MEMORY_BUDGET_MB, or half the machine's RAM (None = unlimited)."""
+    if os.getenv('MEMORY_BUDGET_MB'):
+        return int(os.getenv('MEMORY_BUDGET_MB')) * 1024 * 1024 or None
+    total = _physical_memory()
+    return total // 2 if total else None
+
+
+MEMORY_BUDGET_BYTES = _default_budget_bytes()
+
+
+def intro_cache_bytes(intro_path, size):
+    """
+    Bytes the intro's decoded frames take in a worker's frame cache.
+
+    Args:
+        intro_path: Path to the intro video
+        size: Output (width, height) the intro is fitted to
+
+    Returns:
+        Bytes, or 0 if the intro is too large to be cached (see fits_frame_cache)
+    """
+    info = probe_video(intro_path)
+    if not fits_frame_cache(size, info.fps, info.duration):
+        return 0
+    width, height = size
+    return width * height * 3 * math.ceil(info.duration * info.fps)
+
+
+def estimate_stitch_memory(main_path, backend='moviepy', segment_workers=1, intro_path=None):
+    """
+    Estimate the peak memory of one stitch job.
+
+    Args:
+        main_path: Path to the main video (the output keeps its resolution)
+        backend: 'moviepy' or 'ffmpeg'; ffmpeg keeps no frames in Python
+        segment_workers: Parallel encodes the job runs (see editor.planned_segment_workers;
+                         None = half the CPUs)
+        intro_path: Path to the intro; with the moviepy backend its decoded
+                    frames stay in the worker's frame cache and are counted too
+
+    Returns:
+        Estimated bytes
+    """
+    size = output_size(main_path)
+    width, height = size
+    rgb_frame = width * height * 3
+    encoder = ENCODER_FRAMES_IN_FLIGHT * width * height * 3 // 2
+
+    per_encode = JOB_BASE_BYTES + encoder
+    if backend != 'ffmpeg':
+        per_encode += MOVIEPY_FRAMES_IN_FLIGHT * rgb_frame
+    if segment_workers is None:
+        segment_workers = max(1, (os.cpu_count() or 1) // 2)
+    total = per_encode * max(segment_workers, 1)
+
+    # Only one process (the worker, or the first segment's) caches the intro
+    if intro_path and backend != 'ffmpeg':
+        total += intro_cache_bytes(intro_path, size)
+    return total
+
+
+class MemoryBudget:
+    """
+    Admits jobs while their estimated memory fits under a limit.
+
+    A job that doesn't fit waits until running jobs release enough memory.
+    A job larger than the whole budget still runs, but only on its own, so
+    the queue can't stall forever.
+    """
+
+    def __init__(self, limit_bytes=None):
+        """
+        Args:
+            limit_bytes: Budget in bytes (None = unlimited)
+        """
+        self.limit_bytes = limit_bytes
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, nbytes):
+        return not self.limit_bytes or self.in_use == 0 or self.in_use + nbytes <= self.limit_bytes
+
+    def acquire(self, nbytes):
+        """Block until nbytes fit in the budget, then reserve them."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(nbytes))
+            self.in_use += nbytes
+
+    def release(self, nbytes):
+        """Return reserved bytes to the budget and wake waiting jobs."""
+        with self._condition:
+            self.in_use = max(self.in_use - nbytes, 0)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Hold nbytes of the budget for the duration of a with block."""
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+
+# Shared by every stitch started in this process (e.g. concurrent Streamlit sessions)
+default_budget = MemoryBudget(MEMORY_BUDGET_BYTES)
+
+
+def _process_rss(pid):
+    """Resident set size of one process in bytes, or None if it can't be read."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _descendant_pids(pid):
+    """PIDs of every process below pid (e.g. ffmpeg encoders, segment workers)."""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces, so split after its closing ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    descendants = []
+    pending = list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        descendants.append(child)
+        pending.extend(children.get(child, []))
+    return descendants
+
+
+def current_rss(include_children=True):
+    """
+    Resident set size of this process and, by default, its child processes.
+
+    The encoder runs as an ffmpeg child (and does all the work with the
+    ffmpeg backend), so it usually holds most of a job's memory. Reads
+    /proc, so this is only available on Linux.
+
+    Args:
+        include_children: Add the RSS of every descendant process
+
+    Returns:
+        Bytes, or None where it can't be read
+    """
+    pid = os.getpid()
+    total = _process_rss(pid)
+    if total is None:
+        return None
+    if include_children:
+        for child in _descendant_pids(pid):
+            total += _process_rss(child) or 0  # children may exit while being read
+    return total
+
+
+class PeakRSS:
+    """Peak RSS seen while a track_peak_rss block ran (bytes, or None if unknown)."""
+
+    def __init__(self):
+        self.peak = None
+
+    def sample(self):
+        """Record the current RSS if it is a new peak."""
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+@contextmanager
+def track_peak_rss(interval=0.1):
+    """
+    Sample the RSS of this process and its children in the background during a with block.
+
+    Args:
+        interval: Seconds between samples
+
+    Yields:
+        PeakRSS whose peak attribute holds the result after the block
+    """
+    tracker = PeakRSS()
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            tracker.sample()
+
+    tracker.sample()
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        yield tracker
+    finally:
+        stop.set()
+        thread.join()
+        tracker.sample()
+
@@ -0,0 +1,359 @@
+"""
+Metadata Store Module
+Mirrors the channel's videos and playlist membership in SQLite, kept current by incremental syncs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from googleapiclient.errors import HttpError
+
+from yt_automation.playlist_index import PlaylistIndex, is_not_modified
+from yt_automation.quota import execute
+from yt_automation.youtube_ops import (
+    LIST_PREFETCH_PAGES, VIDEOS_LIST_MAX_IDS, iter_video_pages, parse_video_details
+)
+
+
+METADATA_DB_FILE = Path('.clipstream_cache') / 'channel.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    thumbnail_url TEXT,
+    duration_seconds INTEGER NOT NULL DEFAULT 0,
+    is_short INTEGER NOT NULL DEFAULT 0,
+    chunk INTEGER NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_by_published ON videos (published_at DESC);
+CREATE INDEX IF NOT EXISTS videos_by_chunk ON videos (chunk);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk INTEGER PRIMARY KEY,
+    etag TEXT
+);
+
+CREATE TABLE IF NOT EXISTS playlists (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS playlist_items (
+    playlist_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, video_id)
+);
+CREATE INDEX IF NOT EXISTS playlist_items_by_video ON playlist_items (video_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _thumbnail_url(thumbnails):
+    """Pick the thumbnail the video list shows."""
+    for size in ('medium', 'default', 'high'):
+        if thumbnails.get(size, {}).get('url'):
+            return thumbnails[size]['url']
+    return None
+
+
+class MetadataStore:
+    """
+    Local SQLite mirror of the channel's uploads and playlist membership.
+
+    Reads never touch the API. sync() lists only the uploads published
+    after the newest one already stored (the publishedAt high-water mark)
+    and revalidates the stored ones with conditional videos.list calls:
+    videos are kept in fixed chunks of 50 IDs, each with the ETag of its
+    last response, so a chunk whose videos haven't changed answers 304
+    and is skipped. Playlist membership comes from PlaylistIndex, which
+    revalidates playlists the same way.
+    """
+
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: SQLite database file (default: METADATA_DB_FILE)
+        """
+        self.db_path = Path(db_path or METADATA_DB_FILE)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Reading ---
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
+
+    def high_water_mark(self):
+        """publishedAt of the newest stored upload, or None if the store is empty."""
+        with self._lock:
+            return self._conn.execute('SELECT MAX(published_at) FROM videos').fetchone()[0]
+
+    def last_synced(self):
+        """Unix time of the last completed sync, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'last_synced'").fetchone()
+        return float(row[0]) if row else None
+
+    def videos(self):
+        """
+        Get the stored uploads, newest first.
+
+        Returns:
+            List of playlistItem resources as list_videos yields them, with
+            is_short, duration_seconds and playlists (dicts with id and title) added
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, duration_seconds, is_short, item FROM videos ORDER BY published_at DESC'
+            ).fetchall()
+            memberships = self._conn.execute(
+                'SELECT pi.video_id, p.id, p.title FROM playlist_items pi '
+                'JOIN playlists p ON p.id = pi.playlist_id ORDER BY p.title'
+            ).fetchall()
+
+        playlists = {}
+        for video_id, playlist_id, title in memberships:
+            playlists.setdefault(video_id, []).append({'id': playlist_id, 'title': title})
+
+        videos = []
+        for row in rows:
+            video = json.loads(row['item'])
+            video['is_short'] = bool(row['is_short'])
+            video['duration_seconds'] = row['duration_seconds']
+            video['playlists'] = playlists.get(row['id'], [])
+            videos.append(video)
+        return videos
+
+    def playlists_for(self, video_id):
+        """
+        Get the stored playlists containing a video.
+
+        Returns:
+            List of playlist dicts with id and title
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.id, p.title FROM playlist_items pi JOIN playlists p ON p.id = pi.playlist_id '
+                'WHERE pi.video_id = ? ORDER BY p.title',
+                (video_id,)
+            ).fetchall()
+        return [{'id': playlist_id, 'title': title} for playlist_id, title in rows]
+
+    # --- Syncing ---
+
+    def _list_new_uploads(self, youtube_service, on_progress=None):
+        """
+        List the uploads published after the high-water mark.
+
+        The uploads playlist is newest first, so paging stops at the first
+        page that reaches an already stored upload.
+        """
+        mark = self.high_water_mark()
+        with self._lock:
+            known = {row[0] for row in self._conn.execute('SELECT id FROM videos')}
+
+        # Only an initial sync reads far enough to be worth fetching ahead
+        prefetch = LIST_PREFETCH_PAGES if mark is None else 0
+        new_items = []
+        pages = iter_video_pages(youtube_service, prefetch)
+        try:
+            for page in pages:
+                reached_mark = False
+                for item in page:
+                    published_at = item['snippet'].get('publishedAt') or ''
+                    if mark is not None and published_at <= mark:
+                        reached_mark = True
+                    video_id = item['snippet']['resourceId']['videoId']
+                    if video_id not in known:
+                        known.add(video_id)
+                        new_items.append(item)
+                if on_progress:
+                    on_progress('listing', len(new_items), None)
+                if reached_mark:
+                    break
+        finally:
+            pages.close()
+        return new_items
+
+    def _add_videos(self, items):
+        """Store newly listed uploads, filling the newest chunk before starting another."""
+        if not items:
+            return
+        with self._lock, self._conn:
+            chunk, size = self._conn.execute(
+                'SELECT chunk, COUNT(*) FROM videos WHERE chunk = (SELECT MAX(chunk) FROM videos)'
+            ).fetchone()
+            if chunk is None:
+                chunk, size = 0, 0
+
+            # Oldest first, so a chunk holds videos published around the same time
+            for item in reversed(items):
+                if size >= VIDEOS_LIST_MAX_IDS:
+                    chunk, size = chunk + 1, 0
+                snippet = item['snippet']
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO videos (id, title, published_at, thumbnail_url, chunk, item) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (snippet['resourceId']['videoId'], snippet.get('title', ''),
+                     snippet.get('publishedAt') or '', _thumbnail_url(snippet.get('thumbnails', {})),
+                     chunk, json.dumps(item))
+                )
+                # The chunk's IDs changed, so its ETag no longer applies
+                self._conn.execute('INSERT OR REPLACE INTO chunks (chunk, etag) VALUES (?, NULL)', (chunk,))
+                size += 1
+
+    def _revalidate_chunk(self, youtube_service, chunk, etag, new_ids=frozenset()):
+        """
+        Refresh one chunk's videos unless YouTube reports them unchanged.
+
+        Args:
+            youtube_service: YouTube API service object
+            chunk: Chunk number
+            etag: ETag from the chunk's last videos.list, or None
+            new_ids: IDs added by this sync; their details are filled in
+                     but they aren't counted as updated
+
+        Returns:
+            Tuple of (videos updated, videos removed), or None on a 304
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT id, item FROM videos WHERE chunk = ?', (chunk,)).fetchall()
+        if not rows:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM chunks WHERE chunk = ?', (chunk,))
+            return 0, 0
+
+        request = youtube_service.videos().list(
+            part='snippet,contentDetails',
+            id=','.join(row['id'] for row in rows)
+        )
+        if etag:
+            request.headers['If-None-Match'] = etag
+        try:
+            response = execute(request)
+        except HttpError as e:
+            if is_not_modified(e):
+                return None
+            raise
+
+        details = {item['id']: parse_video_details(item) for item in response.get('items', [])}
+        updated = removed = 0
+        with self._lock, self._conn:
+            for row in rows:
+                info = details.get(row['id'])
+                if info is None:
+                    # Deleted, or no longer visible to the channel owner
+                    self._conn.execute('DELETE FROM videos WHERE id = ?', (row['id'],))
+                    self._conn.execute('DELETE FROM playlist_items WHERE video_id = ?', (row['id'],))
+                    removed += 1
+                    continue
+                item = json.loads(row['item'])
+                item['snippet']['title'] = info['title']
+                item['snippet']['description'] = info['description']
+                if info['thumbnails']:
+                    item['snippet']['thumbnails'] = info['thumbnails']
+                self._conn.execute(
+                    'UPDATE videos SET title = ?, thumbnail_url = ?, duration_seconds = ?, is_short = ?, '
+                    'item = ? WHERE id = ?',
+                    (info['title'], _thumbnail_url(item['snippet'].get('thumbnails', {})),
+                     info['duration_seconds'], int(info['is_short']), json.dumps(item), row['id'])
+                )
+                if row['id'] not in new_ids:
+                    updated += 1
+            self._conn.execute('UPDATE chunks SET etag = ? WHERE chunk = ?', (response.get('etag'), chunk))
+        return updated, removed
+
+    def _sync_playlists(self, youtube_service, on_progress=None):
+        """
+        Mirror playlist membership from a refreshed PlaylistIndex.
+
+        Returns:
+            API calls the refresh made
+        """
+        def _on_playlist(done, total):
+            if on_progress:
+                on_progress('playlists', done, total)
+
+        index = PlaylistIndex().refresh(youtube_service, on_progress=_on_playlist)
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM playlist_items')
+            self._conn.execute('DELETE FROM playlists')
+            self._conn.executemany(
+                'INSERT INTO playlists (id, title) VALUES (?, ?)',
+                [(playlist_id, playlist['title']) for playlist_id, playlist in index.playlists.items()]
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO playlist_items (playlist_id, video_id) VALUES (?, ?)',
+                [(playlist_id, video_id)
+                 for playlist_id, playlist in index.playlists.items()
+                 for video_id in playlist['video_ids']]
+            )
+        return index.api_calls
+
+    def sync(self, youtube_service, on_progress=None):
+        """
+        Bring the store up to date with the channel.
+
+        Args:
+            youtube_service: YouTube API service object
+            on_progress: Optional callback (stage, done, total) where stage is
+                         'listing' (total is None), 'details' or 'playlists'
+
+        Returns:
+            Dict with counts of new, updated, removed and unchanged videos, and
+            playlist_calls, the API calls the playlist refresh made
+        """
+        new_items = self._list_new_uploads(youtube_service, on_progress)
+        self._add_videos(new_items)
+
+        new_ids = {item['snippet']['resourceId']['videoId'] for item in new_items}
+        stats = {'new': len(new_items), 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._lock:
+            chunks = self._conn.execute('SELECT chunk, etag FROM chunks ORDER BY chunk DESC').fetchall()
+        for done, (chunk, etag) in enumerate(chunks, 1):
+            result = self._revalidate_chunk(youtube_service, chunk, etag, new_ids)
+            if result is None:
+                with self._lock:
+                    stats['unchanged'] += self._conn.execute(
+                        'SELECT COUNT(*) FROM videos WHERE chunk = ?', (chunk,)
+                    ).fetchone()[0]
+            else:
+                stats['updated'] += result[0]
+                stats['removed'] += result[1]
+            if on_progress:
+                on_progress('details', done, len(chunks))
+
+        stats['playlist_calls'] = self._sync_playlists(youtube_service, on_progress)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_synced', ?)",
+                (str(time.time()),)
+            )
+        return stats
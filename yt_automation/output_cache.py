@@ -0,0 +1,122 @@
+"""
+Output Cache Module
+Remembers finished stitches so identical jobs return the existing output instead of re-encoding
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from yt_automation.intro_cache import file_fingerprint
+from yt_automation.storage import atomic_write_json
+
+
+# Manifest of finished stitches, keyed by output_key
+OUTPUT_CACHE_DIR = Path('.clipstream_cache') / 'outputs'
+
+
+def output_key(main_path, intro_path, **params):
+    """
+    Build the cache key for a stitch job.
+
+    Args:
+        main_path: Path to the main video
+        intro_path: Path to the intro video
+        **params: Everything else that changes the output (fade duration,
+                  backend, encoder profile, ...); values must be JSON-serializable
+
+    Returns:
+        Hex string identifying the job
+    """
+    parts = {
+        'main': file_fingerprint(main_path),
+        'intro': file_fingerprint(intro_path),
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _entry_path(key, cache_dir=None):
+    """Path of the manifest entry for a key."""
+    return Path(cache_dir or OUTPUT_CACHE_DIR) / f"{key}.json"
+
+
+def lookup_output(key, output_path, cache_dir=None):
+    """
+    Reuse a finished output for a job key.
+
+    The recorded output only counts if it still has the size and mtime it had
+    when it was written. If it lives somewhere other than output_path it is
+    copied there (atomically), which is still far cheaper than an encode.
+
+    Args:
+        key: Key from output_key
+        output_path: Where the caller wants the output
+        cache_dir: Manifest directory (default: OUTPUT_CACHE_DIR)
+
+    Returns:
+        The manifest entry dict on a hit, None on a miss
+    """
+    entry_path = _entry_path(key, cache_dir)
+    try:
+        with open(entry_path) as f:
+            entry = json.load(f)
+        stat = os.stat(entry['output'])
+    except (OSError, ValueError, KeyError):
+        return None
+    if stat.st_size != entry.get('size') or stat.st_mtime_ns != entry.get('mtime_ns'):
+        return None
+
+    if os.path.abspath(entry['output']) != os.path.abspath(output_path):
+        with atomic_output(output_path) as temp_path:
+            shutil.copyfile(entry['output'], temp_path)
+    return entry
+
+
+def record_output(key, output_path, cache_dir=None, **info):
+    """
+    Add a finished output to the manifest.
+
+    Args:
+        key: Key from output_key
+        output_path: Path of the finished output
+        cache_dir: Manifest directory (default: OUTPUT_CACHE_DIR)
+        **info: Extra JSON-serializable fields stored with the entry
+    """
+    stat = os.stat(output_path)
+    entry = dict(info, output=os.path.abspath(output_path), size=stat.st_size,
+                 mtime_ns=stat.st_mtime_ns, created=time.time())
+
+    atomic_write_json(_entry_path(key, cache_dir), entry)
+
+
+@contextmanager
+def atomic_output(output_path):
+    """
+    Write a file under a temporary name and rename it into place on success.
+
+    A crashed or interrupted write leaves no file at output_path, so it can
+    never be mistaken for a finished output.
+
+    Args:
+        output_path: Final path of the file
+
+    Yields:
+        Temporary path in the same directory, with the same extension
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{output_path.stem}.", suffix=output_path.suffix,
+                                     dir=output_path.parent)
+    os.close(fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
@@ -0,0 +1,141 @@
+"""
+Pipeline Module
+Overlaps batch stages (download, stitch, upload) with bounded queues between them
+"""
+
+import queue
+import threading
+
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class PipelineStage:
+    """
+    One step of a pipeline, run by its own pool of worker threads.
+
+    The stage function receives a job dict, does its work (mutating the job
+    as needed) and returns it. Raising marks the job failed at this stage.
+    Long-running stages can call job['report_progress'](value) to emit a
+    'progress' event with job['progress'] set to value.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=None):
+        """
+        Args:
+            name: Stage name, used for status ('<name>_failed') and events
+            func: Callable taking and returning a job dict
+            workers: Number of worker threads for this stage
+            queue_size: Maximum jobs waiting for this stage (default: workers).
+                        Upstream stages block when it is full, which bounds how
+                        much work (e.g. downloaded files) can pile up.
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers
+
+
+def run_pipeline(items, stages, on_event=None):
+    """
+    Push items through the stages, with each stage working on a different item.
+
+    Item N+1 can be in the first stage while item N is in the second and
+    item N-1 in the third. Bounded queues between stages apply backpressure,
+    so a fast stage cannot run arbitrarily far ahead of a slow one.
+
+    Args:
+        items: Iterable of items (may be a generator that is still producing)
+        stages: List of PipelineStage
+        on_event: Optional callback (event, stage_name, job) called in the
+                  calling thread; event is 'started', 'progress', 'finished'
+                  or 'failed'
+
+    Returns:
+        List of job dicts in input order. Each has 'index', 'item', 'status'
+        ('success' or '<stage>_failed') and 'error' on failure.
+    """
+    queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+    events = queue.Queue()
+    jobs = []
+    remaining = [stage.workers for stage in stages]
+    lock = threading.Lock()
+
+    def feed():
+        try:
+            for index, item in enumerate(items):
+                job = {'index': index, 'item': item, 'status': None}
+                with lock:
+                    jobs.append(job)
+                queues[0].put(job)
+        except Exception as e:
+            events.put(('feed_error', None, e))
+        finally:
+            for _ in range(stages[0].workers):
+                queues[0].put(_DONE)
+
+    def progress_reporter(stage_name, job):
+        def report_progress(progress):
+            job['progress'] = progress
+            events.put(('progress', stage_name, job))
+        return report_progress
+
+    def work(stage_index):
+        stage = stages[stage_index]
+        in_queue = queues[stage_index]
+        while True:
+            job = in_queue.get()
+            if job is _DONE:
+                break
+            job['report_progress'] = progress_reporter(stage.name, job)
+            events.put(('started', stage.name, job))
+            try:
+                job = stage.func(job) or job
+            except Exception as e:
+                job['status'] = f"{stage.name}_failed"
+                job['error'] = str(e)
+                events.put(('failed', stage.name, job))
+                continue
+            events.put(('finished', stage.name, job))
+            if stage_index + 1 < len(stages):
+                queues[stage_index + 1].put(job)
+            else:
+                job['status'] = 'success'
+
+        # The last worker out of a stage closes the next stage's input
+        with lock:
+            remaining[stage_index] -= 1
+            last = remaining[stage_index] == 0
+        if last:
+            if stage_index + 1 < len(stages):
+                for _ in range(stages[stage_index + 1].workers):
+                    queues[stage_index + 1].put(_DONE)
+            else:
+                events.put(('pipeline_done', None, None))
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for stage_index, stage in enumerate(stages):
+        for _ in range(stage.workers):
+            threads.append(threading.Thread(target=work, args=(stage_index,), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    # Deliver events on the calling thread so callers can safely touch UI state
+    feed_error = None
+    while True:
+        event, stage_name, job = events.get()
+        if event == 'pipeline_done':
+            break
+        if event == 'feed_error':
+            feed_error = job
+            continue
+        if on_event:
+            on_event(event, stage_name, job)
+
+    for thread in threads:
+        thread.join()
+    if feed_error is not None:
+        raise feed_error
+
+    return sorted(jobs, key=lambda job: job['index'])
@@ -0,0 +1,149 @@
+"""
+Playlist Module
+Streams a playlist's videos from yt-dlp's JSON output as they are listed
+"""
+
+import json
+import re
+import subprocess
+import sys
+import tempfile
+
+
+# Placeholder titles yt-dlp reports for entries that can't be downloaded
+_UNAVAILABLE_TITLES = ('[Private video]', '[Deleted video]', '[Unavailable]')
+
+
+def _is_available(entry):
+    """Whether a flat playlist entry points at a downloadable video."""
+    if not entry.get('id') or not entry.get('title'):
+        return False
+    if entry['title'] in _UNAVAILABLE_TITLES:
+        return False
+    return entry.get('availability') not in ('private', 'needs_auth', 'subscriber_only', 'premium_only')
+
+
+def title_filter(pattern):
+    """
+    Build a filter that keeps videos whose title matches a regular expression.
+
+    Args:
+        pattern: Regular expression, matched case-insensitively anywhere in the title
+
+    Returns:
+        Callable taking a video dict and returning True to keep it
+    """
+    regex = re.compile(pattern, re.IGNORECASE)
+    return lambda video: regex.search(video['title']) is not None
+
+
+def duration_filter(min_seconds=None, max_seconds=None):
+    """
+    Build a filter that keeps videos within a duration range.
+
+    Videos whose duration the listing doesn't include are kept.
+
+    Args:
+        min_seconds: Shortest duration to keep
+        max_seconds: Longest duration to keep
+
+    Returns:
+        Callable taking a video dict and returning True to keep it
+    """
+    def keep(video):
+        duration = video.get('duration')
+        if duration is None:
+            return True
+        if min_seconds is not None and duration < min_seconds:
+            return False
+        return max_seconds is None or duration <= max_seconds
+
+    return keep
+
+
+def iter_playlist_videos(playlist_url, limit=None, filters=None):
+    """
+    Yield a playlist's videos one by one while yt-dlp is still listing it.
+
+    yt-dlp prints one JSON object per entry, fetching the playlist page by
+    page, so the first video is available long before a large playlist has
+    been listed. Listing stops as soon as limit videos have been yielded.
+
+    Args:
+        playlist_url: URL of the YouTube playlist
+        limit: Maximum number of videos to yield
+        filters: Optional callables taking a video dict; a video is only
+                 yielded if every filter returns True (see title_filter and
+                 duration_filter)
+
+    Yields:
+        Video dicts with id, title, description and duration (None if unknown).
+        Private, deleted and duplicate entries are skipped.
+
+    Raises:
+        RuntimeError: If yt-dlp lists no entries and reports an error (a bad
+            URL, a private playlist, an extractor failure)
+    """
+    if limit is not None and limit <= 0:
+        return
+    cmd = [
+        sys.executable, '-m', 'yt_dlp',
+        '--flat-playlist',
+        '--lazy-playlist',
+        '--ignore-errors',
+        '--dump-json',
+        playlist_url
+    ]
+    filters = list(filters or [])
+    seen_ids = set()
+    listed = count = 0
+    finished = False
+
+    # A file rather than a pipe, so yt-dlp can't block on a full stderr pipe
+    # while stdout is being read
+    stderr = tempfile.TemporaryFile(mode='w+')
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+    try:
+        for line in process.stdout:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            listed += 1
+            if not _is_available(entry) or entry['id'] in seen_ids:
+                continue
+            seen_ids.add(entry['id'])
+
+            video = {
+                'id': entry['id'],
+                'title': entry['title'].strip(),
+                'description': (entry.get('description') or '').strip(),
+                'duration': entry.get('duration'),
+            }
+            if not all(keep(video) for keep in filters):
+                continue
+
+            yield video
+            count += 1
+            if limit is not None and count >= limit:
+                break
+        else:
+            finished = True
+    finally:
+        # Stop listing once the caller has enough videos (or stopped iterating)
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        stderr.seek(0)
+        errors = stderr.read().strip()
+        stderr.close()
+
+    if not finished or not (process.returncode or errors):
+        return
+    error_lines = [line for line in errors.splitlines() if line.startswith('ERROR')]
+    message = (error_lines or errors.splitlines() or [f"exit status {process.returncode}"])[-1]
+    if not listed:
+        raise RuntimeError(f"yt-dlp couldn't list {playlist_url}: {message}")
+    if process.returncode:
+        print(f"⚠️  yt-dlp skipped some playlist entries: {message}", file=sys.stderr)
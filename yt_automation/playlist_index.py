@@ -0,0 +1,186 @@
+"""
+Playlist Index Module
+Maps each video to the playlists containing it, built once per refresh and revalidated with ETags
+"""
+
+import json
+import threading
+from pathlib import Path
+
+from googleapiclient.errors import HttpError
+
+from yt_automation.quota import execute
+from yt_automation.storage import atomic_write_json
+
+
+PLAYLIST_INDEX_FILE = Path('.clipstream_cache') / 'playlist_index.json'
+
+# Upload threads record new memberships concurrently
+_lock = threading.Lock()
+
+
+def is_not_modified(error):
+    """Whether an HttpError is a 304 answer to an If-None-Match request."""
+    return getattr(error, 'resp', None) is not None and error.resp.status == 304
+
+
+class PlaylistIndex:
+    """
+    Inverted index of the authenticated user's playlists: video ID -> playlists.
+
+    refresh() lists the playlists (one call per 50) and pages through each
+    playlist's items once, instead of asking every playlist about every
+    video. Every page is requested with its ETag from the last refresh, and
+    a page answered with a 304 keeps its cached video IDs, so an unchanged
+    playlist costs one call per page but no item data.
+    """
+
+    def __init__(self, cache_path=None):
+        """
+        Args:
+            cache_path: JSON file the index is kept in (default: PLAYLIST_INDEX_FILE)
+        """
+        self.cache_path = Path(cache_path or PLAYLIST_INDEX_FILE)
+        self.playlists = {}  # playlist ID -> {'title', 'item_count', 'pages', 'video_ids'}
+        self.api_calls = 0
+        self._by_video = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                self.playlists = json.load(f).get('playlists', {})
+        except (OSError, ValueError):
+            self.playlists = {}
+        self._reindex()
+
+    def _reindex(self):
+        self._by_video = {}
+        for playlist_id, playlist in self.playlists.items():
+            for video_id in playlist['video_ids']:
+                self._by_video.setdefault(video_id, []).append(playlist_id)
+
+    def save(self):
+        """Write the index to cache_path atomically."""
+        with _lock:
+            atomic_write_json(self.cache_path, {'playlists': self.playlists})
+
+    def _execute(self, request, etag=None):
+        """Run a request, conditionally if etag is given; returns None on 304."""
+        if etag:
+            request.headers['If-None-Match'] = etag
+        self.api_calls += 1
+        try:
+            return execute(request)
+        except HttpError as e:
+            if is_not_modified(e):
+                return None
+            raise
+
+    def _list_playlists(self, youtube_service):
+        """All of the user's playlists as (id, title, item_count)."""
+        playlists = []
+        next_page_token = None
+        while True:
+            response = self._execute(youtube_service.playlists().list(
+                part='snippet,contentDetails',
+                mine=True,
+                maxResults=50,
+                pageToken=next_page_token
+            ))
+            for item in response.get('items', []):
+                playlists.append((item['id'], item['snippet']['title'],
+                                  item.get('contentDetails', {}).get('itemCount')))
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                return playlists
+
+    def _page_items(self, youtube_service, playlist_id, cached=None):
+        """
+        Page through a playlist's items, revalidating each cached page by its ETag.
+
+        Returns:
+            List of page dicts with etag, video_ids and next_page_token
+        """
+        cached_pages = cached.get('pages', []) if cached else []
+        pages = []
+        next_page_token = None
+        while True:
+            page_cache = cached_pages[len(pages)] if len(pages) < len(cached_pages) else None
+            response = self._execute(
+                youtube_service.playlistItems().list(
+                    part='contentDetails',
+                    playlistId=playlist_id,
+                    maxResults=50,
+                    pageToken=next_page_token
+                ),
+                etag=page_cache['etag'] if page_cache else None
+            )
+            if response is None:
+                page = page_cache
+            else:
+                page = {
+                    'etag': response.get('etag'),
+                    'video_ids': [item['contentDetails']['videoId'] for item in response.get('items', [])],
+                    'next_page_token': response.get('nextPageToken'),
+                }
+            pages.append(page)
+            next_page_token = page['next_page_token']
+            if not next_page_token:
+                return pages
+
+    def refresh(self, youtube_service, on_progress=None):
+        """
+        Bring the index up to date with the channel and save it.
+
+        Playlists that can't be read are left out, as before.
+
+        Args:
+            youtube_service: YouTube API service object
+            on_progress: Optional callback (done, total) after each playlist
+
+        Returns:
+            self
+        """
+        playlists = {}
+        listed = self._list_playlists(youtube_service)
+        for done, (playlist_id, title, item_count) in enumerate(listed, 1):
+            try:
+                pages = self._page_items(youtube_service, playlist_id, self.playlists.get(playlist_id))
+            except HttpError:
+                continue
+            playlists[playlist_id] = {
+                'title': title,
+                'item_count': item_count,
+                'pages': pages,
+                'video_ids': [video_id for page in pages for video_id in page['video_ids']],
+            }
+            if on_progress:
+                on_progress(done, len(listed))
+
+        self.playlists = playlists
+        self._reindex()
+        self.save()
+        return self
+
+    def playlists_for(self, video_id):
+        """
+        Get the playlists containing a video.
+
+        Args:
+            video_id: The ID of the video
+
+        Returns:
+            List of playlist dicts with id and title
+        """
+        return [{'id': playlist_id, 'title': self.playlists[playlist_id]['title']}
+                for playlist_id in self._by_video.get(video_id, [])]
+
+    def record_membership(self, video_id, playlist_id):
+        """Note that a video was added to a playlist (e.g. after add_video_to_playlist)."""
+        with _lock:
+            playlist = self.playlists.get(playlist_id)
+            if playlist is None or video_id in playlist['video_ids']:
+                return
+            playlist['video_ids'].append(video_id)
+            self._by_video.setdefault(video_id, []).append(playlist_id)
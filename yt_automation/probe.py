@@ -0,0 +1,237 @@
+"""
+Video Probe Module
+Reads container headers to describe a video without opening MoviePy readers
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+
+from moviepy.config import FFMPEG_BINARY
+
+
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY') or shutil.which('ffprobe')
+
+# (path, size, mtime) -> VideoInfo
+_probe_cache = {}
+
+
+@dataclass(frozen=True)
+class VideoInfo:
+    """Stream layout of a video file as stored in its container headers."""
+    width: int
+    height: int
+    rotation: int = 0
+    fps: float = 0.0
+    duration: float = 0.0
+    start: float = 0.0
+    video_codec: str | None = None
+    pix_fmt: str | None = None
+    bitrate: int | None = None
+    video_bitrate: int | None = None
+    audio_codec: str | None = None
+    audio_profile: str | None = None  # e.g. 'LC' or 'HE-AAC'
+    audio_sample_rate: int | None = None
+    audio_channels: int | None = None
+    audio_layout: str | None = None
+    audio_bitrate: int | None = None
+
+    @property
+    def display_width(self):
+        """Width as shown to the viewer, after applying rotation."""
+        return self.height if self.rotation in (90, 270) else self.width
+
+    @property
+    def display_height(self):
+        """Height as shown to the viewer, after applying rotation."""
+        return self.width if self.rotation in (90, 270) else self.height
+
+    @property
+    def aspect_ratio(self):
+        """Display aspect ratio (width / height)."""
+        return self.display_width / self.display_height
+
+    @property
+    def is_vertical(self):
+        """True if the video is displayed taller than it is wide."""
+        return self.display_height > self.display_width
+
+    @property
+    def has_audio(self):
+        """True if the file has an audio stream."""
+        return self.audio_codec is not None
+
+
+def _parse_rate(rate):
+    """Parse an ffprobe rational like '30000/1001' into a float."""
+    if not rate or rate == '0/0':
+        return 0.0
+    if '/' in rate:
+        num, den = rate.split('/', 1)
+        return float(num) / float(den) if float(den) else 0.0
+    return float(rate)
+
+
+def _to_int(value):
+    """Convert an optional numeric string to int."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _probe_with_ffprobe(video_path):
+    """Probe a file using ffprobe's JSON output."""
+    cmd = [
+        FFPROBE_BINARY, '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        str(video_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    fmt = data.get('format', {})
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        raise ValueError(f"No video stream found in {video_path}")
+
+    # The legacy 'rotate' tag is clockwise; display-matrix rotation is counter-clockwise
+    rotation = _to_int(video.get('tags', {}).get('rotate')) or 0
+    for side_data in video.get('side_data_list', []):
+        if 'rotation' in side_data:
+            rotation = -(_to_int(side_data['rotation']) or 0)
+
+    return VideoInfo(
+        width=int(video['width']),
+        height=int(video['height']),
+        rotation=rotation % 360,
+        fps=_parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate')),
+        duration=float(fmt.get('duration') or video.get('duration') or 0),
+        start=float(fmt.get('start_time') or 0),
+        video_codec=video.get('codec_name'),
+        pix_fmt=video.get('pix_fmt'),
+        bitrate=_to_int(fmt.get('bit_rate')),
+        video_bitrate=_to_int(video.get('bit_rate')),
+        audio_codec=audio.get('codec_name') if audio else None,
+        audio_profile=audio.get('profile') if audio else None,
+        audio_sample_rate=_to_int(audio.get('sample_rate')) if audio else None,
+        audio_channels=_to_int(audio.get('channels')) if audio else None,
+        audio_layout=audio.get('channel_layout') if audio else None,
+        audio_bitrate=_to_int(audio.get('bit_rate')) if audio else None,
+    )
+
+
+# ffmpeg channel layout names and their channel counts; the first name for
+# a count is ffmpeg's default layout for it
+CHANNEL_LAYOUTS = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '4.0': 4,
+                   '5.0': 5, '5.1': 6, '5.1(side)': 6, '6.1': 7, '7.1': 8}
+
+
+def default_channel_layout(channels):
+    """ffmpeg's default layout name for a channel count ('stereo' if unknown)."""
+    return next((name for name, count in CHANNEL_LAYOUTS.items() if count == channels), 'stereo')
+
+
+def _probe_with_ffmpeg(video_path):
+    """Probe a file by parsing the stream summary ffmpeg prints for an input."""
+    cmd = [FFMPEG_BINARY, '-hide_banner', '-i', str(video_path)]
+    stderr = subprocess.run(cmd, capture_output=True, text=True).stderr
+
+    video_line = re.search(r'Stream #\S+.*?: Video: (.*)', stderr)
+    if video_line is None:
+        raise ValueError(f"No video stream found in {video_path}")
+    video_desc = video_line.group(1)
+
+    size = re.search(r'\b(\d{2,5})x(\d{2,5})\b', video_desc)
+    fps = re.search(r'([\d.]+) (?:fps|tbr)', video_desc)
+    video_bitrate = re.search(r'(\d+) kb/s', video_desc)
+    pix_fmt = re.search(r'\), (\w+)[,(]', video_desc)
+
+    duration = 0.0
+    match = re.search(r'Duration: (\d+):(\d+):([\d.]+)', stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    start = re.search(r'start: ([-\d.]+)', stderr)
+    bitrate = re.search(r'bitrate: (\d+) kb/s', stderr)
+    rotation = re.search(r'rotat\w* of (-?[\d.]+) degrees', stderr) or \
+        re.search(r'rotate\s*:\s*(-?\d+)', stderr)
+
+    audio_codec = audio_profile = audio_rate = audio_layout = audio_channels = audio_bitrate = None
+    audio_line = re.search(r'Stream #\S+.*?: Audio: (.*)', stderr)
+    if audio_line:
+        parts = [p.strip() for p in audio_line.group(1).split(',')]
+        audio_codec = parts[0].split(' ')[0]
+        # e.g. 'aac (LC) (mp4a / 0x6134)'; the codec tag is the part with a slash
+        profile = re.match(r'\S+ \(([^)/]+)\)', parts[0])
+        audio_profile = profile.group(1) if profile else None
+        for part in parts[1:]:
+            if part.endswith(' Hz'):
+                audio_rate = _to_int(part[:-3])
+            elif re.match(r'\d+ kb/s', part):
+                audio_bitrate = _to_int(part.split(' ')[0]) * 1000
+            elif part in CHANNEL_LAYOUTS or 'channels' in part:
+                audio_layout = part
+                audio_channels = CHANNEL_LAYOUTS.get(part) or _to_int(part.split(' ')[0])
+
+    # ffmpeg reports display-matrix rotation counter-clockwise; ffprobe's tag is clockwise
+    rotation_degrees = 0
+    if rotation:
+        rotation_degrees = int(round(float(rotation.group(1))))
+        if 'of' in rotation.group(0):
+            rotation_degrees = -rotation_degrees
+
+    return VideoInfo(
+        width=int(size.group(1)) if size else 0,
+        height=int(size.group(2)) if size else 0,
+        rotation=rotation_degrees % 360,
+        fps=float(fps.group(1)) if fps else 0.0,
+        duration=duration,
+        start=float(start.group(1)) if start else 0.0,
+        video_codec=video_desc.split(' ')[0].rstrip(','),
+        pix_fmt=pix_fmt.group(1) if pix_fmt else None,
+        bitrate=int(bitrate.group(1)) * 1000 if bitrate else None,
+        video_bitrate=int(video_bitrate.group(1)) * 1000 if video_bitrate else None,
+        audio_codec=audio_codec,
+        audio_profile=audio_profile,
+        audio_sample_rate=audio_rate,
+        audio_channels=audio_channels,
+        audio_layout=audio_layout,
+        audio_bitrate=audio_bitrate,
+    )
+
+
+def probe_video(video_path):
+    """
+    Read a video's stream layout from its container headers.
+
+    Uses ffprobe's JSON output when ffprobe is installed, otherwise parses the
+    stream summary of the ffmpeg binary MoviePy uses. No frames are decoded.
+    Results are memoized by (path, size, mtime), so repeated calls are free.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        VideoInfo record
+    """
+    stat = os.stat(video_path)
+    memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _probe_cache:
+        return _probe_cache[memo_key]
+
+    if FFPROBE_BINARY:
+        info = _probe_with_ffprobe(video_path)
+    else:
+        info = _probe_with_ffmpeg(video_path)
+
+    _probe_cache[memo_key] = info
+    return info
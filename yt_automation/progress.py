@@ -0,0 +1,130 @@
+"""
+Progress Module
+Reports encode progress (frames, encode fps, elapsed time, ETA) from stitch_intro
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+
+from proglog import ProgressBarLogger
+
+
+@dataclass(frozen=True)
+class EncodeProgress:
+    """Snapshot of an encode in progress."""
+    frames: int
+    total_frames: int
+    elapsed: float
+
+    @property
+    def fps(self):
+        """Frames encoded per second of wall-clock time."""
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Estimated seconds until the encode finishes (None until known)."""
+        if not self.frames or not self.fps:
+            return None
+        return max(self.total_frames - self.frames, 0) / self.fps
+
+    @property
+    def fraction(self):
+        """Completed fraction between 0 and 1."""
+        if not self.total_frames:
+            return 0.0
+        return min(self.frames / self.total_frames, 1.0)
+
+    @property
+    def done(self):
+        """True once every frame has been encoded."""
+        return self.total_frames > 0 and self.frames >= self.total_frames
+
+
+class EncodeProgressLogger(ProgressBarLogger):
+    """
+    MoviePy logger that turns the frame loop into EncodeProgress callbacks.
+
+    Pass it as the logger of write_videofile, or call report() directly for
+    work that happens outside MoviePy's frame loop.
+    """
+
+    def __init__(self, on_progress, total_frames=None, min_interval=0.25):
+        """
+        Args:
+            on_progress: Callable receiving an EncodeProgress
+            total_frames: Total frames of the whole job (default: the size of
+                          the current write)
+            min_interval: Minimum seconds between callbacks
+        """
+        super().__init__()
+        self.on_progress = on_progress
+        self.total_frames = total_frames
+        self.min_interval = min_interval
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def report(self, frames, total_frames=None, force=False):
+        """Send an EncodeProgress, throttled to min_interval unless forced."""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+        total = self.total_frames or total_frames or frames
+        self.on_progress(EncodeProgress(frames, total, now - self.started))
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # MoviePy's video frame loop is the 'frame_index' bar; audio chunks are ignored
+        if bar != 'frame_index' or attr != 'index':
+            return
+        total = self.bars[bar].get('total') or 0
+        self.report(max(value, 0), total, force=value >= total > 0)
+
+
+def format_progress(progress):
+    """
+    Format progress as a one-line summary.
+
+    Args:
+        progress: EncodeProgress
+
+    Returns:
+        String like "120/690 frames (17%) · 8.2 fps · 0:14 elapsed · ETA 1:09"
+    """
+    def clock(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+    text = (f"{progress.frames}/{progress.total_frames} frames ({progress.fraction * 100:.0f}%)"
+            f" · {progress.fps:.1f} fps · {clock(progress.elapsed)} elapsed")
+    if progress.eta is not None and not progress.done:
+        text += f" · ETA {clock(progress.eta)}"
+    return text
+
+
+def cli_progress(prefix='', stream=None):
+    """
+    Build an on_progress callback that redraws a single terminal line.
+
+    Args:
+        prefix: Text shown before the progress summary
+        stream: Output stream (default: sys.stdout)
+
+    Returns:
+        Callable suitable for stitch_intro's on_progress
+    """
+    stream = stream or sys.stdout
+    finished = [False]
+
+    def on_progress(progress):
+        if finished[0]:
+            return
+        stream.write(f"\r{prefix}{format_progress(progress)}\033[K")
+        if progress.done:
+            stream.write("\n")
+            finished[0] = True
+        stream.flush()
+
+    return on_progress
@@ -0,0 +1,227 @@
+"""
+Quota Module
+Charges every YouTube API call against the daily quota and keeps the day's usage on disk
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from googleapiclient.errors import HttpError
+
+from yt_automation.storage import atomic_write_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# YouTube resets quotas at midnight Pacific time; without tz data (e.g. on
+# Windows) fall back to standard time
+try:
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except ZoneInfoNotFoundError:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+
+# Units each API method costs (YouTube Data API v3); methods are keyed by
+# the request's methodId
+QUOTA_COSTS = {
+    'youtube.videos.insert': 1600,
+    'youtube.videos.update': 50,
+    'youtube.videos.delete': 50,
+    'youtube.thumbnails.set': 50,
+    'youtube.playlistItems.insert': 50,
+    'youtube.playlistItems.delete': 50,
+    'youtube.playlists.insert': 50,
+    'youtube.search.list': 100,
+}
+LIST_CALL_COST = 1  # every other .list call
+WRITE_CALL_COST = 50  # any write not in QUOTA_COSTS
+
+# Units the project may use per day; 0 disables the accounting
+DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))
+
+# One file for the current day, shared by the app and the CLI
+QUOTA_USAGE_FILE = Path('.clipstream_cache') / 'quota.json'
+
+# Charges are a read-modify-write of the usage file: threads are serialized
+# by _lock, processes (the app and the CLI) by a flock on a sibling .lock file
+_lock = threading.Lock()
+
+
+class QuotaExceededError(RuntimeError):
+    """The daily quota can't cover an API call until it resets."""
+
+    def __init__(self, message, resets_at=None):
+        super().__init__(message)
+        self.resets_at = resets_at or next_reset()
+
+
+def call_cost(method_id):
+    """
+    Get the quota units an API method costs.
+
+    Args:
+        method_id: Request methodId, e.g. 'youtube.videos.list'
+    """
+    if method_id in QUOTA_COSTS:
+        return QUOTA_COSTS[method_id]
+    return LIST_CALL_COST if method_id.endswith('.list') else WRITE_CALL_COST
+
+
+def quota_day(now=None):
+    """The quota day (Pacific time, when YouTube resets quotas) as YYYY-MM-DD."""
+    return (now or datetime.now(timezone.utc)).astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+
+def next_reset(now=None):
+    """When the quota next resets (midnight Pacific time), as an aware datetime."""
+    local = (now or datetime.now(timezone.utc)).astimezone(QUOTA_TIMEZONE)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time())
+    return midnight.replace(tzinfo=QUOTA_TIMEZONE)
+
+
+def _is_quota_error(error):
+    """Whether an HttpError says the daily quota is used up."""
+    if getattr(error, 'resp', None) is None or error.resp.status != 403:
+        return False
+    content = error.content or b''
+    if isinstance(content, str):
+        content = content.encode()
+    return b'quotaExceeded' in content or b'dailyLimitExceeded' in content
+
+
+class QuotaTracker:
+    """
+    Persisted count of the quota units used today.
+
+    Calls are charged before they are sent (YouTube bills failed calls
+    too), and a call the remaining units can't cover is refused with
+    QuotaExceededError instead of failing halfway through a batch.
+    """
+
+    def __init__(self, daily_limit=None, usage_file=None):
+        """
+        Args:
+            daily_limit: Units per day (default: DAILY_QUOTA; 0 disables the checks)
+            usage_file: JSON file usage is kept in (default: QUOTA_USAGE_FILE)
+        """
+        self.daily_limit = DAILY_QUOTA if daily_limit is None else daily_limit
+        self.usage_file = Path(usage_file or QUOTA_USAGE_FILE)
+
+    def _load(self):
+        """Today's usage; a file from an earlier day counts as empty."""
+        try:
+            with open(self.usage_file) as f:
+                usage = json.load(f)
+        except (OSError, ValueError):
+            usage = {}
+        if usage.get('day') != quota_day():
+            usage = {'day': quota_day(), 'used': 0, 'calls': {}}
+        return usage
+
+    @contextmanager
+    def _locked(self):
+        """Hold the usage file against other threads and processes."""
+        with _lock:
+            if fcntl is None:
+                yield
+                return
+            self.usage_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.usage_file.with_suffix('.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, usage):
+        atomic_write_json(self.usage_file, usage)
+
+    @property
+    def used(self):
+        """Units used so far today."""
+        with self._locked():
+            return self._load()['used']
+
+    def usage(self):
+        """Today's usage dict with day, used and calls (methodId -> count)."""
+        with self._locked():
+            return self._load()
+
+    def remaining(self):
+        """Units left today (None when accounting is disabled)."""
+        if not self.daily_limit:
+            return None
+        return max(0, self.daily_limit - self.used)
+
+    def can_afford(self, units):
+        """Whether units more can be spent today."""
+        remaining = self.remaining()
+        return remaining is None or units <= remaining
+
+    def charge(self, method_id, units=None):
+        """
+        Record an API call, refusing it if today's quota can't cover it.
+
+        Args:
+            method_id: Request methodId, e.g. 'youtube.videos.insert'
+            units: Units to charge (default: call_cost(method_id))
+
+        Returns:
+            Units used today including this call
+        """
+        units = call_cost(method_id) if units is None else units
+        with self._locked():
+            usage = self._load()
+            if self.daily_limit and usage['used'] + units > self.daily_limit:
+                raise QuotaExceededError(
+                    f"{method_id} needs {units} quota units but only "
+                    f"{max(0, self.daily_limit - usage['used'])} of {self.daily_limit} are left today"
+                )
+            usage['used'] += units
+            usage['calls'][method_id] = usage['calls'].get(method_id, 0) + 1
+            self._save(usage)
+            return usage['used']
+
+    def exhaust(self):
+        """Mark today's quota as used up (YouTube said so, e.g. other clients spent it)."""
+        with self._locked():
+            usage = self._load()
+            usage['used'] = max(usage['used'], self.daily_limit)
+            self._save(usage)
+
+    def wait_time(self):
+        """Seconds until the quota resets."""
+        return max(0.0, (next_reset() - datetime.now(timezone.utc)).total_seconds())
+
+
+default_tracker = QuotaTracker()
+
+
+def execute(request, tracker=None, **kwargs):
+    """
+    Execute an API request, charging it against the daily quota.
+
+    Args:
+        request: googleapiclient HttpRequest
+        tracker: QuotaTracker (default: default_tracker)
+        **kwargs: Passed to request.execute (e.g. http)
+
+    Returns:
+        The response
+    """
+    tracker = tracker or default_tracker
+    tracker.charge(request.methodId)
+    try:
+        return request.execute(**kwargs)
+    except HttpError as e:
+        if _is_quota_error(e):
+            tracker.exhaust()
+            raise QuotaExceededError(f"YouTube reports the daily quota is used up ({request.methodId})") from e
+        raise
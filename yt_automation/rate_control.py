@@ -0,0 +1,148 @@
+"""
+Rate Control Module
+Caps the output bitrate at the source's so re-encodes are never larger than needed
+"""
+
+import os
+import re
+from dataclasses import replace
+
+from yt_automation.encoder_profiles import get_encoder_profile
+from yt_automation.probe import probe_video
+from yt_automation.resolution import output_size
+
+
+# How stitch_intro limits the output bitrate:
+#   crf    - the profile's CRF alone; output size follows the content
+#   capped - CRF as the quality floor, plus a VBV cap derived from the source's
+#            bitrate and resolution so a low-bitrate source never balloons
+RATE_CONTROL_MODES = ('crf', 'capped')
+DEFAULT_RATE_CONTROL = os.getenv('RATE_CONTROL', 'crf')
+
+# Headroom over the source bitrate; a re-encode at exactly the source's rate
+# loses visible quality to generation loss
+RATE_CAP_HEADROOM = 1.15
+
+
+def _check_mode(mode):
+    """Validate a rate control mode name."""
+    if mode not in RATE_CONTROL_MODES:
+        raise ValueError(f"Unknown rate control mode '{mode}' (expected one of {', '.join(RATE_CONTROL_MODES)})")
+    return mode
+
+
+def parse_bitrate(bitrate):
+    """
+    Parse an ffmpeg bitrate like '128k' or '4.5M' into bits per second.
+
+    Args:
+        bitrate: Bitrate string or number (None passes through)
+
+    Returns:
+        Integer bits per second, or None
+    """
+    if bitrate is None:
+        return None
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmM]?)\s*', str(bitrate))
+    if match is None:
+        raise ValueError(f"Invalid bitrate '{bitrate}'")
+    value, unit = match.groups()
+    return int(float(value) * {'': 1, 'k': 1000, 'm': 1000 ** 2}[unit.lower()])
+
+
+def source_video_bitrate(info):
+    """
+    Get a video's video-stream bitrate in bits per second.
+
+    Falls back to the container bitrate minus the audio bitrate when the
+    stream doesn't record its own.
+
+    Args:
+        info: VideoInfo of the source
+
+    Returns:
+        Bits per second, or None if the headers don't say
+    """
+    if info.video_bitrate:
+        return info.video_bitrate
+    if info.bitrate:
+        return max(info.bitrate - (info.audio_bitrate or 0), 0) or None
+    return None
+
+
+def source_bitrate_cap(main_path):
+    """
+    Get the video bitrate the output should not exceed.
+
+    The source's video bitrate is scaled by the ratio of output to source
+    pixels and given RATE_CAP_HEADROOM.
+
+    Args:
+        main_path: Path to the main video
+
+    Returns:
+        Bits per second, or None if the source bitrate is unknown
+    """
+    info = probe_video(main_path)
+    bitrate = source_video_bitrate(info)
+    if not bitrate or not info.width or not info.height:
+        return None
+    width, height = output_size(main_path)
+    pixel_ratio = (width * height) / (info.width * info.height)
+    return int(bitrate * pixel_ratio * RATE_CAP_HEADROOM)
+
+
+def apply_rate_control(profile, main_path, mode=None):
+    """
+    Adapt an encoder profile to a rate control mode.
+
+    Args:
+        profile: EncoderProfile or profile name
+        main_path: Path to the main video
+        mode: One of RATE_CONTROL_MODES (default: DEFAULT_RATE_CONTROL)
+
+    Returns:
+        EncoderProfile; in 'capped' mode with maxrate/bufsize set, unless the
+        source bitrate is unknown or the profile already uses a fixed bitrate
+    """
+    profile = get_encoder_profile(profile)
+    mode = _check_mode(mode or DEFAULT_RATE_CONTROL)
+    if mode != 'capped' or profile.bitrate:
+        return profile
+    cap = source_bitrate_cap(main_path)
+    if cap is None:
+        return profile
+    return replace(profile, maxrate=f"{cap // 1000}k", bufsize=f"{2 * cap // 1000}k")
+
+
+def estimate_output_size(intro_path, main_path, encoder_profile=None, rate_control=None):
+    """
+    Estimate the size of a stitched output before encoding it.
+
+    Only a capped or fixed-bitrate encode has a predictable size; the
+    estimate is its upper bound, with the main video's audio at its source
+    bitrate (it is usually copied) and the intro's at the profile's.
+
+    Args:
+        intro_path: Path to the intro video
+        main_path: Path to the main video
+        encoder_profile: EncoderProfile or profile name (default: ENCODER_PROFILE)
+        rate_control: One of RATE_CONTROL_MODES (default: DEFAULT_RATE_CONTROL)
+
+    Returns:
+        Expected size in bytes, or None when it can't be predicted (CRF only)
+    """
+    profile = apply_rate_control(encoder_profile, main_path, rate_control)
+    video_bitrate = parse_bitrate(profile.bitrate or profile.maxrate)
+    if video_bitrate is None:
+        return None
+
+    intro_info = probe_video(intro_path)
+    main_info = probe_video(main_path)
+    audio_bitrate = parse_bitrate(profile.audio_bitrate)
+    bits = (
+        (intro_info.duration + main_info.duration) * video_bitrate
+        + intro_info.duration * audio_bitrate
+        + main_info.duration * ((main_info.audio_bitrate or audio_bitrate) if main_info.has_audio else 0)
+    )
+    return int(bits / 8)
@@ -0,0 +1,149 @@
+"""
+Resolution Module
+Fits the intro to the main video's native resolution so the main video is never resized
+"""
+
+import math
+import os
+
+import numpy as np
+
+from yt_automation.probe import probe_video
+
+
+# How the intro is fitted to a main video with a different aspect ratio:
+#   pad   - scale to fit inside the frame and letterbox/pillarbox with black
+#   crop  - scale to cover the frame and crop the overflow
+#   scale - stretch to the frame (distorts when aspect ratios differ)
+RESOLUTION_POLICIES = ('pad', 'crop', 'scale')
+DEFAULT_RESOLUTION_POLICY = os.getenv('INTRO_RESOLUTION_POLICY', 'pad')
+
+# Extra pre-rendered intros (e.g. 1:1 or 4:5) considered alongside the 16:9 and
+# 9:16 ones, as a comma-separated list of paths
+INTRO_VARIANTS = [p.strip() for p in os.getenv('INTRO_VARIANTS', '').split(',') if p.strip()]
+
+
+def _check_policy(policy):
+    """Validate a resolution policy name."""
+    if policy not in RESOLUTION_POLICIES:
+        raise ValueError(f"Unknown resolution policy '{policy}' (expected one of {', '.join(RESOLUTION_POLICIES)})")
+    return policy
+
+
+def output_size(video_path):
+    """
+    Get the output frame size for a main video.
+
+    This is the video's display resolution, rounded down to even dimensions
+    so it can be encoded as yuv420p.
+
+    Args:
+        video_path: Path to the main video
+
+    Returns:
+        Tuple of (width, height)
+    """
+    info = probe_video(video_path)
+    return info.display_width - info.display_width % 2, info.display_height - info.display_height % 2
+
+
+def intro_fit_filter(width, height, policy=None):
+    """
+    Build the ffmpeg filter chain that fits a video into a width x height frame.
+
+    Args:
+        width: Target width in pixels
+        height: Target height in pixels
+        policy: One of RESOLUTION_POLICIES (default: DEFAULT_RESOLUTION_POLICY)
+
+    Returns:
+        Comma-separated ffmpeg filter string
+    """
+    policy = _check_policy(policy or DEFAULT_RESOLUTION_POLICY)
+    if policy == 'pad':
+        filters = [
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease:force_divisible_by=2",
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black",
+        ]
+    elif policy == 'crop':
+        filters = [
+            f"scale={width}:{height}:force_original_aspect_ratio=increase",
+            f"crop={width}:{height}",
+        ]
+    else:
+        filters = [f"scale={width}:{height}"]
+    return ','.join(filters + ['setsar=1'])
+
+
+def _pad_clip(clip, width, height, reuse_buffer=False):
+    """Centre a clip on a black width x height canvas (letterbox/pillarbox)."""
+    x, y = (width - clip.w) // 2, (height - clip.h) // 2
+    canvas = np.zeros((height, width, 3), dtype=np.uint8) if reuse_buffer else None
+
+    def pad(frame):
+        # Only the inner region changes between frames, so the borders stay black
+        out = canvas if canvas is not None else np.zeros((height, width, 3), dtype=np.uint8)
+        out[y:y + frame.shape[0], x:x + frame.shape[1]] = frame[..., :3]
+        return out
+
+    return clip.image_transform(pad)
+
+
+def fit_clip(clip, width, height, policy=None, reuse_buffer=False):
+    """
+    Fit a MoviePy clip into a width x height frame.
+
+    Used when the intro isn't taken from the variant cache; only the intro
+    goes through this, so the cost is proportional to the intro's length.
+    Padding blits into a plain canvas rather than going through MoviePy's
+    compositing, which allocates a full-frame composite (and mask) per frame.
+
+    Args:
+        clip: MoviePy video clip
+        width: Target width in pixels
+        height: Target height in pixels
+        policy: One of RESOLUTION_POLICIES (default: DEFAULT_RESOLUTION_POLICY)
+        reuse_buffer: Pad into one canvas that every frame overwrites. Only
+            safe when each frame is consumed before the next is requested
+            (e.g. streamed to the encoder), not when frames are collected.
+
+    Returns:
+        Clip of exactly width x height
+    """
+    policy = _check_policy(policy or DEFAULT_RESOLUTION_POLICY)
+    if tuple(clip.size) == (width, height):
+        return clip
+    if policy == 'scale':
+        return clip.resized(new_size=(width, height))
+
+    ratio = width / clip.w, height / clip.h
+    scale = min(ratio) if policy == 'pad' else max(ratio)
+    clip = clip.resized(new_size=(max(round(clip.w * scale), 1), max(round(clip.h * scale), 1)))
+    if policy == 'crop':
+        return clip.cropped(x_center=clip.w / 2, y_center=clip.h / 2, width=width, height=height)
+    return _pad_clip(clip, width, height, reuse_buffer)
+
+
+def closest_intro(video_path, intro_paths):
+    """
+    Pick the intro whose aspect ratio is closest to the video's.
+
+    Ratios are compared on a log scale so 2:1 and 1:2 are equally far from 1:1.
+    Ties go to the earlier intro in the list.
+
+    Args:
+        video_path: Path to the main video
+        intro_paths: Candidate intro videos; missing files are skipped
+
+    Returns:
+        Path of the closest intro, or None if none of them exist
+    """
+    target = math.log(probe_video(video_path).aspect_ratio)
+    best, best_distance = None, None
+    for intro_path in intro_paths:
+        if not intro_path or not os.path.exists(intro_path):
+            continue
+        distance = abs(math.log(probe_video(intro_path).aspect_ratio) - target)
+        if best_distance is None or distance < best_distance:
+            best, best_distance = intro_path, distance
+    return best
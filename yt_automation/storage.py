@@ -3,8 +3,10 @@ Storage Management Module
 Handles folder size monitoring and cleanup operations
 """
 
+import json
 import os
 import shutil
+import tempfile
 from pathlib import Path
 
 
@@ -12,6 +14,30 @@ from pathlib import Path
 STORAGE_WARNING_THRESHOLD = 1 * 1024 * 1024 * 1024  # 1 GB
 
 
+def atomic_write_json(path, data):
+    """
+    Write data as JSON, replacing the file in one step.
+    
+    The JSON goes to a temporary file next to path, which is then renamed
+    over it, so readers see the old or the new contents but never a partial
+    write.
+    
+    Args:
+        path: Path of the JSON file (its directory is created if missing)
+        data: JSON-serializable data
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
 def get_folder_size(folder_path):
     """
     Calculate the total size of a folder in bytes.
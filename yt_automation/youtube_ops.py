@@ -5,7 +5,23 @@ Handles API calls for listing and uploading videos
 
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
+import google_auth_httplib2
+import httplib2
 import os
+import queue
+import threading
+
+from yt_automation.quota import execute
+
+
+# videos.list accepts at most this many IDs per call (one quota unit per call)
+VIDEOS_LIST_MAX_IDS = 50
+
+# playlistItems.list returns at most this many items per page
+PLAYLIST_ITEMS_PAGE_SIZE = 50
+
+# Pages of the channel listing fetched ahead of the caller
+LIST_PREFETCH_PAGES = int(os.getenv('LIST_PREFETCH_PAGES', '2'))
 
 
 def get_youtube_service(credentials):
@@ -21,35 +37,155 @@ def get_youtube_service(credentials):
     return build('youtube', 'v3', credentials=credentials)
 
 
-def list_videos(youtube_service, max_results=10):
+def _thread_http(youtube_service):
     """
-    List videos from the authenticated user's channel.
-    
-    Args:
-        youtube_service: YouTube API service object
-        max_results: Maximum number of videos to retrieve
-        
+    Build a separate authorized Http for a background thread.
+
+    httplib2 connections aren't thread-safe, so a thread that pages through
+    results while the caller makes other calls must not share the service's.
+
     Returns:
-        List of video resources
+        AuthorizedHttp, or None if the service's credentials can't be reused
     """
-    request = youtube_service.channels().list(
+    credentials = getattr(getattr(youtube_service, '_http', None), 'credentials', None)
+    if credentials is None:
+        return None
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+
+def _uploads_playlist_id(youtube_service):
+    """Get the ID of the playlist holding the authenticated user's uploads, or None."""
+    response = execute(youtube_service.channels().list(
         part='contentDetails',
         mine=True
-    )
-    response = request.execute()
-    
-    if 'items' in response:
-        uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        
-        playlist_request = youtube_service.playlistItems().list(
+    ))
+    items = response.get('items')
+    if not items:
+        return None
+    return items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+
+def _fetch_upload_pages(youtube_service, playlist_id, http=None):
+    """Yield each page of a playlist's items in order, following nextPageToken."""
+    next_page_token = None
+    while True:
+        response = execute(youtube_service.playlistItems().list(
             part='snippet',
-            playlistId=uploads_playlist_id,
-            maxResults=max_results
-        )
-        playlist_response = playlist_request.execute()
-        return playlist_response.get('items', [])
+            playlistId=playlist_id,
+            maxResults=PLAYLIST_ITEMS_PAGE_SIZE,
+            pageToken=next_page_token
+        ), http=http)
+        yield response.get('items', [])
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            return
+
+
+def _prefetched(pages, depth):
+    """
+    Yield from a page iterator that runs up to depth pages ahead in a thread.
+
+    Errors raised while fetching are re-raised in the caller, and the thread
+    stops as soon as the caller stops iterating.
+    """
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch():
+        try:
+            for page in pages:
+                if not _put(page):
+                    return
+        except Exception as e:
+            _put(e)
+        else:
+            _put(done)
+
+    fetcher = threading.Thread(target=_fetch, daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_video_pages(youtube_service, prefetch=LIST_PREFETCH_PAGES):
+    """
+    Yield the authenticated user's uploads one API page at a time.
+
+    Follows nextPageToken through the whole uploads playlist (newest first).
+    While the caller handles one page, the next ones are already being
+    fetched in a background thread with its own HTTP connection, so the
+    caller can keep using youtube_service meanwhile.
+
+    Args:
+        youtube_service: YouTube API service object
+        prefetch: Number of pages to fetch ahead (0 fetches on demand)
+
+    Yields:
+        Lists of up to 50 playlistItem resources
+    """
+    playlist_id = _uploads_playlist_id(youtube_service)
+    if playlist_id is None:
+        return
+
+    http = _thread_http(youtube_service) if prefetch > 0 else None
+    if http is None:
+        yield from _fetch_upload_pages(youtube_service, playlist_id)
+        return
+
+    pages = _prefetched(_fetch_upload_pages(youtube_service, playlist_id, http), prefetch)
+    try:
+        yield from pages
+    finally:
+        pages.close()
+
+
+def list_videos(youtube_service, max_results=None, prefetch=LIST_PREFETCH_PAGES):
+    """
+    List videos from the authenticated user's channel, newest first.
+    
+    Results are yielded as soon as their page arrives, so callers can show
+    the first videos while later pages are still being fetched. Stops
+    requesting pages once max_results videos have been yielded.
     
-    return []
+    Args:
+        youtube_service: YouTube API service object
+        max_results: Maximum number of videos to retrieve (None for all)
+        prefetch: Number of pages to fetch ahead in the background
+        
+    Yields:
+        Video resources (playlistItem resources with part 'snippet')
+    """
+    if max_results is not None and max_results <= 0:
+        return
+    count = 0
+    pages = iter_video_pages(youtube_service, prefetch)
+    try:
+        for page in pages:
+            for item in page:
+                yield item
+                count += 1
+                if max_results is not None and count >= max_results:
+                    return
+    finally:
+        pages.close()
 
 
 def upload_video(youtube_service, video_file, title, description, category_id='22', privacy_status='private'):
@@ -86,7 +222,7 @@ def upload_video(youtube_service, video_file, title, description, category_id='2
         media_body=media
     )
     
-    response = request.execute()
+    response = execute(request)
     return response
 
 
@@ -112,7 +248,7 @@ def set_thumbnail(youtube_service, video_id, thumbnail_file):
         media_body=media
     )
     
-    response = request.execute()
+    response = execute(request)
     return response
 
 
@@ -127,16 +263,43 @@ def get_video_details(youtube_service, video_id):
     Returns:
         Dict with video details including is_short flag
     """
-    request = youtube_service.videos().list(
-        part='snippet,contentDetails,status',
-        id=video_id
-    )
-    response = request.execute()
+    return get_videos_details(youtube_service, [video_id]).get(video_id)
+
+
+def get_videos_details(youtube_service, video_ids):
+    """
+    Get details for many videos with as few API calls as possible.
     
-    if not response.get('items'):
-        return None
+    IDs are sent to videos.list in groups of VIDEOS_LIST_MAX_IDS, so 50
+    videos cost one call (and one quota unit) instead of 50.
+    
+    Args:
+        youtube_service: YouTube API service object
+        video_ids: Iterable of video IDs (duplicates are looked up once)
+        
+    Returns:
+        Dict of video ID -> details dict (see get_video_details); IDs the
+        API doesn't return (deleted or private videos) are left out
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    details = {}
+    
+    for start in range(0, len(video_ids), VIDEOS_LIST_MAX_IDS):
+        batch = video_ids[start:start + VIDEOS_LIST_MAX_IDS]
+        request = youtube_service.videos().list(
+            part='snippet,contentDetails,status',
+            id=','.join(batch)
+        )
+        response = execute(request)
+        
+        for item in response.get('items', []):
+            details[item['id']] = parse_video_details(item)
     
-    video = response['items'][0]
+    return details
+
+
+def parse_video_details(video):
+    """Turn a videos.list item into a details dict."""
     content_details = video.get('contentDetails', {})
     snippet = video.get('snippet', {})
     
@@ -153,13 +316,15 @@ def get_video_details(youtube_service, video_id):
     is_short = duration_seconds <= 60 or has_shorts_tag
     
     return {
-        'id': video_id,
+        'id': video['id'],
         'title': title,
         'description': description,
         'duration_seconds': duration_seconds,
         'is_short': is_short,
         'category_id': snippet.get('categoryId', '22'),
-        'tags': snippet.get('tags', [])
+        'tags': snippet.get('tags', []),
+        'published_at': snippet.get('publishedAt'),
+        'thumbnails': snippet.get('thumbnails', {})
     }
 
 
@@ -200,63 +365,6 @@ def parse_duration(duration_str):
     return hours * 3600 + minutes * 60 + seconds
 
 
-def get_video_playlists(youtube_service, video_id):
-    """
-    Get all playlists that contain a specific video (owned by authenticated user).
-    
-    Args:
-        youtube_service: YouTube API service object
-        video_id: The ID of the video
-        
-    Returns:
-        List of playlist dicts with id and title
-    """
-    # First get all user's playlists
-    playlists = []
-    next_page_token = None
-    
-    while True:
-        request = youtube_service.playlists().list(
-            part='snippet',
-            mine=True,
-            maxResults=50,
-            pageToken=next_page_token
-        )
-        response = request.execute()
-        
-        for item in response.get('items', []):
-            playlists.append({
-                'id': item['id'],
-                'title': item['snippet']['title']
-            })
-        
-        next_page_token = response.get('nextPageToken')
-        if not next_page_token:
-            break
-    
-    # Check which playlists contain the video
-    video_playlists = []
-    
-    for playlist in playlists:
-        # Check if video is in this playlist
-        try:
-            request = youtube_service.playlistItems().list(
-                part='snippet',
-                playlistId=playlist['id'],
-                videoId=video_id,
-                maxResults=1
-            )
-            response = request.execute()
-            
-            if response.get('items'):
-                video_playlists.append(playlist)
-        except Exception:
-            # Playlist might not be accessible or other error
-            continue
-    
-    return video_playlists
-
-
 def add_video_to_playlist(youtube_service, video_id, playlist_id):
     """
     Add a video to a playlist.
@@ -284,5 +392,5 @@ def add_video_to_playlist(youtube_service, video_id, playlist_id):
         body=body
     )
     
-    response = request.execute()
+    response = execute(request)
     return response